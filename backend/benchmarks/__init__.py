@@ -0,0 +1 @@
+# benchmarks (run from backend/: python -m benchmarks.<module>)
@@ -0,0 +1,88 @@
+"""Micro-benchmark: `_similar(a, b) >= 0.8` vs `_similar_at_least(a, b)`.
+
+Every query is compared against the whole vocabulary of the bundled
+quotes.db (content, authors and tags), which is what the matchers do on a
+full scan. Both kernels must reach the same decision for every pair.
+
+Usage (from backend/):
+    python -m benchmarks.bench_similarity [--db PATH] [--queries N] [--seed S]
+"""
+import argparse
+import random
+import time
+from pathlib import Path
+from typing import List, Set
+
+from src.common.db import get_db_path, load_quotes
+from src.common.matching import (
+    SIMILARITY_THRESHOLD,
+    _normalize_case_and_spaces,
+    _similar,
+    _similar_at_least,
+    parse_tags_field,
+)
+
+
+def corpus_vocabulary(db_path: Path) -> List[str]:
+    vocab: Set[str] = set()
+    for row in load_quotes(db_path):
+        texts = [row["content"], row["author"]] + parse_tags_field(row["tags"])
+        for text in texts:
+            vocab.update(_normalize_case_and_spaces(text or "").split())
+    return sorted(vocab)
+
+
+def make_queries(vocab: List[str], n: int, rnd: random.Random) -> List[str]:
+    """Vocabulary words with 0-2 random single-character typos."""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    queries = []
+    for _ in range(n):
+        w = list(rnd.choice(vocab))
+        for _ in range(rnd.randint(0, 2)):
+            i = rnd.randrange(len(w) + 1)
+            op = rnd.randint(0, 2)
+            if op == 0:
+                w.insert(i, rnd.choice(letters))
+            elif i < len(w) and len(w) > 1:
+                if op == 1:
+                    del w[i]
+                else:
+                    w[i] = rnd.choice(letters)
+        queries.append("".join(w))
+    return queries
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--db", type=Path, default=None)
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    db_path = args.db or get_db_path()
+    vocab = corpus_vocabulary(db_path)
+    queries = make_queries(vocab, args.queries, random.Random(args.seed))
+    pairs = len(vocab) * len(queries)
+    print(f"DB: {db_path}")
+    print(f"vocabulary: {len(vocab)} words, queries: {len(queries)}, pairs: {pairs}")
+
+    t0 = time.perf_counter()
+    old = [[_similar(w, q) >= SIMILARITY_THRESHOLD for w in vocab] for q in queries]
+    t_old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new = [[_similar_at_least(w, q) for w in vocab] for q in queries]
+    t_new = time.perf_counter() - t0
+
+    if old != new:
+        raise SystemExit("MISMATCH: _similar_at_least disagrees with _similar >= threshold")
+
+    hits = sum(map(sum, new))
+    print(f"matches: {hits} (identical decisions)")
+    print(f"SequenceMatcher.ratio : {t_old:8.3f} s  ({1e6 * t_old / pairs:6.2f} us/pair)")
+    print(f"_similar_at_least     : {t_new:8.3f} s  ({1e6 * t_new / pairs:6.2f} us/pair)")
+    print(f"speedup               : {t_old / t_new:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compare two benchmark result files written by benchmarks.run.
+
+Every (DB, workload, phase) present in both files is compared on its
+median time. Phases faster than --min-time in both runs are listed but
+never flagged, since their timings are mostly noise.
+
+Usage (from backend/):
+    python -m benchmarks.compare OLD.json NEW.json [--threshold 0.2]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple
+
+MIN_TIME = 1e-4
+
+
+class PhaseDelta(NamedTuple):
+    db: str
+    workload: str
+    phase: str
+    old: float
+    new: float
+
+    @property
+    def ratio(self) -> float:
+        return self.new / self.old if self.old > 0 else float("inf")
+
+
+def _phase_times(db: Dict[str, Any]) -> Dict[tuple, float]:
+    times = {("-", "load"): db["load"]}
+    for wname, w in db["workloads"].items():
+        times[(wname, "first_execute")] = w["first_execute"]
+        for phase, t in w["phases"].items():
+            times[(wname, phase)] = t["median"]
+    return times
+
+
+def compare_results(old: Dict[str, Any], new: Dict[str, Any]) -> List[PhaseDelta]:
+    deltas = []
+    for db_name, new_db in new["dbs"].items():
+        old_db = old["dbs"].get(db_name)
+        if old_db is None:
+            continue
+        old_times = _phase_times(old_db)
+        for (wname, phase), t in _phase_times(new_db).items():
+            if (wname, phase) in old_times:
+                deltas.append(PhaseDelta(db_name, wname, phase, old_times[(wname, phase)], t))
+    return deltas
+
+
+def print_comparison(deltas: List[PhaseDelta], threshold: float = 0.2, min_time: float = MIN_TIME) -> int:
+    """Print every delta; return the number of regressions beyond `threshold`."""
+    regressions = 0
+    for d in deltas:
+        flag = ""
+        if max(d.old, d.new) >= min_time:
+            if d.ratio > 1 + threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            elif d.ratio < 1 / (1 + threshold):
+                flag = "  faster"
+        print(
+            f"{d.db:<24}{d.workload:<22}{d.phase:<14}"
+            f"{d.old * 1e3:>10.3f}ms -> {d.new * 1e3:>10.3f}ms  x{d.ratio:5.2f}{flag}"
+        )
+    print(f"\n{regressions} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Compare two QuoteScript benchmark results")
+    ap.add_argument("old", type=Path)
+    ap.add_argument("new", type=Path)
+    ap.add_argument("--threshold", type=float, default=0.2)
+    ap.add_argument("--min-time", type=float, default=MIN_TIME)
+    args = ap.parse_args()
+
+    with open(args.old, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    if print_comparison(compare_results(old, new), args.threshold, args.min_time):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Synthetic quote corpus generator for benchmarks.
+
+Writes a SQLite DB with the same `quotes` schema as data/db/quotes.db.
+Authors, tags and words are drawn from Zipf distributions, as in real
+quote collections: a few authors and tags cover most rows, and word
+frequencies follow a long tail. Tags are stored in the same
+"['A', 'B']" text format.
+
+The heads of the author, tag and word lists are fixed real names and words,
+so the workloads in benchmarks/workloads/ match at every scale.
+
+Usage (from backend/):
+    python -m benchmarks.generate --rows 100k [--out PATH] [--seed 0]
+    python -m benchmarks.generate --rows 10k --rows 100k --rows 1M
+"""
+import argparse
+import itertools
+import random
+import sqlite3
+import string
+from bisect import bisect
+from pathlib import Path
+from typing import List, Sequence
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+HEAD_AUTHORS = [
+    "Albert Einstein", "Mark Twain", "Oscar Wilde", "Abraham Lincoln", "Maya Angelou",
+    "Epictetus", "Marcus Aurelius", "Confucius", "Seneca", "Ralph Waldo Emerson",
+    "Friedrich Nietzsche", "Mahatma Gandhi", "Eleanor Roosevelt", "Lao Tzu", "Socrates",
+]
+HEAD_TAGS = [
+    "Famous Quotes", "Wisdom", "Life", "Inspirational", "Love", "Friendship",
+    "Happiness", "Truth", "Success", "Freedom", "Humor", "Knowledge", "Courage",
+    "Philosophy", "Change", "Hope", "Books", "Death", "Time", "Motivational",
+]
+HEAD_WORDS = [
+    "the", "of", "and", "to", "a", "in", "is", "you", "that", "it", "be", "not",
+    "life", "love", "man", "who", "world", "people", "all", "time", "never",
+    "freedom", "wisdom", "truth", "happiness", "friends", "knowledge", "success",
+    "living", "dreams", "courage", "heart", "mind", "nothing", "everything",
+]
+FIRST_NAMES = ["John", "Mary", "James", "Anna", "Paul", "Sara", "David", "Laura", "Peter", "Emma",
+               "Henry", "Clara", "Oliver", "Alice", "Samuel", "Grace", "Victor", "Irene"]
+SYLLABLES = ["ka", "lo", "mi", "ra", "ten", "sul", "vor", "en", "di", "pa", "shi", "mar",
+             "ol", "ti", "nu", "bre", "ga", "fel", "ion", "qua", "ste", "ri", "zan", "po"]
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000, "10M": 10_000_000}
+
+
+def parse_rows(text: str) -> int:
+    if text in SCALES:
+        return SCALES[text]
+    t = text.lower().replace("_", "")
+    mult = 1
+    if t.endswith("k"):
+        mult, t = 1_000, t[:-1]
+    elif t.endswith("m"):
+        mult, t = 1_000_000, t[:-1]
+    return int(float(t) * mult)
+
+
+def _synthetic_words(rnd: random.Random, n: int, syllables: Sequence[str], lo: int, hi: int) -> List[str]:
+    seen = set()
+    out = []
+    while len(out) < n:
+        w = "".join(rnd.choice(syllables) for _ in range(rnd.randint(lo, hi)))
+        if w not in seen:
+            seen.add(w)
+            out.append(w)
+    return out
+
+
+def _zipf_cum_weights(n: int, s: float) -> List[float]:
+    return list(itertools.accumulate(1.0 / (k ** s) for k in range(1, n + 1)))
+
+
+class ZipfSampler:
+    def __init__(self, items: Sequence[str], s: float, rnd: random.Random):
+        self.items = items
+        self.cum = _zipf_cum_weights(len(items), s)
+        self.total = self.cum[-1]
+        self.rnd = rnd
+
+    def sample(self) -> str:
+        return self.items[bisect(self.cum, self.rnd.random() * self.total)]
+
+
+def generate(out: Path, rows: int, seed: int = 0, batch: int = 20_000) -> Path:
+    """Write a synthetic quotes DB with `rows` rows to `out` (replaced if present)."""
+    rnd = random.Random(seed)
+
+    n_authors = max(len(HEAD_AUTHORS), rows // 40)
+    n_tags = max(len(HEAD_TAGS), min(5_000, rows // 200))
+    n_words = max(len(HEAD_WORDS), min(200_000, rows // 5))
+
+    synth_last = _synthetic_words(rnd, max(1, n_authors // len(FIRST_NAMES) + 1), SYLLABLES, 2, 3)
+    authors = list(HEAD_AUTHORS)
+    for last, first in itertools.product(synth_last, FIRST_NAMES):
+        if len(authors) >= n_authors:
+            break
+        authors.append(f"{first} {last.capitalize()}")
+    tags = HEAD_TAGS + [w.capitalize() for w in _synthetic_words(rnd, n_tags - len(HEAD_TAGS), SYLLABLES, 2, 4)]
+    words = HEAD_WORDS + _synthetic_words(rnd, n_words - len(HEAD_WORDS), SYLLABLES, 1, 4)
+
+    author_z = ZipfSampler(authors, 1.05, rnd)
+    tag_z = ZipfSampler(tags, 1.1, rnd)
+    word_z = ZipfSampler(words, 1.07, rnd)
+    id_chars = string.ascii_letters + string.digits
+
+    def make_row():
+        n = rnd.randint(6, 30)
+        text = " ".join(word_z.sample() for _ in range(n))
+        text = text[0].upper() + text[1:] + rnd.choice(".!?.")
+        row_tags = list(dict.fromkeys(tag_z.sample() for _ in range(rnd.randint(1, 4))))
+        quote_id = "".join(rnd.choice(id_chars) for _ in range(12))
+        return quote_id, text, author_z.sample(), repr(row_tags)
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if out.exists():
+        out.unlink()
+    conn = sqlite3.connect(str(out))
+    try:
+        conn.execute(
+            "CREATE TABLE quotes (\n"
+            "    id TEXT PRIMARY KEY,\n"
+            "    content TEXT NOT NULL,\n"
+            "    author TEXT NOT NULL,\n"
+            "    tags TEXT NOT NULL\n"
+            ")"
+        )
+        done = 0
+        while done < rows:
+            n = min(batch, rows - done)
+            conn.executemany("INSERT OR IGNORE INTO quotes VALUES (?, ?, ?, ?)", [make_row() for _ in range(n)])
+            done += n
+        conn.commit()
+    finally:
+        conn.close()
+    return out
+
+
+def default_path(rows: int, seed: int) -> Path:
+    label = next((k for k, v in SCALES.items() if v == rows), str(rows))
+    return DATA_DIR / f"quotes_{label}_s{seed}.db"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Generate synthetic QuoteScript benchmark DBs")
+    ap.add_argument("--rows", action="append", required=True,
+                    help="Row count: 10k, 100k, 1M, 10M or any number (repeatable)")
+    ap.add_argument("--out", type=Path, help="Output DB path (only with a single --rows)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    if args.out and len(args.rows) > 1:
+        ap.error("--out can only be used with a single --rows")
+    for r in args.rows:
+        rows = parse_rows(r)
+        out = args.out or default_path(rows, args.seed)
+        generate(out, rows, args.seed)
+        print(f"wrote {rows} rows -> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Per-phase benchmark of the QuoteScript pipeline over the workload suite.
+
+For every DB and every workload in benchmarks/workloads/, each phase
+(lex, parse, semantic, ir, optimize, execute) is timed separately. The
+first execution (which builds the lazy indexes) is recorded on its own;
+the other phases are timed over --repeat runs (median and min). The
+corpus load is timed once per DB. The result cache is off, so execute
+measures the real filter work.
+
+Results are written as JSON and can be compared against an earlier run
+(see benchmarks/compare.py).
+
+Usage (from backend/):
+    python -m benchmarks.run --rows 10k --rows 100k [--repeat 5] [--label NAME]
+    python -m benchmarks.run --db ../data/db/quotes.db --baseline benchmarks/results/base.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.common.store import get_store
+from src.executor.cache import configure_result_cache
+from src.executor.executor import execute
+from src.ir.ir import to_ir
+from src.lexer.lexer import lex
+from src.optimizer.optimizer import optimize
+from src.parser.parser import parse
+from src.semantic.semantic import semantic_analysis
+
+from .compare import compare_results, print_comparison
+from .generate import default_path, generate, parse_rows
+
+BENCH_DIR = Path(__file__).resolve().parent
+WORKLOAD_DIR = BENCH_DIR / "workloads"
+RESULTS_DIR = BENCH_DIR / "results"
+
+PHASES = ["lex", "parse", "semantic", "ir", "optimize", "execute"]
+
+
+def _timed(fn: Callable[[], Any]) -> Tuple[Any, float]:
+    t0 = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - t0
+
+
+def run_phases(source: str, stats) -> Tuple[Dict[str, float], int]:
+    """One pass through the pipeline; returns per-phase seconds and row count."""
+    times: Dict[str, float] = {}
+    tokens, times["lex"] = _timed(lambda: lex(source))
+    program, times["parse"] = _timed(lambda: parse(tokens))
+    program, times["semantic"] = _timed(lambda: semantic_analysis(program))
+    ir, times["ir"] = _timed(lambda: to_ir(program))
+    ir, times["optimize"] = _timed(lambda: optimize(ir, stats))
+    rows, times["execute"] = _timed(lambda: execute(ir))
+    return times, len(rows)
+
+
+def bench_workload(source: str, stats, repeat: int) -> Dict[str, Any]:
+    first, n_rows = run_phases(source, stats)
+    runs = [run_phases(source, stats)[0] for _ in range(repeat)]
+    return {
+        "rows": n_rows,
+        "first_execute": first["execute"],
+        "phases": {
+            phase: {
+                "median": statistics.median(r[phase] for r in runs),
+                "min": min(r[phase] for r in runs),
+            }
+            for phase in PHASES
+        },
+    }
+
+
+def bench_db(db_path: Path, workloads: List[Path], repeat: int) -> Dict[str, Any]:
+    os.environ["QUOTESCRIPT_DB_PATH"] = str(db_path)
+    store = get_store()
+    store.clear()
+    _, load_s = _timed(store.refresh)
+    corpus = store.corpus()
+    stats, stats_s = _timed(corpus.stats)
+
+    result: Dict[str, Any] = {
+        "path": str(db_path),
+        "rows": len(corpus),
+        "load": load_s,
+        "stats": stats_s,
+        "workloads": {},
+    }
+    for path in workloads:
+        with open(path, "r", encoding="utf-8") as f:
+            source = f.read()
+        result["workloads"][path.stem] = bench_workload(source, stats, repeat)
+    store.clear()
+    return result
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCH_DIR, capture_output=True, text=True, timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def print_results(results: Dict[str, Any]) -> None:
+    for name, db in results["dbs"].items():
+        print(f"\n{name}: {db['rows']} rows, load {db['load'] * 1e3:.1f} ms, stats {db['stats'] * 1e3:.1f} ms")
+        header = f"  {'workload':<22}{'rows':>7}{'first':>11}" + "".join(f"{p:>11}" for p in PHASES)
+        print(header)
+        for wname, w in db["workloads"].items():
+            cells = "".join(f"{w['phases'][p]['median'] * 1e3:>9.3f}ms" for p in PHASES)
+            print(f"  {wname:<22}{w['rows']:>7}{w['first_execute'] * 1e3:>9.3f}ms{cells}")
+
+
+def _resolve_dbs(args) -> List[Path]:
+    dbs = [Path(p) for p in args.db or []]
+    for r in args.rows or []:
+        rows = parse_rows(r)
+        path = default_path(rows, args.seed)
+        if not path.exists():
+            print(f"generating {rows} rows -> {path}", file=sys.stderr)
+            generate(path, rows, args.seed)
+        dbs.append(path)
+    return dbs
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Per-phase QuoteScript benchmarks")
+    ap.add_argument("--db", action="append", help="Benchmark this DB (repeatable)")
+    ap.add_argument("--rows", action="append",
+                    help="Benchmark a synthetic DB of this size (10k, 100k, 1M, 10M; generated if missing)")
+    ap.add_argument("--seed", type=int, default=0, help="Seed for generated DBs")
+    ap.add_argument("--workloads", type=Path, default=WORKLOAD_DIR, help="Directory of .qs workloads")
+    ap.add_argument("--only", action="append", help="Run only these workloads (by name, repeatable)")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--label", default=None, help="Result name (default: timestamp)")
+    ap.add_argument("--output", type=Path, default=None, help="Result JSON path")
+    ap.add_argument("--baseline", type=Path, default=None, help="Compare against this earlier result")
+    ap.add_argument("--threshold", type=float, default=0.2,
+                    help="Relative slowdown reported as a regression (default 0.2 = 20%%)")
+    args = ap.parse_args()
+
+    dbs = _resolve_dbs(args)
+    if not dbs:
+        ap.error("give at least one --db or --rows")
+    workloads = sorted(args.workloads.glob("*.qs"))
+    if args.only:
+        workloads = [w for w in workloads if w.stem in args.only]
+    if not workloads:
+        ap.error(f"no workloads found in {args.workloads}")
+
+    configure_result_cache(enabled=False)
+    now = datetime.datetime.now()
+    label = args.label or now.strftime("%Y%m%d-%H%M%S")
+    results: Dict[str, Any] = {
+        "meta": {
+            "label": label,
+            "timestamp": now.isoformat(timespec="seconds"),
+            "git": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "dbs": {},
+    }
+    for db_path in dbs:
+        results["dbs"][db_path.name] = bench_db(db_path, workloads, max(1, args.repeat))
+
+    print_results(results)
+
+    out = args.output or RESULTS_DIR / f"{label}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nresults -> {out}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare_results(baseline, results)
+        regressions = print_comparison(rows, args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
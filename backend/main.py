@@ -1,8 +1,12 @@
 import os
 import sys
+import json
 import argparse
+import multiprocessing
 
-from src.pipeline import compile_and_run
+from src.pipeline import compile_and_run, explain_source, format_explain, profile_source
+from src.executor.executor import print_output
+from src.executor.output import FORMATS
 from src.common.errors import QuoteScriptError
 
 
@@ -27,13 +31,206 @@ def main() -> None:
         help="Path to data/ directory (overrides QUOTESCRIPT_DATA_DIR)",
     )
 
+    parser.add_argument(
+        "--param",
+        dest="params",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Bind the program's $NAME placeholder to VALUE (repeatable)",
+    )
+
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Stay running and answer JSON-lines requests "
+             '({"id": ..., "source": "..."}) on stdin/stdout',
+    )
+    parser.add_argument(
+        "--socket",
+        dest="socket_path",
+        help="With --serve: listen on this Unix socket instead of stdin/stdout",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="With --serve: requests executed at once (default: 4)",
+    )
+    parser.add_argument(
+        "--queue",
+        dest="max_pending",
+        type=int,
+        default=64,
+        help="With --serve: requests admitted (running or waiting) before new ones "
+             "are rejected as Overloaded (default: 64)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="With --serve: seconds a request may take, queueing included (default: no limit)",
+    )
+    parser.add_argument(
+        "--pool",
+        choices=["thread", "process"],
+        default="thread",
+        help="With --serve: run requests on worker threads or processes (default: thread)",
+    )
+
+    parser.add_argument(
+        "--batch",
+        dest="batch_target",
+        help="Run many programs: a directory of .qs files, a glob, or a manifest file",
+    )
+    parser.add_argument(
+        "--output",
+        dest="output_path",
+        help="With --batch: write JSON Lines results here instead of stdout",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Filter on N rowid shards in parallel worker processes (default: 1, in-process)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the in-memory filter result cache",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        help="Also keep filter results on disk in this directory (overrides QUOTESCRIPT_CACHE_DIR)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Run the program and report per-phase and per-filter timings on stderr",
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="Compile the program and show how it would run, without running it",
+    )
+    parser.add_argument(
+        "--format",
+        dest="output_format",
+        choices=FORMATS,
+        default="text",
+        help="Output format of the result rows (default: text)",
+    )
+    parser.add_argument(
+        "--profile-format",
+        choices=["text", "json"],
+        default="text",
+        help="Output format of --profile and --explain (default: text)",
+    )
+    parser.add_argument(
+        "--build-snapshot",
+        action="store_true",
+        help="Write a binary snapshot of the DB (with its indexes) for fast start-up, then exit",
+    )
+    parser.add_argument(
+        "--build-fts",
+        action="store_true",
+        help="Create/rebuild the FTS5 index used to push exact filters down to SQLite, then exit",
+    )
+
     args = parser.parse_args()
 
+    params = {}
+    for item in args.params:
+        name, sep, value = item.partition("=")
+        if not sep or not name:
+            parser.error(f"--param expects NAME=VALUE, got {item!r}")
+        params[name.lstrip("$")] = value
+
     if args.db_path:
         os.environ["QUOTESCRIPT_DB_PATH"] = args.db_path
     if args.data_dir:
         os.environ["QUOTESCRIPT_DATA_DIR"] = args.data_dir
 
+    cache_dir = args.cache_dir or os.getenv("QUOTESCRIPT_CACHE_DIR")
+    if args.no_cache or cache_dir:
+        from src.executor.cache import configure_result_cache
+
+        configure_result_cache(enabled=not args.no_cache, disk_dir=cache_dir)
+
+    if args.workers > 1:
+        from src.executor.parallel import configure_workers
+
+        configure_workers(args.workers)
+
+    if args.build_fts:
+        from src.common.db import get_db_path
+        from src.common.fts import build_fts
+
+        db_path = get_db_path()
+        try:
+            count = build_fts(db_path)
+        except QuoteScriptError as e:
+            print("QuoteScript error:", e, file=sys.stderr)
+            raise SystemExit(1)
+        print(f"FTS index built for {count} quotes in {db_path}")
+        return
+
+    if args.build_snapshot:
+        from src.common.db import get_db_path
+        from src.common.store import build_snapshot
+
+        db_path = get_db_path()
+        try:
+            path, count = build_snapshot(db_path)
+        except QuoteScriptError as e:
+            print("QuoteScript error:", e, file=sys.stderr)
+            raise SystemExit(1)
+        except OSError as e:
+            print(f"Error writing snapshot: {e}", file=sys.stderr)
+            raise SystemExit(1)
+        print(f"Snapshot of {count} quotes written to {path}")
+        return
+
+    if args.batch_target:
+        from src.batch import collect_scripts, run_batch
+
+        try:
+            scripts = collect_scripts(args.batch_target)
+            if args.output_path:
+                with open(args.output_path, "w", encoding="utf-8") as out:
+                    ok, failed = run_batch(scripts, out)
+            else:
+                ok, failed = run_batch(scripts)
+        except QuoteScriptError as e:
+            print("QuoteScript error:", e, file=sys.stderr)
+            raise SystemExit(1)
+        except OSError as e:
+            print(f"Error writing results: {e}", file=sys.stderr)
+            raise SystemExit(1)
+        print(f"Batch: {ok} succeeded, {failed} failed", file=sys.stderr)
+        if failed:
+            raise SystemExit(1)
+        return
+
+    if args.serve:
+        from src.server import serve_stdio, serve_unix
+        from src.service import QueryService
+
+        if args.pool == "process" and args.workers > 1:
+            parser.error("--pool process cannot be combined with --workers")
+        try:
+            service = QueryService(args.concurrency, args.max_pending, args.timeout, args.pool)
+            if args.socket_path:
+                serve_unix(args.socket_path, service)
+            else:
+                serve_stdio(service=service)
+        except QuoteScriptError as e:
+            print("QuoteScript error:", e, file=sys.stderr)
+            raise SystemExit(1)
+        except KeyboardInterrupt:
+            pass
+        return
+
     if not args.quotescript_file:
         print("Usage: quotescript_cli <quotescript_file>", file=sys.stderr)
         print("Example: quotescript_cli examples/example1.qs", file=sys.stderr)
@@ -52,7 +249,16 @@ def main() -> None:
         raise SystemExit(1)
 
     try:
-        compile_and_run(source)
+        if args.explain:
+            plan = explain_source(source)
+            print(json.dumps(plan, indent=2) if args.profile_format == "json" else format_explain(plan))
+        elif args.profile:
+            ir, rows, prof = profile_source(source, params)
+            print_output(ir, rows, args.output_format)
+            report = prof.format_json() if args.profile_format == "json" else prof.format_text()
+            print(report, file=sys.stderr)
+        else:
+            compile_and_run(source, params, args.output_format)
     except QuoteScriptError as e:
         print("QuoteScript error:", e, file=sys.stderr)
         raise SystemExit(1)
@@ -62,4 +268,6 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    # Needed for --workers in the frozen (PyInstaller) build.
+    multiprocessing.freeze_support()
     main()
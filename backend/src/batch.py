@@ -0,0 +1,128 @@
+import glob
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+
+from .lexer.lexer import Token, iter_file_tokens
+from .parser.parser import split_programs
+from .pipeline import compile_tokens, current_stats, error_record, execute_to_record
+from .common.errors import QuoteScriptError
+from .common.models import IR
+from .common.stats import CorpusStats
+from .common.store import get_store
+
+
+def collect_scripts(target: str) -> List[Path]:
+    """Resolve a batch target into the list of .qs files to run.
+
+    - a directory: every *.qs file below it (sorted)
+    - a glob pattern: every matching file (sorted)
+    - any other file: a manifest with one path per line; blank lines and
+      lines starting with '#' are ignored, relative paths are resolved
+      against the manifest's directory
+    """
+    path = Path(target)
+    if path.is_dir():
+        return sorted(p for p in path.rglob("*.qs") if p.is_file())
+
+    if glob.has_magic(target):
+        return sorted(Path(p) for p in glob.glob(target, recursive=True) if Path(p).is_file())
+
+    if not path.is_file():
+        raise QuoteScriptError(f"Batch target not found: {target}")
+
+    scripts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            entry = line.strip()
+            if not entry or entry.startswith("#"):
+                continue
+            p = Path(entry)
+            scripts.append(p if p.is_absolute() else path.parent / p)
+    return scripts
+
+
+def _compile_error(e: Exception) -> Dict[str, Any]:
+    if isinstance(e, QuoteScriptError):
+        return error_record("QuoteScriptError", str(e))
+    return error_record("UnexpectedError", str(e))
+
+
+def _compile_program(
+    n: Optional[int], tokens: List[Token], stats: Optional[CorpusStats]
+) -> Tuple[Optional[int], Optional[IR], Optional[Dict[str, Any]]]:
+    try:
+        return n, compile_tokens(tokens, stats), None
+    except Exception as e:
+        return n, None, _compile_error(e)
+
+
+def _iter_compiled_file(
+    path: Path,
+) -> Iterator[Tuple[Optional[int], Optional[IR], Optional[Dict[str, Any]]]]:
+    """(program number, IR, error record) for each program of one script.
+
+    The number is None for a script holding a single program. The file is
+    read, tokenized and compiled one program at a time (each program is
+    compiled once the next one has been read, to tell the two cases apart).
+    A program that fails to compile does not stop the others, but a
+    lexical error (e.g. an unterminated string) ends the file.
+    """
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except OSError as e:
+        yield None, None, error_record("OSError", f"Error reading file {str(path)!r}: {e}")
+        return
+    with f:
+        stats = current_stats()
+        programs = split_programs(iter_file_tokens(f))
+        n = 0
+        held: Optional[List[Token]] = None  # program n, not compiled yet
+        while True:
+            try:
+                tokens = next(programs)
+            except StopIteration:
+                break
+            except Exception as e:
+                if held is not None:
+                    yield _compile_program(n, held, stats)
+                yield (n + 1 if n else None), None, _compile_error(e)
+                return
+            if held is not None:
+                yield _compile_program(n, held, stats)
+            n += 1
+            held = tokens
+        yield _compile_program(n if n > 1 else None, held or [], stats)
+
+
+def run_batch(scripts: List[Path], out: IO[str] = sys.stdout) -> Tuple[int, int]:
+    """Run every program of every script against one loaded corpus, and
+    write one JSON line per program: {"script", "ok", "rows", "error"}
+    (plus "program", its 1-based number, for multi-program scripts).
+
+    Scripts are read, compiled and run one program at a time, so large
+    generated scripts are never held in memory as a whole. A failing program only
+    produces an error record; the rest still run. Returns (succeeded, failed).
+    """
+    # One corpus load for the whole batch (before compiling, so the optimizer
+    # can use its statistics). A missing DB is reported per script below.
+    try:
+        get_store().refresh()
+    except QuoteScriptError:
+        pass
+
+    ok = failed = 0
+    for path in scripts:
+        for n, ir, error in _iter_compiled_file(path):
+            record = error if ir is None else execute_to_record(ir)
+            if record["ok"]:
+                ok += 1
+            else:
+                failed += 1
+            head: Dict[str, Any] = {"script": str(path)}
+            if n is not None:
+                head["program"] = n
+            out.write(json.dumps({**head, **record}, ensure_ascii=False) + "\n")
+    out.flush()
+    return ok, failed
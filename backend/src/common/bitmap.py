@@ -0,0 +1,30 @@
+from typing import Iterable, Iterator
+
+
+# Row sets as Python int bitsets: bit i set <=> row position i is in the set.
+# AND / OR of two bitmaps are single C-level big-int operations.
+
+
+def from_positions(positions: Iterable[int], size: int) -> int:
+    """Build a bitmap from row positions in O(len(positions) + size / 8)."""
+    buf = bytearray((size + 7) // 8)
+    for p in positions:
+        buf[p >> 3] |= 1 << (p & 7)
+    return int.from_bytes(buf, "little")
+
+
+def iter_positions(bitmap: int, start: int = 0) -> Iterator[int]:
+    """Yield set bit positions >= start in increasing order (i.e. rowid order)."""
+    if not bitmap:
+        return
+    # bin() and str.find run in C; only set bits cost Python work.
+    bits = bin(bitmap)[:1:-1]
+    find = bits.find
+    i = find("1", start)
+    while i != -1:
+        yield i
+        i = find("1", i + 1)
+
+
+def count(bitmap: int) -> int:
+    return bitmap.bit_count()
@@ -0,0 +1,84 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional, TypeVar
+
+from .errors import QuoteScriptError
+
+
+# Row positions handed out between two cancellation checks.
+CHECK_EVERY = 1024
+
+T = TypeVar("T")
+
+
+class QueryCancelled(QuoteScriptError):
+    """The query was cancelled while it ran (e.g. its client went away)."""
+
+
+class QueryTimeout(QueryCancelled):
+    """The query ran past its deadline."""
+
+
+class CancelToken:
+    """Cancellation state of one running query.
+
+    Checked cooperatively: the executor calls `check` every CHECK_EVERY
+    candidate rows, so a long scan stops soon after `cancel` is called or
+    the deadline passes. The deadline is on the monotonic clock, which
+    worker processes on the same machine share.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = "Query cancelled") -> None:
+        self.reason = reason
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline (None without one)."""
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def check(self) -> None:
+        if self.reason is not None:
+            raise QueryCancelled(self.reason)
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise QueryTimeout("Query timed out")
+
+    def iter_checked(self, items: Iterable[T]) -> Iterator[T]:
+        """Yield `items`, checking for cancellation every CHECK_EVERY of them."""
+        it = iter(items)
+        while True:
+            self.check()
+            block = list(itertools.islice(it, CHECK_EVERY))
+            if not block:
+                return
+            yield from block
+
+
+_local = threading.local()
+
+
+def current_token() -> Optional[CancelToken]:
+    """The token of the query running on this thread, or None."""
+    return getattr(_local, "token", None)
+
+
+def check_cancelled() -> None:
+    """Raise QueryCancelled if the query running on this thread was cancelled."""
+    token = getattr(_local, "token", None)
+    if token is not None:
+        token.check()
+
+
+@contextmanager
+def cancellable(token: Optional[CancelToken]) -> Iterator[Optional[CancelToken]]:
+    """Make `token` the current thread's token inside the block."""
+    previous = getattr(_local, "token", None)
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
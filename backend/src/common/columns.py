@@ -0,0 +1,210 @@
+import threading
+from array import array
+from itertools import accumulate
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+from . import bitmap
+from .index import WordIndex
+from .matching import (
+    _normalize_case_and_spaces,
+    exact_pattern,
+    match_forgiving,
+    match_loose,
+    match_forgiving_norm,
+    match_loose_norm,
+)
+
+
+class TextColumn(Sequence):
+    """Strings stored as concatenated UTF-8 plus an offsets array.
+
+    Item i is decoded from buf[offsets[i]:offsets[i + 1]] on access. Used
+    for fields that are read rarely (only for output), where one Python
+    string per row would cost several times the text itself. `buf` can be
+    a growing bytearray or a read-only memoryview (see common.snapshot).
+    """
+
+    def __init__(
+        self,
+        buf: Optional[Union[bytearray, memoryview]] = None,
+        offsets: Optional[Sequence[int]] = None,
+    ):
+        self._buf = bytearray() if buf is None else buf
+        self._offsets = array("q", [0]) if offsets is None else offsets
+
+    def copy(self) -> "TextColumn":
+        """An appendable copy (also of a read-only, mapped column)."""
+        return TextColumn(bytearray(self._buf), array("q", self._offsets))
+
+    def append(self, value: str) -> None:
+        self._buf += value.encode("utf-8")  # type: ignore[operator]
+        self._offsets.append(len(self._buf))  # type: ignore[attr-defined]
+
+    def extend(self, values: Iterable[str]) -> None:
+        encoded = [v.encode("utf-8") for v in values]
+        start = self._offsets.pop()  # type: ignore[attr-defined]
+        self._offsets.extend(accumulate(map(len, encoded), initial=start))  # type: ignore[attr-defined]
+        self._buf += b"".join(encoded)  # type: ignore[operator]
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+            if i < 0:
+                raise IndexError("text column index out of range")
+        return str(self._buf[self._offsets[i]: self._offsets[i + 1]], "utf-8")
+
+
+class ValueColumn:
+    """Dictionary-encoded, low-cardinality column (authors, tags).
+
+    Each distinct value is stored once, with its normalized form and the
+    positions of the rows that carry it. A filter is evaluated once per
+    distinct value, and the matching values' rows are turned into a bitmap.
+    The word index over this column uses value ids as document ids.
+    """
+
+    def __init__(self, per_row_values: Iterable[Iterable[str]] = ()):
+        self.values: List[str] = []
+        self.norms: List[str] = []
+        self.rows: List[array] = []
+        self.size = 0
+        self._ids: Optional[Dict[str, int]] = {}
+        self._index: Optional[WordIndex] = None
+        self._index_loader: Optional[Callable[[], WordIndex]] = None
+        self._lock = threading.Lock()
+        for vals in per_row_values:
+            self.append(vals)
+
+    def append(self, vals: Iterable[str]) -> List[int]:
+        """Add one row carrying `vals`; returns their value ids.
+
+        A value seen before is not stored again, so repeated authors and
+        tags share one string.
+        """
+        ids = self._ids
+        if ids is None:
+            ids = self._ids = {v: vid for vid, v in enumerate(self.values)}
+        pos = self.size
+        out = []
+        for v in dict.fromkeys(vals):
+            vid = ids.get(v)
+            if vid is None:
+                vid = ids[v] = len(self.values)
+                self.values.append(v)
+                self.norms.append(_normalize_case_and_spaces(v))
+                self.rows.append(array("I"))
+                if self._index is not None:
+                    self._index.add_words(vid, self.norms[vid].split())
+            self.rows[vid].append(pos)
+            out.append(vid)
+        self.size = pos + 1
+        return out
+
+    @classmethod
+    def from_parts(
+        cls,
+        values: List[str],
+        rows: List[Sequence[int]],
+        size: int,
+        norms: Optional[List[str]] = None,
+        index_loader: Optional[Callable[[], WordIndex]] = None,
+    ) -> "ValueColumn":
+        """Column over already-encoded values (e.g. from a snapshot).
+
+        `rows[vid]` holds the positions of the rows carrying value `vid`;
+        `index_loader`, if given, supplies the word index instead of
+        building it on first use.
+        """
+        col = cls(())
+        col.values = values
+        col.rows = rows  # type: ignore[assignment]
+        col.size = size
+        col.norms = norms if norms is not None else [_normalize_case_and_spaces(v) for v in values]
+        col._ids = None
+        col._index_loader = index_loader
+        return col
+
+    def fork(self) -> "ValueColumn":
+        """A copy that rows can be appended to without changing this column."""
+        col = ValueColumn()
+        col.values = list(self.values)
+        col.norms = list(self.norms)
+        col.rows = [array("I", r) for r in self.rows]
+        col.size = self.size
+        col._ids = None
+        if self._index is not None or self._index_loader is not None:
+            col._index = self.word_index().fork()
+        return col
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def row_count(self, value_id: int) -> int:
+        return len(self.rows[value_id])
+
+    def word_index(self) -> WordIndex:
+        if self._index is None:
+            with self._lock:
+                if self._index is None and self._index_loader is not None:
+                    self._index = self._index_loader()
+                if self._index is None:
+                    index = WordIndex()
+                    for vid, norm in enumerate(self.norms):
+                        index.add_words(vid, norm.split())
+                    self._index = index
+        return self._index
+
+    def matching_values(self, query: str, tag: str) -> List[int]:
+        """Ids of the distinct values the filter (query, tag) accepts."""
+        if tag == "exact":
+            search = exact_pattern(query or "").search
+            return [vid for vid, v in enumerate(self.values) if search(v)]
+
+        m = self.word_index().lookup(query, tag)
+        if m is None:
+            # Nothing to resolve on the vocabulary; check every value.
+            match_raw = match_loose if tag == "loose" else match_forgiving
+            return [vid for vid, v in enumerate(self.values) if match_raw(v, query)]
+
+        match = match_loose_norm if tag == "loose" else match_forgiving_norm
+        query_norm = _normalize_case_and_spaces(query)
+        ids = set(m.docs)
+        ids.update(vid for vid in m.maybe if match(self.norms[vid], query_norm))
+        return sorted(ids)
+
+    def value_scores(self, query: str, tag: str) -> Dict[int, float]:
+        """`matching_values` with a score per value (see `WordIndex.lookup`).
+
+        Exact matches, values matched without the word index and verified
+        multi-word substring candidates score 1.0.
+        """
+        if tag == "exact":
+            return dict.fromkeys(self.matching_values(query, tag), 1.0)
+        m = self.word_index().lookup(query, tag, scored=True)
+        if m is None or m.scores is None:
+            return dict.fromkeys(self.matching_values(query, tag), 1.0)
+        match = match_loose_norm if tag == "loose" else match_forgiving_norm
+        query_norm = _normalize_case_and_spaces(query)
+        scores = dict(m.scores)
+        scores.update((vid, 1.0) for vid in m.maybe if match(self.norms[vid], query_norm))
+        return scores
+
+    def row_scores(self, value_scores: Dict[int, float]) -> Dict[int, float]:
+        """Best score of each row over the values it carries."""
+        out: Dict[int, float] = {}
+        # Lowest scores first, so a row keeps its best value's score.
+        for vid, score in sorted(value_scores.items(), key=lambda vs: vs[1]):
+            out.update(dict.fromkeys(self.rows[vid], score))
+        return out
+
+    def rows_bitmap(self, value_ids: Iterable[int]) -> int:
+        """Bitmap of rows carrying any of the given values."""
+        positions: List[int] = []
+        for vid in value_ids:
+            positions.extend(self.rows[vid])
+        return bitmap.from_positions(positions, self.size)
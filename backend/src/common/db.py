@@ -1,8 +1,14 @@
 import os
+import random
 import sys
 import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, ContextManager, Iterator, Optional, Sequence, Set, Tuple
+from urllib.parse import quote
 
 from .errors import QuoteScriptError
 
@@ -10,6 +16,7 @@ from .errors import QuoteScriptError
 _DB_REL = Path("data") / "db" / "quotes.db"
 
 
+@lru_cache(maxsize=None)
 def _base_dir() -> Path:
     """
     Returns the directory that should contain `data/`.
@@ -57,13 +64,12 @@ def get_db_path() -> Path:
     return candidate
 
 
-def load_quotes() -> List[Dict[str, Any]]:
-    """Load all quotes from the SQLite DB into memory as a list of dicts.
+QUOTE_FIELDS = ("_rowid", "id", "content", "author", "tags")
 
-    Returns rows in rowid order so that TOP behaves like 'first N by insertion'.
-    """
-    db_path = get_db_path()
+_FETCH_SIZE = 4096
 
+
+def _require_db(db_path: Path) -> None:
     if not db_path.exists():
         raise QuoteScriptError(
             "QuoteScript DB not found.\n"
@@ -73,13 +79,336 @@ def load_quotes() -> List[Dict[str, Any]]:
             "Fix: ship `data/db/quotes.db` next to the executable, OR set QUOTESCRIPT_DB_PATH."
         )
 
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT rowid AS _rowid, id, content, author, tags "
-        "FROM quotes ORDER BY rowid;"
-    )
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
+
+# Read connections kept open per DB file (see ConnectionPool).
+_POOL_SIZE = 4
+
+# Set on every pooled connection. Pages are memory-mapped, so they are shared
+# through the OS page cache by all connections and processes reading the file;
+# each connection also keeps a small private page cache.
+_PRAGMAS = (
+    "PRAGMA query_only = ON;",
+    "PRAGMA mmap_size = 268435456;",  # 256 MiB
+    "PRAGMA cache_size = -16384;",  # 16 MiB
+    "PRAGMA temp_store = MEMORY;",
+)
+
+
+class ConnectionPool:
+    """Read-only SQLite connections to one DB file, reused between queries.
+
+    Connections are opened once, from a `mode=ro` URI, with `_PRAGMAS` and
+    the `qs_row_checksum` function; sqlite3's per-connection statement
+    cache then keeps the SQL used here prepared. A connection serves one
+    caller at a time and must come back with no statement running, so no
+    read transaction (or WAL snapshot) outlives the query that needed it.
+    Idle connections are dropped when the file is replaced (new inode) and
+    before the process forks: SQLite connections must not cross a fork.
+    """
+
+    def __init__(self, db_path: Path, size: int = _POOL_SIZE):
+        self.db_path = Path(db_path)
+        self.size = size
+        self._idle: List[sqlite3.Connection] = []
+        self._file_id: Optional[Tuple[int, int]] = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        uri = f"file:{quote(self.db_path.as_posix())}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
+        conn.create_function("qs_row_checksum", 5, row_checksum, deterministic=True)
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Check a connection out for the duration of the block."""
+        try:
+            st = os.stat(self.db_path)
+        except OSError:
+            _require_db(self.db_path)
+            raise
+        file_id = (st.st_dev, st.st_ino)
+        with self._lock:
+            stale: List[sqlite3.Connection] = []
+            if file_id != self._file_id:
+                stale, self._idle = self._idle, []
+                self._file_id = file_id
+            conn = self._idle.pop() if self._idle else None
+        for old in stale:
+            old.close()
+        if conn is None:
+            conn = self._open()
+        try:
+            yield conn
+        finally:
+            self._release(conn, file_id)
+
+    def _release(self, conn: sqlite3.Connection, file_id: Tuple[int, int]) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if file_id == self._file_id and self._pid == os.getpid() and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        """Close the idle connections (checked-out ones close on return)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._file_id = None
+        for conn in idle:
+            conn.close()
+
+
+_pools: Dict[Path, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def read_connection(db_path: Path) -> ContextManager[sqlite3.Connection]:
+    """A pooled read-only connection to `db_path`, as a context manager.
+
+    All reads of the DB go through here; only `fts.build_fts` writes.
+    """
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(db_path, ConnectionPool(db_path))
+    return pool.connection()
+
+
+def close_connections() -> None:
+    """Close every pooled connection that is not in use."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=close_connections)
+
+
+def iter_batches(cur: sqlite3.Cursor) -> Iterator[Tuple[Any, ...]]:
+    """Stream a cursor's rows `_FETCH_SIZE` at a time, then close it."""
+    try:
+        while True:
+            batch = cur.fetchmany(_FETCH_SIZE)
+            if not batch:
+                break
+            yield from batch
+    finally:
+        cur.close()
+
+
+def iter_quotes(
+    db_path: Optional[Path] = None,
+    rowid_range: Optional[Tuple[Optional[int], Optional[int]]] = None,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+) -> Iterator[Tuple[Any, ...]]:
+    """Stream quotes from the SQLite DB as (rowid, id, content, author, tags) tuples.
+
+    Rows come in rowid order so that TOP behaves like 'first N by insertion',
+    fetched in batches so the table is never held in memory as a whole.
+    `rowid_range=(lo, hi)` restricts the load to lo <= rowid < hi (either
+    bound may be None); `offset` skips that many rows of the range and
+    `limit` stops after that many rows.
+    """
+    if db_path is None:
+        db_path = get_db_path()
+
+    lo, hi = rowid_range or (None, None)
+    where, params = [], []
+    if lo is not None:
+        where.append("rowid >= ?")
+        params.append(lo)
+    if hi is not None:
+        where.append("rowid < ?")
+        params.append(hi)
+    tail = ""
+    if limit is not None or offset:
+        # SQLite needs a LIMIT for OFFSET; -1 means none
+        tail = " LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset or 0]
+    with read_connection(db_path) as conn:
+        yield from iter_batches(conn.execute(
+            "SELECT rowid, id, content, author, tags FROM quotes "
+            + ("WHERE " + " AND ".join(where) + " " if where else "")
+            + "ORDER BY rowid" + tail + ";",
+            params,
+        ))
+
+
+def row_checksum(rowid: int, qid: Any, content: Any, author: Any, tags: Any) -> int:
+    """CRC32 of one quotes row (NULL fields count as '', as a Corpus stores them)."""
+    return zlib.crc32(f"{rowid}\0{qid}\0{content}\0{author}\0{tags}".encode("utf-8", "surrogatepass"))
+
+
+def count_rows(db_path: Path, lo: Optional[int], hi: int) -> int:
+    """Number of rows with lo <= rowid <= hi."""
+    with read_connection(db_path) as conn:
+        return conn.execute(
+            "SELECT count(*) FROM quotes WHERE rowid >= ? AND rowid <= ?;",
+            (lo if lo is not None else -(2 ** 63), hi),
+        ).fetchone()[0]
+
+
+def row_checksums(db_path: Path, rowids: Sequence[int]) -> Dict[int, int]:
+    """`row_checksum` of each of these rows still in the DB, by rowid."""
+    rowids = list(rowids)
+    out: Dict[int, int] = {}
+    with read_connection(db_path) as conn:
+        for i in range(0, len(rowids), _IN_BATCH):
+            in_list, params = _in_list(rowids[i: i + _IN_BATCH])
+            out.update(conn.execute(
+                "SELECT rowid, qs_row_checksum(rowid, ifnull(id, ''), ifnull(content, ''), "
+                "ifnull(author, ''), ifnull(tags, '')) FROM quotes WHERE rowid IN " + in_list + ";",
+                params,
+            ))
+    return out
+
+
+def load_quotes(
+    db_path: Optional[Path] = None,
+    rowid_range: Optional[Tuple[Optional[int], Optional[int]]] = None,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Load all quotes from the SQLite DB into memory as a list of dicts.
+
+    Same rows and order as `iter_quotes`. Most callers should go through
+    `common.store.get_store()` instead, which keeps the loaded corpus
+    around between queries in a compact columnar form.
+    """
+    return [dict(zip(QUOTE_FIELDS, rec)) for rec in iter_quotes(db_path, rowid_range, limit, offset)]
+
+
+# Rowids per `IN (...)` query, below SQLite's default host parameter limit.
+_IN_BATCH = 512
+
+
+def _in_list(rowids: Sequence[int]) -> Tuple[str, List[int]]:
+    """`IN (?, ...)` for the rowids, padded to a power-of-two length.
+
+    Repeating the last rowid changes nothing, and it keeps the number of
+    distinct statements (each prepared once per connection) small.
+    """
+    n = 8
+    while n < len(rowids):
+        n *= 2
+    params = list(rowids) + [rowids[-1]] * (n - len(rowids))
+    return "(" + ",".join("?" * n) + ")", params
+
+
+def _quotes_in(conn: sqlite3.Connection, rowids: List[int]) -> Dict[int, Dict[str, Any]]:
+    found: Dict[int, Dict[str, Any]] = {}
+    for i in range(0, len(rowids), _IN_BATCH):
+        in_list, params = _in_list(rowids[i: i + _IN_BATCH])
+        cur = conn.execute(
+            "SELECT rowid, id, content, author, tags FROM quotes WHERE rowid IN " + in_list + ";",
+            params,
+        )
+        for rec in iter_batches(cur):
+            found[rec[0]] = dict(zip(QUOTE_FIELDS, rec))
+    return found
+
+
+def _sample_of(conn: sqlite3.Connection, rowids: List[int], k: int) -> List[Dict[str, Any]]:
+    picked = random.sample(rowids, min(k, len(rowids)))
+    found = _quotes_in(conn, picked)
+    return [found[r] for r in picked if r in found]
+
+
+def sample_quotes(
+    db_path: Path,
+    k: int,
+    top: Optional[int] = None,
+    after: Optional[int] = None,
+    offset: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """k quotes picked uniformly at random (in random order), as dicts.
+
+    The pick is among the rows with a rowid above `after`, minus the first
+    `offset` of them, and with `top` among the first `top` rows left. Without
+    `top`, random rowids between the lowest candidate rowid and max(rowid)
+    are drawn and kept when the row exists, so only about k rows are read
+    when rowids are dense (the usual case for an append-only table). If too
+    many draws miss, the rowid list is read and sampled instead.
+    """
+    with read_connection(db_path) as conn:
+        # Lowest rowid of the window; rowid range lookups are b-tree seeks.
+        start = None if after is None else after + 1
+        where, params = ("WHERE rowid >= ? ", [start]) if start is not None else ("", [])
+        if offset:
+            first = conn.execute(
+                "SELECT rowid FROM quotes " + where + "ORDER BY rowid LIMIT 1 OFFSET ?;",
+                params + [offset],
+            ).fetchone()
+            if first is None:
+                return []
+            start = first[0]
+            where, params = "WHERE rowid >= ? ", [start]
+
+        if top is not None:
+            rowids = [r for (r,) in conn.execute(
+                "SELECT rowid FROM quotes " + where + "ORDER BY rowid LIMIT ?;", params + [top]
+            )]
+            return _sample_of(conn, rowids, k)
+
+        # Separate queries: SQLite only answers a lone min()/max() from the
+        # b-tree ends without scanning.
+        if start is None:
+            (lo,) = conn.execute("SELECT min(rowid) FROM quotes;").fetchone()
+        else:
+            first = conn.execute(
+                "SELECT rowid FROM quotes WHERE rowid >= ? ORDER BY rowid LIMIT 1;", (start,)
+            ).fetchone()
+            lo = None if first is None else first[0]
+        (hi,) = conn.execute("SELECT max(rowid) FROM quotes;").fetchone()
+        if lo is None or k <= 0:
+            return []
+        span = hi - lo + 1
+        budget = min(span, 4 * k + 16)
+        tried: Set[int] = set()
+        rows: List[Dict[str, Any]] = []
+        while len(rows) < k and len(tried) < budget:
+            batch: List[int] = []
+            want = min(2 * (k - len(rows)) + 8, budget - len(tried))
+            while len(batch) < want:
+                r = random.randrange(lo, hi + 1)
+                if r not in tried:
+                    tried.add(r)
+                    batch.append(r)
+            found = _quotes_in(conn, batch)
+            # Keep draw order: the first k existing rows drawn are a uniform sample.
+            rows.extend(found[r] for r in batch if r in found)
+        if len(rows) >= k or len(tried) == span:
+            return rows[:k]
+
+        rowids = [r for (r,) in conn.execute("SELECT rowid FROM quotes WHERE rowid >= ?;", (lo,))]
+        return _sample_of(conn, rowids, k)
+
+
+def shard_boundaries(db_path: Path, shards: int) -> List[Optional[int]]:
+    """Split the table into `shards` contiguous rowid ranges of ~equal size.
+
+    Returns shards + 1 boundaries b, shard i covering b[i] <= rowid < b[i+1];
+    the first and last are None (unbounded) so appended rows land in the
+    last shard.
+    """
+    with read_connection(db_path) as conn:
+        (total,) = conn.execute("SELECT count(*) FROM quotes;").fetchone()
+        bounds: List[Optional[int]] = [None]
+        for i in range(1, shards):
+            row = conn.execute(
+                "SELECT rowid FROM quotes ORDER BY rowid LIMIT 1 OFFSET ?;",
+                (total * i // shards,),
+            ).fetchone()
+            if row is not None and (bounds[-1] is None or row[0] > bounds[-1]):
+                bounds.append(row[0])
+        bounds.append(None)
+    return bounds
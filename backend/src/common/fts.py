@@ -0,0 +1,124 @@
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .db import QUOTE_FIELDS, iter_batches, read_connection
+from .errors import QuoteScriptError
+from .models import FilterIR
+
+
+FTS_TABLE = "quotes_fts"
+
+# QuoteScript field -> column of the quotes table / FTS table
+FTS_COLUMNS = {"quote": "content", "author": "author", "theme": "tags"}
+
+_CREATE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}
+USING fts5(content, author, tags, content='quotes', content_rowid='rowid');
+
+CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON quotes BEGIN
+  INSERT INTO {FTS_TABLE}(rowid, content, author, tags)
+  VALUES (new.rowid, new.content, new.author, new.tags);
+END;
+
+CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON quotes BEGIN
+  INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content, author, tags)
+  VALUES ('delete', old.rowid, old.content, old.author, old.tags);
+END;
+
+CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON quotes BEGIN
+  INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content, author, tags)
+  VALUES ('delete', old.rowid, old.content, old.author, old.tags);
+  INSERT INTO {FTS_TABLE}(rowid, content, author, tags)
+  VALUES (new.rowid, new.content, new.author, new.tags);
+END;
+"""
+
+
+def build_fts(db_path: Path) -> int:
+    """Create (or rebuild) the FTS5 index over the quotes table.
+
+    The index is an external-content table kept in sync by triggers, so it
+    only needs rebuilding if the quotes table was changed with the triggers
+    absent. Returns the number of indexed rows. This is the only write to
+    the DB; every read goes through `db.read_connection`.
+    """
+    if not Path(db_path).exists():
+        raise QuoteScriptError(f"QuoteScript DB not found: {db_path}")
+    conn = sqlite3.connect(str(db_path))
+    try:
+        conn.executescript(_CREATE)
+        conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild');")
+        conn.commit()
+        (count,) = conn.execute("SELECT count(*) FROM quotes;").fetchone()
+    except sqlite3.OperationalError as e:
+        raise QuoteScriptError(f"Could not build FTS index (is FTS5 available?): {e}")
+    finally:
+        conn.close()
+    return count
+
+
+def has_fts(db_path: Path) -> bool:
+    if not Path(db_path).exists():
+        return False
+    try:
+        with read_connection(db_path) as conn:
+            row = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;", (FTS_TABLE,)
+            ).fetchone()
+    except sqlite3.Error:
+        return False
+    return row is not None
+
+
+def _phrase(value: str) -> Optional[str]:
+    # FTS5's unicode61 tokenizer indexes letters and digits only; a value
+    # without any has no tokens and cannot be pushed down.
+    if not any(ch.isalnum() for ch in value):
+        return None
+    return '"' + value.replace('"', '""') + '"'
+
+
+def fts_query(filters: Iterable[FilterIR]) -> Optional[str]:
+    """FTS5 MATCH expression that every row matching the filters satisfies.
+
+    Each exact filter becomes a column-restricted phrase; the FTS tokenizer
+    is case-insensitive, so it over-approximates QuoteScript's case-sensitive
+    word-boundary match and candidates must be re-checked. Filters that
+    cannot be expressed are left out; returns None if none can.
+    """
+    terms = []
+    for f in filters:
+        if f.tag != "exact":
+            continue
+        phrase = _phrase(f.value)
+        if phrase is not None:
+            terms.append(f"{FTS_COLUMNS[f.field]} : {phrase}")
+    return " AND ".join(terms) if terms else None
+
+
+def match_rowids(db_path: Path, expr: str) -> List[int]:
+    """Rowids of the rows matching an FTS expression, in rowid order."""
+    with read_connection(db_path) as conn:
+        cur = conn.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ? ORDER BY rowid;", (expr,)
+        )
+        return [r[0] for r in cur]
+
+
+def iter_match_rows(db_path: Path, expr: str, after: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Stream the full quote rows matching an FTS expression, in rowid order.
+
+    With `after`, only rows with a higher rowid.
+    """
+    with read_connection(db_path) as conn:
+        cur = conn.execute(
+            "SELECT q.rowid, q.id, q.content, q.author, q.tags "
+            f"FROM {FTS_TABLE} JOIN quotes AS q ON q.rowid = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH ?"
+            + (f" AND {FTS_TABLE}.rowid > ?" if after is not None else "")
+            + " ORDER BY q.rowid;",
+            (expr,) if after is None else (expr, after),
+        )
+        for rec in iter_batches(cur):
+            yield dict(zip(QUOTE_FIELDS, rec))
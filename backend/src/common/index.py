@@ -0,0 +1,421 @@
+import math
+import threading
+from bisect import bisect_left
+from array import array
+from collections import ChainMap, OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+
+from .matching import SIMILARITY_THRESHOLD, _normalize_case_and_spaces, _similarity_at_least, _stem
+
+
+# Words are whitespace-split, so a control character is a safe pad.
+_PAD = "\0"
+_Q = 3
+
+
+def _padded_grams(word: str) -> Dict[str, int]:
+    """Multiset of padded character trigrams of `word`."""
+    s = _PAD * (_Q - 1) + word + _PAD * (_Q - 1)
+    grams: Dict[str, int] = {}
+    for i in range(len(s) - _Q + 1):
+        g = s[i: i + _Q]
+        grams[g] = grams.get(g, 0) + 1
+    return grams
+
+
+def _inner_grams(s: str) -> Set[str]:
+    return {s[i: i + _Q] for i in range(len(s) - _Q + 1)}
+
+
+class FieldMatch(NamedTuple):
+    """Docs accepted by a fuzzy filter, as resolved on the vocabulary."""
+    docs: Set[int]   # certainly match
+    maybe: Set[int]  # multi-word substring candidates; need the row matcher
+    # With lookup(scored=True): best word score of each doc in `docs`
+    scores: Optional[Dict[int, float]] = None
+
+
+class PackedIndex(NamedTuple):
+    """A WordIndex flattened into sorted keys plus offset and value arrays.
+
+    Each table maps its i-th key to values[offsets[i]:offsets[i + 1]]:
+    - postings: vocab word -> doc ids
+    - grams: padded trigram -> vocab word ids, with their counts
+    - lengths: word length -> vocab word ids
+    """
+    vocab: List[str]
+    offsets: Sequence[int]
+    docs: Sequence[int]
+    grams: List[str]
+    gram_offsets: Sequence[int]
+    gram_words: Sequence[int]
+    gram_counts: Sequence[int]
+    lengths: List[int]
+    length_offsets: Sequence[int]
+    length_words: Sequence[int]
+
+
+# array typecodes of the PackedIndex fields that are arrays (others are lists).
+PACKED_TYPECODES = {
+    "offsets": "q", "docs": "I",
+    "gram_offsets": "q", "gram_words": "I", "gram_counts": "I",
+    "length_offsets": "q", "length_words": "I",
+}
+
+
+class _PackedTable(Mapping):
+    """Read-only mapping over sorted keys and an offsets array.
+
+    Lookups bisect the keys; values are only decoded when a key is read,
+    so opening a table over a mapped snapshot costs nothing up front.
+    """
+
+    def __init__(self, keys: Sequence, offsets: Sequence[int]):
+        self._keys = keys
+        self._offsets = offsets
+
+    def _span(self, key) -> Tuple[int, int]:
+        i = bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            raise KeyError(key)
+        return self._offsets[i], self._offsets[i + 1]
+
+    def __iter__(self) -> Iterator:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            self._span(key)
+        except (KeyError, TypeError):
+            return False
+        return True
+
+
+class PackedPostings(_PackedTable):
+    def __init__(self, vocab: List[str], offsets: Sequence[int], docs: Sequence[int]):
+        super().__init__(vocab, offsets)
+        self.vocab = vocab
+        self._docs = docs
+
+    def __getitem__(self, word: str) -> Set[int]:
+        a, b = self._span(word)
+        return set(self._docs[a:b])
+
+    def doc_counts(self) -> Dict[str, int]:
+        offsets = self._offsets
+        return {w: offsets[i + 1] - offsets[i] for i, w in enumerate(self.vocab)}
+
+
+class _PackedGrams(_PackedTable):
+    def __init__(self, packed: PackedIndex):
+        super().__init__(packed.grams, packed.gram_offsets)
+        self._vocab = packed.vocab
+        self._words = packed.gram_words
+        self._counts = packed.gram_counts
+
+    def __getitem__(self, gram: str) -> Dict[str, int]:
+        a, b = self._span(gram)
+        vocab = self._vocab
+        return dict(zip([vocab[i] for i in self._words[a:b]], self._counts[a:b]))
+
+
+class _PackedLengths(_PackedTable):
+    def __init__(self, packed: PackedIndex):
+        super().__init__(packed.lengths, packed.length_offsets)
+        self._vocab = packed.vocab
+        self._words = packed.length_words
+
+    def __getitem__(self, length: int) -> List[str]:
+        a, b = self._span(length)
+        vocab = self._vocab
+        return [vocab[i] for i in self._words[a:b]]
+
+
+def _layered(table: Mapping) -> ChainMap:
+    """A new writable layer over `table`, whose values become read-only.
+
+    Layers between the new one and the base are merged, so repeated forks
+    keep the chain three deep at most.
+    """
+    if isinstance(table, ChainMap):
+        *upper, base = table.maps
+        merged: Dict[Any, Any] = {}
+        for layer in reversed(upper):
+            merged.update(layer)
+        return ChainMap({}, merged, base)
+    return ChainMap({}, table)
+
+
+def _own(table: ChainMap, key: Any, copy: Callable[..., Any]) -> Any:
+    """`table[key]` in the top layer, copied there (or created) on first write."""
+    top = table.maps[0]
+    value = top.get(key)
+    if value is None:
+        base = table.get(key)
+        value = top[key] = copy() if base is None else copy(base)
+    return value
+
+
+class WordIndex:
+    """Inverted index over the normalized words of one text column.
+
+    - `postings` maps each normalized word (the same `.split()` tokens the
+      matchers look at) to the set of document ids containing it.
+    - A padded trigram index over the vocabulary finds words that contain a
+      substring, or that may be similar to a query, without comparing the
+      query against every distinct word.
+
+    `lookup()` evaluates a forgiving/loose query once per distinct word
+    instead of once per occurrence, and remembers the matching word sets of
+    recent (query, tag) pairs in a bounded LRU cache.
+    """
+
+    CACHE_SIZE = 512
+
+    def __init__(self) -> None:
+        self.postings: Dict[str, Set[int]] = {}
+        self._grams: Dict[str, Dict[str, int]] = {}
+        self._by_length: Dict[int, Set[str]] = {}
+        self._sorted_vocab: Optional[List[str]] = None
+        self._word_cache: "OrderedDict[Tuple[str, str], Tuple[Dict[str, float], FrozenSet[str]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Bumped (under _cache_lock) whenever the vocabulary grows
+        self._vocab_version = 0
+
+    def __len__(self) -> int:
+        return len(self.postings)
+
+    def doc_counts(self) -> Dict[str, int]:
+        """Number of documents containing each vocabulary word."""
+        postings = self.postings
+        layers = postings.maps if isinstance(postings, ChainMap) else [postings]
+        counts: Dict[str, int] = {}
+        for layer in reversed(layers):
+            if isinstance(layer, PackedPostings):
+                counts.update(layer.doc_counts())
+            else:
+                counts.update((w, len(docs)) for w, docs in layer.items())
+        return counts
+
+    def pack(self) -> PackedIndex:
+        """Flatten the index for a snapshot (see `from_packed`)."""
+        vocab = sorted(self.postings)
+        word_ids = {w: i for i, w in enumerate(vocab)}
+        offsets, docs = array("q", [0]), array("I")
+        for w in vocab:
+            docs.extend(sorted(self.postings[w]))
+            offsets.append(len(docs))
+        grams = sorted(self._grams)
+        gram_offsets, gram_words, gram_counts = array("q", [0]), array("I"), array("I")
+        for g in grams:
+            for w, c in sorted(self._grams[g].items()):
+                gram_words.append(word_ids[w])
+                gram_counts.append(c)
+            gram_offsets.append(len(gram_words))
+        lengths = sorted(self._by_length)
+        length_offsets, length_words = array("q", [0]), array("I")
+        for n in lengths:
+            length_words.extend(sorted(word_ids[w] for w in self._by_length[n]))
+            length_offsets.append(len(length_words))
+        return PackedIndex(
+            vocab, offsets, docs, grams, gram_offsets, gram_words, gram_counts,
+            lengths, length_offsets, length_words,
+        )
+
+    @classmethod
+    def from_packed(cls, packed: PackedIndex) -> "WordIndex":
+        """Read-only index over the tables produced by `pack`."""
+        index = cls()
+        index.postings = PackedPostings(packed.vocab, packed.offsets, packed.docs)  # type: ignore[assignment]
+        index._grams = _PackedGrams(packed)  # type: ignore[assignment]
+        index._by_length = _PackedLengths(packed)  # type: ignore[assignment]
+        index._sorted_vocab = packed.vocab
+        return index
+
+    def fork(self) -> "WordIndex":
+        """A copy that can be added to without changing this index.
+
+        The copy's tables are layered over this index's (see `_layered`);
+        a posting set or gram table is copied up the first time it changes.
+        """
+        index = WordIndex()
+        index.postings = _layered(self.postings)  # type: ignore[assignment]
+        index._grams = _layered(self._grams)  # type: ignore[assignment]
+        index._by_length = _layered(self._by_length)  # type: ignore[assignment]
+        return index
+
+    def add_words(self, doc_id: int, words: Iterable[str]) -> None:
+        """Index already-normalized words under `doc_id`."""
+        postings = self.postings
+        if isinstance(postings, ChainMap):
+            for word in set(words):
+                if word not in postings:
+                    self._add_word(word)
+                _own(postings, word, set).add(doc_id)
+            return
+        for word in set(words):
+            docs = self.postings.get(word)
+            if docs is None:
+                self.postings[word] = {doc_id}
+                self._add_word(word)
+            else:
+                docs.add(doc_id)
+
+    def _add_word(self, word: str) -> None:
+        if isinstance(self._grams, ChainMap):
+            for g, c in _padded_grams(word).items():
+                _own(self._grams, g, dict)[word] = c
+            _own(self._by_length, len(word), set).add(word)  # type: ignore[arg-type]
+        else:
+            for g, c in _padded_grams(word).items():
+                self._grams.setdefault(g, {})[word] = c
+            self._by_length.setdefault(len(word), set()).add(word)
+        self._sorted_vocab = None
+        with self._cache_lock:
+            self._vocab_version += 1
+            self._word_cache.clear()
+
+    # --- vocabulary lookups -------------------------------------------------
+
+    def words_containing(self, s: str) -> Set[str]:
+        """Vocabulary words that contain `s` as a substring."""
+        if len(s) < _Q:
+            return {w for w in self.postings if s in w}
+        found: Optional[Set[str]] = None
+        for g in _inner_grams(s):
+            words = self._grams.get(g)
+            if not words:
+                return set()
+            found = set(words) if found is None else found.intersection(words)
+            if not found:
+                return set()
+        return {w for w in (found or ()) if s in w}
+
+    def words_with_prefix(self, prefix: str) -> List[str]:
+        """Vocabulary words starting with `prefix`."""
+        if self._sorted_vocab is None:
+            self._sorted_vocab = sorted(self.postings)
+        vocab = self._sorted_vocab
+        out = []
+        i = bisect_left(vocab, prefix)
+        while i < len(vocab) and vocab[i].startswith(prefix):
+            out.append(vocab[i])
+            i += 1
+        return out
+
+    def similar_words(self, query: str, threshold: float = SIMILARITY_THRESHOLD) -> Dict[str, float]:
+        """Vocabulary words w with `_similar(w, query) >= threshold`, with that ratio.
+
+        Candidates come from count filtering on padded trigrams: a ratio of at
+        least `threshold` bounds the indel distance d between the strings, and
+        strings within d edits share at least max(len) + Q - 1 - d * Q padded
+        Q-grams. Length buckets where that bound is not positive are scanned.
+        """
+        la = len(query)
+        if la == 0:
+            return {}
+
+        counts: Dict[str, int] = {}
+        for g, qc in _padded_grams(query).items():
+            for w, wc in self._grams.get(g, {}).items():
+                counts[w] = counts.get(w, 0) + min(qc, wc)
+
+        out: Dict[str, float] = {}
+        for lb in self._by_length:
+            if 2.0 * min(la, lb) / (la + lb) < threshold:
+                continue
+            words = self._by_length[lb]
+            max_dist = math.floor((1.0 - threshold) * (la + lb) + 1e-9)
+            need = max(la, lb) + _Q - 1 - max_dist * _Q
+            if need <= 0:
+                pool: Iterable[str] = words
+            else:
+                pool = (w for w in words if counts.get(w, 0) >= need)
+            for w in pool:
+                ratio = _similarity_at_least(w, query, threshold)
+                if ratio is not None:
+                    out[w] = ratio
+        return out
+
+    # --- document lookups ---------------------------------------------------
+
+    def docs_for(self, words: Iterable[str]) -> Set[int]:
+        out: Set[int] = set()
+        for w in words:
+            out |= self.postings.get(w, set())
+        return out
+
+    def doc_scores(self, word_scores: Dict[str, float]) -> Dict[int, float]:
+        """Best score of each document over the given scored words."""
+        out: Dict[int, float] = {}
+        # Lowest scores first, so a document keeps its best word's score.
+        for w, score in sorted(word_scores.items(), key=lambda ws: ws[1]):
+            docs = self.postings.get(w)
+            if docs:
+                out.update(dict.fromkeys(docs, score))
+        return out
+
+    def matching_words(self, query_norm: str, tag: str) -> Tuple[Dict[str, float], FrozenSet[str]]:
+        """Resolve a normalized forgiving/loose query against the vocabulary.
+
+        Returns (words, substring_words): the words whose documents match
+        outright, each with its score, and, for multi-word queries, the words
+        whose documents may contain the query as a substring (checked per row
+        by the caller). A word holding the query (or, for loose, starting
+        with one of its stems) scores 1.0; a word that is only similar scores
+        its similarity ratio. The result is cached; do not modify it.
+        """
+        key = (query_norm, tag)
+        with self._cache_lock:
+            hit = self._word_cache.get(key)
+            if hit is not None:
+                self._word_cache.move_to_end(key)
+                return hit
+            version = self._vocab_version
+
+        words: Dict[str, float] = {}
+        substring_words: Set[str] = set()
+        tokens = query_norm.split()
+        if tag == "loose":
+            for st in {_stem(w) for w in tokens if w}:
+                if st:
+                    for w, ratio in self.similar_words(st).items():
+                        words[w] = max(ratio, words.get(w, 0.0))
+                    words.update(dict.fromkeys(self.words_with_prefix(st), 1.0))
+        else:
+            words.update(self.similar_words(query_norm))
+        if len(tokens) == 1:
+            # A single token is a substring of the text iff some word holds it.
+            words.update(dict.fromkeys(self.words_containing(query_norm), 1.0))
+        else:
+            substring_words = self.words_containing(max(tokens, key=len))
+
+        result = (words, frozenset(substring_words.difference(words)))
+        with self._cache_lock:
+            # Not cached if words were added meanwhile: it may miss them.
+            if version == self._vocab_version:
+                self._word_cache[key] = result
+                if len(self._word_cache) > self.CACHE_SIZE:
+                    self._word_cache.popitem(last=False)
+        return result
+
+    def lookup(self, query: str, tag: str, scored: bool = False) -> Optional[FieldMatch]:
+        """Docs matching a 'forgiving' or 'loose' query (None = cannot resolve).
+
+        With `scored`, also the score of each doc in `docs` (see `doc_scores`),
+        from the similarity ratios computed while matching.
+        """
+        query_norm = _normalize_case_and_spaces(query or "")
+        if not query_norm:
+            return None
+        words, substring_words = self.matching_words(query_norm, tag)
+        if scored:
+            scores: Optional[Dict[int, float]] = self.doc_scores(words)
+            docs = set(scores)  # type: ignore[arg-type]
+        else:
+            scores = None
+            docs = self.docs_for(words)
+        return FieldMatch(docs=docs, maybe=self.docs_for(substring_words) - docs, scores=scores)
@@ -2,7 +2,12 @@
 import re
 import difflib
 import ast
-from typing import List
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
+
+
+# Minimum difflib ratio for two words to count as "the same" in fuzzy modes.
+SIMILARITY_THRESHOLD = 0.8
 
 
 def _normalize_spaces(s: str) -> str:
@@ -18,31 +23,84 @@ def match_exact(field: str, query: str) -> bool:
 
     Uses word boundaries so 'Freedom' does not match 'Freedoms'.
     """
-    field = field or ""
-    query = query or ""
-    pattern = r"\b" + re.escape(query) + r"\b"
-    return re.search(pattern, field) is not None
+    return exact_pattern(query or "").search(field or "") is not None
+
+
+@lru_cache(maxsize=1024)
+def exact_pattern(query: str) -> "re.Pattern[str]":
+    """Compiled form of `match_exact(_, query)`, for checking many fields."""
+    return re.compile(r"\b" + re.escape(query) + r"\b")
+
+
+class PreparedQuery(NamedTuple):
+    """A filter value with everything its matcher needs precomputed."""
+    value: str
+    tag: str
+    norm: str                      # case- and space-normalized value
+    pattern: "re.Pattern[str]"     # `exact_pattern(value)`
+
+
+@lru_cache(maxsize=1024)
+def prepare_query(value: str, tag: str) -> PreparedQuery:
+    """The PreparedQuery of one (value, tag); repeated values are not recomputed."""
+    return PreparedQuery(value, tag, _normalize_case_and_spaces(value), exact_pattern(value))
 
 
 def _similar(a: str, b: str) -> float:
     return difflib.SequenceMatcher(None, a, b).ratio()
 
 
+def _similar_at_least(a: str, b: str, threshold: float = SIMILARITY_THRESHOLD) -> bool:
+    """Same decision as `_similar(a, b) >= threshold`, but gives up early."""
+    return _similarity_at_least(a, b, threshold) is not None
+
+
+def _similarity_at_least(a: str, b: str, threshold: float = SIMILARITY_THRESHOLD) -> Optional[float]:
+    """`_similar(a, b)` if it is at least `threshold`, else None.
+
+    Checks the upper bounds difflib itself offers, cheapest first, and only
+    builds a SequenceMatcher when both of them can still reach the threshold:
+    - length bound (real_quick_ratio): matches <= min(len(a), len(b))
+    - character multiset bound (quick_ratio): matches <= shared characters
+    """
+    total = len(a) + len(b)
+    if not total:
+        return 1.0 if 1.0 >= threshold else None
+    if 2.0 * min(len(a), len(b)) / total < threshold:
+        return None
+
+    avail: Dict[str, int] = {}
+    for ch in b:
+        avail[ch] = avail.get(ch, 0) + 1
+    shared = 0
+    for ch in a:
+        n = avail.get(ch, 0)
+        if n > 0:
+            avail[ch] = n - 1
+            shared += 1
+    if 2.0 * shared / total < threshold:
+        return None
+
+    ratio = difflib.SequenceMatcher(None, a, b).ratio()
+    return ratio if ratio >= threshold else None
+
+
 def match_forgiving(field: str, query: str) -> bool:
     """Forgiving matching: case-insensitive, tolerant of spacing and small misspellings."""
     if not field or not query:
         return False
+    return match_forgiving_norm(_normalize_case_and_spaces(field), _normalize_case_and_spaces(query))
 
-    field_norm = _normalize_case_and_spaces(field)
-    query_norm = _normalize_case_and_spaces(query)
 
+def match_forgiving_norm(field_norm: str, query_norm: str) -> bool:
+    """`match_forgiving` on text that is already case- and space-normalized."""
     # Direct substring first
     if query_norm in field_norm:
         return True
 
     # Then approximate per-word similarity
     for word in field_norm.split():
-        if _similar(word, query_norm) >= 0.8:
+        if _similarity_at_least(word, query_norm) is not None:
             return True
     return False
 
@@ -60,10 +118,11 @@ def match_loose(field: str, query: str) -> bool:
     """Loose matching: forgiving plus basic morphology (same root, etc.)."""
     if not field or not query:
         return False
+    return match_loose_norm(_normalize_case_and_spaces(field), _normalize_case_and_spaces(query))
 
-    field_norm = _normalize_case_and_spaces(field)
-    query_norm = _normalize_case_and_spaces(query)
 
+def match_loose_norm(field_norm: str, query_norm: str) -> bool:
+    """`match_loose` on text that is already case- and space-normalized."""
     # Forgiving baseline
     if query_norm in field_norm:
         return True
@@ -75,7 +134,7 @@ def match_loose(field: str, query: str) -> bool:
     for fw in field_words:
         fw_norm = fw.lower()
         for st in stems:
-            if st and (fw_norm.startswith(st) or _similar(fw_norm, st) >= 0.8):
+            if st and (fw_norm.startswith(st) or _similarity_at_least(fw_norm, st) is not None):
                 return True
     return False
 
@@ -1,20 +1,27 @@
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, Optional, List
 
+from .matching import PreparedQuery
+
 
 @dataclass
 class FilterNode:
     kind: str          # 'quote' / 'author' / 'theme'
     value: str         # unquoted string content
     tag: Optional[str] # canonical tag: 'exact' / 'forgiving' / 'loose'
+    param: Optional[str] = None  # placeholder name for `$name` values
 
 
 @dataclass
 class SelectionNode:
-    # TOP M and/or RANDOM N
+    # TOP M and/or RANDOM N, optionally ordered by relevance (RANK), paged
+    # with OFFSET K and/or a rowid cursor AFTER R
     top: Optional[int] = None
     random: Optional[int] = None
+    rank: bool = False
+    offset: Optional[int] = None
+    after: Optional[int] = None
 
 
 @dataclass
@@ -30,15 +37,25 @@ class FilterIR:
     field: str   # 'quote', 'author', 'theme'
     value: str
     tag: str     # 'exact' / 'forgiving' / 'loose'
+    param: Optional[str] = None  # unbound `$name` placeholder (value is "")
+    # Compiled regex / normalized value, attached by the optimizer
+    matcher: Optional[PreparedQuery] = field(default=None, compare=False, repr=False)
 
 
 @dataclass
 class SelectionIR:
     top: Optional[int]
     random: Optional[int]
+    rank: bool = False
+    offset: Optional[int] = None  # matches skipped before TOP / RANDOM
+    after: Optional[int] = None   # only rows with a higher rowid (cursor)
 
 
 @dataclass
 class IR:
     filters: List[FilterIR]
     selection: SelectionIR
+
+    def params(self) -> List[str]:
+        """Names of the placeholders still waiting for a value."""
+        return [f.param for f in self.filters if f.param is not None]
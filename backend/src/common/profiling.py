@@ -0,0 +1,152 @@
+import json
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from . import index, matching
+
+
+class FilterProfile:
+    """What one ABOVE filter cost during execution.
+
+    A filter can act in two stages: resolved up front into a row set
+    ("index" stage, e.g. a column bitmap or word-index lookup) and/or
+    checked row by row ("check" stage). Counts are rows in -> rows out.
+    """
+
+    def __init__(self, source: Any, label: str, method: str):
+        self.source = source
+        self.label = label
+        self.method = method
+        self.index_in: Optional[int] = None
+        self.index_out: Optional[int] = None
+        self.index_time = 0.0
+        self.checked = 0
+        self.passed = 0
+        self.check_time = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "filter": self.label,
+            "method": self.method,
+            "index": None if self.index_in is None else {
+                "rows_in": self.index_in, "rows_out": self.index_out, "ms": self.index_time * 1e3,
+            },
+            "check": None if not self.checked else {
+                "rows_in": self.checked, "rows_out": self.passed, "ms": self.check_time * 1e3,
+            },
+        }
+
+
+class Profile:
+    """Measurements collected for one query while profiling is on."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.strategy: Optional[str] = None
+        self.rows_loaded = 0
+        self.load_time = 0.0
+        self.load_source: Optional[str] = None
+        self.corpus_rows: Optional[int] = None
+        self.result_rows: Optional[int] = None
+        self.filters: List[FilterProfile] = []
+        self.similarity_calls = 0
+        self.similarity_matches = 0
+
+    def add_filter(self, source: Any, label: str, method: str) -> FilterProfile:
+        fp = FilterProfile(source, label, method)
+        self.filters.append(fp)
+        return fp
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "phases_ms": {name: t * 1e3 for name, t in self.phases.items()},
+            "total_ms": sum(self.phases.values()) * 1e3,
+            "strategy": self.strategy,
+            "rows_loaded": self.rows_loaded,
+            "load_ms": self.load_time * 1e3,
+            "load_source": self.load_source,
+            "corpus_rows": self.corpus_rows,
+            "result_rows": self.result_rows,
+            "filters": [f.to_dict() for f in self.filters],
+            "similarity": {"calls": self.similarity_calls, "matches": self.similarity_matches},
+        }
+
+    def format_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def format_text(self) -> str:
+        lines = ["=== PROFILE ==="]
+        lines.append(f"strategy : {self.strategy or '-'}")
+        phases = "  ".join(f"{name} {t * 1e3:.3f}" for name, t in self.phases.items())
+        lines.append(f"phases   : {phases}  (total {sum(self.phases.values()) * 1e3:.3f} ms)")
+        lines.append(
+            f"rows     : loaded {self.rows_loaded} ({self.load_time * 1e3:.1f} ms"
+            f"{', from ' + self.load_source if self.load_source else ''}), "
+            f"corpus {'-' if self.corpus_rows is None else self.corpus_rows}, "
+            f"result {'-' if self.result_rows is None else self.result_rows}"
+        )
+        if self.filters:
+            lines.append("filters  :")
+        for i, f in enumerate(self.filters, 1):
+            parts = []
+            if f.index_in is not None:
+                parts.append(f"index {f.index_in} -> {f.index_out} rows in {f.index_time * 1e3:.3f} ms")
+            if f.checked:
+                parts.append(f"checks {f.checked} -> {f.passed} rows in {f.check_time * 1e3:.3f} ms")
+            lines.append(f"  {i}. {f.label}  [{f.method}]")
+            if parts:
+                lines.append("     " + "; ".join(parts))
+        lines.append(f"similarity: {self.similarity_calls} calls, {self.similarity_matches} matches")
+        return "\n".join(lines)
+
+
+_active: Optional[Profile] = None
+
+
+def get_profile() -> Optional[Profile]:
+    """The profile being collected, or None when profiling is off."""
+    return _active
+
+
+@contextmanager
+def profiling() -> Iterator[Profile]:
+    """Collect a Profile for the code run inside the block.
+
+    Instrumentation is only installed here: the similarity kernel is
+    swapped for a counting wrapper and restored afterwards, and the
+    pipeline/executor hooks check `get_profile()` once per phase or filter,
+    never per row. Profiling is process-wide; use it for one query at a time.
+    """
+    global _active
+    prof = Profile()
+    original = matching._similarity_at_least
+
+    def counting(a: str, b: str, threshold: float = matching.SIMILARITY_THRESHOLD) -> Optional[float]:
+        prof.similarity_calls += 1
+        ratio = original(a, b, threshold)
+        if ratio is not None:
+            prof.similarity_matches += 1
+        return ratio
+
+    matching._similarity_at_least = counting
+    index._similarity_at_least = counting
+    _active = prof
+    try:
+        yield prof
+    finally:
+        _active = None
+        matching._similarity_at_least = original
+        index._similarity_at_least = original
+
+
+def timed_phase(name: str, fn: Callable[..., Any], *args: Any) -> Any:
+    """Run one pipeline phase, recording its wall time when profiling."""
+    prof = _active
+    if prof is None:
+        return fn(*args)
+    t0 = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        prof.phases[name] = prof.phases.get(name, 0.0) + time.perf_counter() - t0
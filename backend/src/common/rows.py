@@ -0,0 +1,69 @@
+from collections.abc import Mapping, Sequence
+from typing import Any, Callable, Dict, Iterator
+
+from .db import QUOTE_FIELDS
+
+
+class Row(Mapping):
+    """Read-only view of one quote row of a Corpus.
+
+    Behaves like the dict rows used to (`row["content"]`, `row.get(...)`,
+    `dict(row)`), but only holds the corpus and a position; each field is
+    read from the corpus columns on access. Pickling (e.g. to send rows
+    between processes) produces a plain dict.
+    """
+
+    __slots__ = ("_getters", "_pos")
+
+    def __init__(self, getters: Dict[str, Callable[[int], Any]], pos: int):
+        self._getters = getters
+        self._pos = pos
+
+    def __getitem__(self, key: str) -> Any:
+        return self._getters[key](self._pos)
+
+    # Mapping's defaults go through __getitem__ and a KeyError for missing
+    # keys; result writers probe for "_score" on every row.
+    def __contains__(self, key: object) -> bool:
+        return key in self._getters
+
+    def get(self, key: str, default: Any = None) -> Any:
+        getter = self._getters.get(key)
+        return default if getter is None else getter(self._pos)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(QUOTE_FIELDS)
+
+    def __len__(self) -> int:
+        return len(QUOTE_FIELDS)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+    def __repr__(self) -> str:
+        return f"Row({dict(self)!r})"
+
+
+class RowsView(Sequence):
+    """The rows of a Corpus as a sequence of Row views, in rowid order."""
+
+    def __init__(self, getters: Dict[str, Callable[[int], Any]], size: Callable[[], int]):
+        self._getters = getters
+        self._size = size
+
+    def __len__(self) -> int:
+        return self._size()
+
+    def __getitem__(self, pos):  # type: ignore[override]
+        if isinstance(pos, slice):
+            return [Row(self._getters, p) for p in range(*pos.indices(len(self)))]
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError("row position out of range")
+        return Row(self._getters, pos)
+
+    def __iter__(self) -> Iterator[Row]:
+        getters = self._getters
+        for pos in range(len(self)):
+            yield Row(getters, pos)
@@ -0,0 +1,231 @@
+import json
+import marshal
+import mmap
+import os
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .columns import TextColumn, ValueColumn
+from .index import PACKED_TYPECODES, PackedIndex, WordIndex
+
+
+# File layout:
+#   MAGIC | u64 header length | JSON header | sections (each 8-byte aligned)
+# The header records the format version, the Python/marshal versions and
+# byte order the file was written with, the source DB fingerprint and where
+# each section lives. Integer sections are native arrays read through
+# memoryviews on the mapped file; text sections are concatenated UTF-8 with
+# an offsets array; lists and dicts are marshalled.
+MAGIC = b"QSNAP\0\0\1"
+VERSION = 1
+SUFFIX = ".snap"
+
+_TEXT_FIELDS = ("id", "content", "content_norm", "tags")
+
+
+def snapshot_path(db_path: Path) -> Path:
+    """Where the snapshot of `db_path` lives: next to it, with SUFFIX added."""
+    return Path(str(db_path) + SUFFIX)
+
+
+def _environment() -> Dict[str, Any]:
+    return {
+        "version": VERSION,
+        "python": list(sys.version_info[:2]),
+        "marshal": marshal.version,
+        "byteorder": sys.byteorder,
+    }
+
+
+def _db_key(fp: Optional[Tuple[Any, ...]]) -> Optional[List[Any]]:
+    # The fingerprint without the path, so a DB and its snapshot can be
+    # moved together.
+    return list(fp[1:]) if fp else None
+
+
+class SnapshotParts(NamedTuple):
+    """Everything `Corpus.from_parts` needs, read from a snapshot."""
+    rowids: Sequence[int]
+    ids: TextColumn
+    content: TextColumn
+    content_norm: TextColumn
+    tags: TextColumn
+    author_ids: Sequence[int]
+    authors: ValueColumn
+    themes: ValueColumn
+    content_index_loader: Callable[[], WordIndex]
+
+
+class _Writer:
+    def __init__(self) -> None:
+        self.sections: Dict[str, List[int]] = {}
+        self.chunks: List[bytes] = []
+        self.size = 0
+
+    def add(self, name: str, data: bytes) -> None:
+        self.sections[name] = [self.size, len(data)]
+        self.chunks.append(data)
+        pad = -len(data) % 8
+        if pad:
+            self.chunks.append(b"\0" * pad)
+        self.size += len(data) + pad
+
+    def add_text(self, name: str, values: Sequence[str]) -> None:
+        offsets = array("q", [0])
+        parts = []
+        total = 0
+        for v in values:
+            b = (v or "").encode("utf-8")
+            parts.append(b)
+            total += len(b)
+            offsets.append(total)
+        self.add(name + ".text", b"".join(parts))
+        self.add(name + ".offsets", offsets.tobytes())
+
+    def add_column(self, name: str, col: ValueColumn) -> None:
+        offsets = array("q", [0])
+        positions = array("I")
+        for rows in col.rows:
+            positions.extend(rows)
+            offsets.append(len(positions))
+        self.add(name + ".values", marshal.dumps(list(col.values)))
+        self.add(name + ".norms", marshal.dumps(list(col.norms)))
+        self.add(name + ".pos", positions.tobytes())
+        self.add(name + ".pos_offsets", offsets.tobytes())
+        self.add_index(name + ".index", col.word_index())
+
+    def add_index(self, name: str, index: WordIndex) -> None:
+        packed = index.pack()
+        for field in PackedIndex._fields:
+            value = getattr(packed, field)
+            data = value.tobytes() if field in PACKED_TYPECODES else marshal.dumps(value)
+            self.add(f"{name}.{field}", data)
+
+
+def write_snapshot(corpus: Any, fp: Optional[Tuple[Any, ...]], out: Path) -> Path:
+    """Write `corpus` (a loaded Corpus) and its indexes to `out`.
+
+    `fp` is the fingerprint of the DB the corpus was loaded from; the
+    snapshot is only used while the DB still has it.
+    """
+    w = _Writer()
+    w.add("rowids", array("q", corpus.rowids).tobytes())
+    w.add_text("id", corpus.ids)
+    w.add_text("content", corpus.content)
+    w.add_text("content_norm", corpus.content_norm)
+    w.add_text("tags", corpus.tags)
+    w.add("authors.row_ids", array("I", corpus.author_ids).tobytes())
+    w.add_column("authors", corpus.authors)
+    w.add_column("themes", corpus.themes)
+    w.add_index("content.index", corpus.word_index("quote"))
+
+    header = dict(_environment(), db=_db_key(fp), rows=len(corpus), sections=w.sections)
+    header_bytes = json.dumps(header).encode("utf-8")
+    header_bytes += b" " * (-(len(MAGIC) + 8 + len(header_bytes)) % 8)
+
+    out = Path(out)
+    tmp = out.with_name(out.name + f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header_bytes).to_bytes(8, "little"))
+        f.write(header_bytes)
+        for chunk in w.chunks:
+            f.write(chunk)
+    os.replace(tmp, out)
+    return out
+
+
+def _read_header(mm: mmap.mmap) -> Optional[Tuple[Dict[str, Any], int]]:
+    if mm[: len(MAGIC)] != MAGIC:
+        return None
+    n = int.from_bytes(mm[len(MAGIC): len(MAGIC) + 8], "little")
+    start = len(MAGIC) + 8
+    try:
+        header = json.loads(mm[start: start + n])
+    except ValueError:
+        return None
+    return header, start + n
+
+
+def load_snapshot(
+    db_path: Path,
+    fp: Optional[Tuple[Any, ...]],
+    stale_ok: bool = False,
+) -> Optional[Tuple[bool, SnapshotParts]]:
+    """Map the snapshot of `db_path` if it is valid for the DB's fingerprint `fp`.
+
+    Returns (current, parts), or None (and the caller falls back to SQLite)
+    when there is no snapshot, or it was written by an incompatible Python.
+    A snapshot written for another version of the DB is only returned, with
+    current=False, if `stale_ok` is set: the caller must then check it
+    against the DB before using it.
+    Indexes are read on first use.
+    """
+    path = snapshot_path(db_path)
+    if fp is None or not path.is_file():
+        return None
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    found = _read_header(mm)
+    if found is None:
+        return None
+    header, base = found
+    env = _environment()
+    if any(header.get(k) != v for k, v in env.items()):
+        return None
+    current = header.get("db") == _db_key(fp)
+    if not current and not stale_ok:
+        return None
+
+    view = memoryview(mm)
+    sections = header["sections"]
+
+    def raw(name: str) -> memoryview:
+        off, n = sections[name]
+        return view[base + off: base + off + n]
+
+    def ints(name: str, fmt: str) -> Sequence[int]:
+        return raw(name).cast(fmt)
+
+    def obj(name: str) -> Any:
+        return marshal.loads(raw(name))
+
+    def index_loader(name: str) -> Callable[[], WordIndex]:
+        def load() -> WordIndex:
+            return WordIndex.from_packed(PackedIndex(*(
+                ints(f"{name}.{field}", PACKED_TYPECODES[field]) if field in PACKED_TYPECODES
+                else obj(f"{name}.{field}")
+                for field in PackedIndex._fields
+            )))
+        return load
+
+    def column(name: str, size: int) -> ValueColumn:
+        offsets = ints(name + ".pos_offsets", "q")
+        pos = ints(name + ".pos", "I")
+        values = obj(name + ".values")
+        rows = [pos[offsets[i]: offsets[i + 1]] for i in range(len(values))]
+        return ValueColumn.from_parts(values, rows, size, obj(name + ".norms"), index_loader(name + ".index"))
+
+    try:
+        n_rows = header["rows"]
+        rowids = ints("rowids", "q")
+        text = {name: TextColumn(raw(name + ".text"), ints(name + ".offsets", "q")) for name in _TEXT_FIELDS}
+        return current, SnapshotParts(
+            rowids=rowids,
+            ids=text["id"],
+            content=text["content"],
+            content_norm=text["content_norm"],
+            tags=text["tags"],
+            author_ids=ints("authors.row_ids", "I"),
+            authors=column("authors", n_rows),
+            themes=column("themes", n_rows),
+            content_index_loader=index_loader("content.index"),
+        )
+    except (KeyError, TypeError, ValueError, EOFError):
+        # Truncated or malformed file: ignore it like a stale one.
+        return None
@@ -0,0 +1,27 @@
+from dataclasses import dataclass, field
+from typing import Dict
+
+
+@dataclass
+class FieldStats:
+    # Number of rows that contain each normalized word in this field.
+    doc_freq: Dict[str, int] = field(default_factory=dict)
+    # Average number of words per row (how much text a row-level check scans).
+    avg_words: float = 0.0
+    # Number of distinct values (authors / tags); 0 for free text.
+    distinct_values: int = 0
+
+
+@dataclass
+class CorpusStats:
+    """Corpus statistics used by the optimizer to order filters."""
+    rows: int
+    fields: Dict[str, FieldStats]
+
+    def doc_freq(self, field_name: str, word: str) -> int:
+        fs = self.fields.get(field_name)
+        return fs.doc_freq.get(word, 0) if fs else 0
+
+    def avg_words(self, field_name: str) -> float:
+        fs = self.fields.get(field_name)
+        return fs.avg_words if fs else 1.0
@@ -0,0 +1,503 @@
+import itertools
+import os
+import random
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Sequence, Tuple
+
+from .db import count_rows, get_db_path, iter_quotes, row_checksum, row_checksums
+from .columns import TextColumn, ValueColumn
+from .fts import has_fts
+from .index import WordIndex
+from .matching import _normalize_case_and_spaces, parse_tags_field
+from .profiling import get_profile
+from .rows import RowsView
+from .snapshot import load_snapshot, snapshot_path, write_snapshot
+from .stats import CorpusStats, FieldStats
+
+
+Fingerprint = Tuple[Any, ...]
+
+# Records taken from the row iterator at a time while loading.
+_LOAD_BATCH = 4096
+
+# Rows compared with the DB before appending to a loaded corpus (see
+# `QuoteStore._unchanged`): the last _CHECK_TAIL plus _CHECK_SAMPLE at random.
+_CHECK_TAIL = 64
+_CHECK_SAMPLE = 64
+
+
+def db_fingerprint(db_path: Path) -> Optional[Fingerprint]:
+    """Cheap change detector for the DB file: path, size and mtime.
+
+    The `-wal` sidecar is included as well, since writes in WAL mode only
+    touch the main file at checkpoint time.
+    """
+    try:
+        st = os.stat(db_path)
+    except OSError:
+        return None
+    fp: Fingerprint = (str(db_path), st.st_size, st.st_mtime_ns)
+    try:
+        wal = os.stat(str(db_path) + "-wal")
+        fp += (wal.st_size, wal.st_mtime_ns)
+    except OSError:
+        pass
+    return fp
+
+
+class Corpus:
+    """One loaded copy of the quotes table, stored column by column.
+
+    Rows are not kept as dicts: each field lives in its own column and
+    `rows` hands out light `Row` views over them. Repeated values are
+    stored once:
+    - `tags` / author names: one shared string per distinct value
+    - `ids`: packed UTF-8 (see columns.TextColumn), only read for output
+    Loading only fills these raw columns. What queries derive from them is
+    built on first use, one column at a time, and kept:
+    - `authors` / `themes`: dictionary-encoded author and (parsed) tag
+      columns, so AUTHOR/THEME filters run once per distinct value;
+      `author_ids` maps each row to its author value
+    - `content_norm`: case- and space-normalized quote text, for fuzzy
+      QUOTE filters and the word index over content
+    A snapshot (see common.snapshot) stores all of them already built.
+
+    `row_checksums` lets a store compare rows it holds with the DB, to
+    only load the rows appended since (see `QuoteStore.refresh`).
+    """
+
+    def __init__(self, records: Iterable[Sequence[Any]] = (), db_path: Optional[Path] = None):
+        self.db_path = db_path
+        # Fingerprint of the DB this copy was loaded from (set by QuoteStore)
+        self.fingerprint: Optional[Fingerprint] = None
+        self.rowids: Sequence[int] = array("q")
+        self.ids: Sequence[str] = TextColumn()
+        self.content: Sequence[str] = []
+        self.tags: Sequence[str] = []
+        self._author_names: Optional[List[str]] = []
+        self._author_ids: Optional[Sequence[int]] = None
+        self._authors: Optional[ValueColumn] = None
+        self._themes: Optional[ValueColumn] = None
+        self._content_norm: Optional[Sequence[str]] = None
+        self._content_index: Optional[WordIndex] = None
+        self._content_index_loader: Optional[Callable[[], WordIndex]] = None
+        self._stats: Optional[CorpusStats] = None
+        self._has_fts: Optional[bool] = None
+        self._lock = threading.RLock()
+        self.source = "sqlite"
+        self._bind_rows()
+        self.extend(records)
+
+    @classmethod
+    def from_parts(
+        cls,
+        rowids: Sequence[int],
+        ids: Sequence[str],
+        content: Sequence[str],
+        content_norm: Sequence[str],
+        tags: Sequence[str],
+        author_ids: Sequence[int],
+        authors: ValueColumn,
+        themes: ValueColumn,
+        db_path: Optional[Path] = None,
+        content_index_loader: Optional[Callable[[], WordIndex]] = None,
+    ) -> "Corpus":
+        """Corpus over prebuilt columns (see common.snapshot)."""
+        corpus = cls((), db_path)
+        corpus.rowids = rowids
+        corpus.ids = ids
+        corpus.content = content
+        corpus._content_norm = content_norm
+        corpus.tags = tags
+        corpus._author_names = None
+        corpus._author_ids = author_ids
+        corpus._authors = authors
+        corpus._themes = themes
+        corpus._content_index_loader = content_index_loader
+        corpus._bind_rows()
+        return corpus
+
+    def extended(self, records: Iterable[Sequence[Any]]) -> "Corpus":
+        """A new Corpus holding these rows plus `records` (see `extend`).
+
+        This corpus is left as it is, since queries may still be reading it.
+        Columns are copied (as appendable arrays/lists); derived columns and
+        word indexes that exist already are forked and added to, not rebuilt.
+        """
+        corpus = Corpus((), self.db_path)
+        corpus.rowids = array("q", self.rowids)
+        corpus.ids = _copy_column(self.ids)
+        corpus.content = _copy_column(self.content)
+        corpus.tags = _copy_column(self.tags)
+        corpus._author_names = None if self._author_names is None else list(self._author_names)
+        if self._authors is not None:
+            corpus._author_ids = array("I", self._author_ids)  # type: ignore[arg-type]
+            corpus._authors = self._authors.fork()
+        if self._themes is not None:
+            corpus._themes = self._themes.fork()
+        if self._content_norm is not None:
+            corpus._content_norm = _copy_column(self._content_norm)
+        if self._content_index is not None or self._content_index_loader is not None:
+            corpus._content_index = self.word_index("quote").fork()
+        corpus._has_fts = self._has_fts
+        corpus.source = self.source
+        corpus._bind_rows()
+        corpus.extend(records)
+        return corpus
+
+    def _author_getter(self) -> Callable[[int], str]:
+        if self._author_names is not None:
+            return self._author_names.__getitem__
+        authors, author_ids = self.authors.values, self.author_ids
+        return lambda pos: authors[author_ids[pos]]
+
+    def _bind_rows(self) -> None:
+        getters = {
+            "_rowid": self.rowids.__getitem__,
+            "id": self.ids.__getitem__,
+            "content": self.content.__getitem__,
+            "author": self._author_getter(),
+            "tags": self.tags.__getitem__,
+        }
+        self.rows = RowsView(getters, self.__len__)
+
+    def extend(self, records: Iterable[Sequence[Any]]) -> None:
+        """Append (rowid, id, content, author, tags) records, in rowid order.
+
+        Records are consumed a fetch batch at a time (see `db.iter_quotes`),
+        so the table is never held twice. Derived columns and the content
+        word index are only updated if they are built already.
+        """
+        rowids, ids, content, tags = self.rowids, self.ids, self.content, self.tags
+        # One shared string per distinct author / tags value
+        shared: Dict[str, str] = {}
+        parsed_tags: Dict[str, Tuple[str, ...]] = {}
+        it = iter(records)
+        while True:
+            batch = list(itertools.islice(it, _LOAD_BATCH))
+            if not batch:
+                break
+            start = len(rowids)
+            b_rowids, b_ids, b_content, b_authors, b_tags = zip(*batch)
+            if None in b_ids or None in b_content or None in b_authors or None in b_tags:
+                b_ids, b_content, b_authors, b_tags = (
+                    [v or "" for v in col] for col in (b_ids, b_content, b_authors, b_tags)
+                )
+            b_authors = [shared.setdefault(v, v) for v in b_authors]
+            b_tags = [shared.setdefault(v, v) for v in b_tags]
+            rowids.extend(b_rowids)  # type: ignore[attr-defined]
+            ids.extend(b_ids)  # type: ignore[attr-defined]
+            content.extend(b_content)  # type: ignore[attr-defined]
+            tags.extend(b_tags)  # type: ignore[attr-defined]
+            if self._author_names is not None:
+                self._author_names.extend(b_authors)
+            if self._authors is not None:
+                self._author_ids.extend(self._authors.append((a,))[0] for a in b_authors)  # type: ignore[union-attr]
+            if self._themes is not None:
+                _append_themes(self._themes, b_tags, parsed_tags)
+            index = self._content_index
+            if self._content_norm is not None or index is not None:
+                norms = [_normalize_case_and_spaces(t) for t in b_content]
+                if self._content_norm is not None:
+                    self._content_norm.extend(norms)  # type: ignore[attr-defined]
+                if index is not None:
+                    for pos, norm in enumerate(norms, start):
+                        index.add_words(pos, norm.split())
+        self._stats = None
+
+    @property
+    def content_norm(self) -> Sequence[str]:
+        """Case- and space-normalized content, one per row (built on first use)."""
+        if self._content_norm is None:
+            with self._lock:
+                if self._content_norm is None:
+                    self._content_norm = [_normalize_case_and_spaces(t) for t in self.content]
+        return self._content_norm
+
+    @property
+    def authors(self) -> ValueColumn:
+        """Dictionary-encoded author column (built on first use)."""
+        if self._authors is None:
+            with self._lock:
+                if self._authors is None:
+                    names = self._author_names or []
+                    value_ids: Dict[str, int] = {}
+                    author_ids = array("I", [value_ids.setdefault(a, len(value_ids)) for a in names])
+                    rows = [array("I") for _ in value_ids]
+                    for pos, vid in enumerate(author_ids):
+                        rows[vid].append(pos)
+                    self._author_ids = author_ids
+                    self._authors = ValueColumn.from_parts(list(value_ids), rows, len(names))
+        return self._authors
+
+    @property
+    def author_ids(self) -> Sequence[int]:
+        """Author value id of each row (see `authors`)."""
+        if self._author_ids is None:
+            self.authors
+        return self._author_ids  # type: ignore[return-value]
+
+    @property
+    def themes(self) -> ValueColumn:
+        """Dictionary-encoded column of the parsed tags (built on first use)."""
+        if self._themes is None:
+            with self._lock:
+                if self._themes is None:
+                    themes = ValueColumn()
+                    _append_themes(themes, self.tags, {})
+                    self._themes = themes
+        return self._themes
+
+    def row_checksums(self, positions: Iterable[int]) -> List[int]:
+        """`db.row_checksum` of the rows at these positions."""
+        rowids, ids, content, tags = self.rowids, self.ids, self.content, self.tags
+        author = self._author_getter()
+        return [row_checksum(rowids[p], ids[p], content[p], author(p), tags[p]) for p in positions]
+
+    def last_rowid(self) -> Optional[int]:
+        return self.rowids[-1] if len(self.rowids) else None
+
+    def __len__(self) -> int:
+        return len(self.rowids)
+
+    def positions_of(self, rowids: Iterable[int]) -> List[int]:
+        """Row positions of the given rowids (rowids not in this corpus are skipped)."""
+        out = []
+        for rowid in rowids:
+            pos = bisect_left(self.rowids, rowid)
+            if pos < len(self.rowids) and self.rowids[pos] == rowid:
+                out.append(pos)
+        return out
+
+    def iter_positions_of(self, rowids: Iterable[int]) -> Iterator[int]:
+        """Lazy `positions_of` for ascending rowids (each search starts past the last hit)."""
+        all_rowids = self.rowids
+        n = len(all_rowids)
+        lo = 0
+        for rowid in rowids:
+            lo = bisect_left(all_rowids, rowid, lo)
+            if lo < n and all_rowids[lo] == rowid:
+                yield lo
+
+    def has_fts(self) -> bool:
+        """Whether the source DB has the FTS5 index (see common.fts)."""
+        if self._has_fts is None:
+            self._has_fts = self.db_path is not None and has_fts(self.db_path)
+        return self._has_fts
+
+    def column(self, field: str) -> ValueColumn:
+        """The dictionary-encoded column behind 'author' or 'theme'."""
+        return self.authors if field == "author" else self.themes
+
+    def stats(self) -> CorpusStats:
+        """Word document frequencies, text lengths and value cardinalities."""
+        if self._stats is None:
+            n = len(self)
+            fields = {}
+            for name in ("quote", "author", "theme"):
+                index = self.word_index(name)
+                if name == "quote":
+                    doc_freq = index.doc_counts()
+                    distinct = 0
+                else:
+                    col = self.column(name)
+                    doc_freq = {
+                        w: sum(col.row_count(vid) for vid in vids)
+                        for w, vids in index.postings.items()
+                    }
+                    distinct = len(col)
+                fields[name] = FieldStats(
+                    doc_freq=doc_freq,
+                    avg_words=(sum(doc_freq.values()) / n) if n else 0.0,
+                    distinct_values=distinct,
+                )
+            self._stats = CorpusStats(rows=n, fields=fields)
+        return self._stats
+
+    def word_index(self, field: str) -> WordIndex:
+        """Inverted word index for 'quote', 'author' or 'theme' (built lazily).
+
+        Document ids are row positions for 'quote' and value ids of the
+        dictionary-encoded column for 'author' / 'theme'.
+        """
+        if field != "quote":
+            return self.column(field).word_index()
+        if self._content_index is None:
+            with self._lock:
+                if self._content_index is None and self._content_index_loader is not None:
+                    self._content_index = self._content_index_loader()
+                if self._content_index is None:
+                    index = WordIndex()
+                    for pos, text in enumerate(self.content_norm):
+                        index.add_words(pos, text.split())
+                    self._content_index = index
+        return self._content_index
+
+
+class QuoteStore:
+    """Long-lived, in-process copy of the quotes corpus.
+
+    The corpus is loaded once and shared across queries. Every access checks
+    the DB fingerprint and reloads only when the file actually changed (or
+    when the resolved DB path changed, e.g. via QUOTESCRIPT_DB_PATH).
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        rowid_range: Optional[Tuple[Optional[int], Optional[int]]] = None,
+    ):
+        self._fixed_path = Path(db_path) if db_path is not None else None
+        # Restrict to one rowid shard (parallel execution workers).
+        self.rowid_range = rowid_range
+        self._corpus = Corpus()
+        self._fingerprint: Optional[Fingerprint] = None
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def db_path(self) -> Path:
+        return self._fixed_path if self._fixed_path is not None else get_db_path()
+
+    def is_stale(self) -> bool:
+        return self._fingerprint is None or db_fingerprint(self.db_path) != self._fingerprint
+
+    def refresh(self) -> bool:
+        """Bring the corpus up to date if the DB changed. Returns True if it did.
+
+        When the rows already loaded still seem to be in the DB unchanged
+        (see `_unchanged`), only the rows appended since are loaded and
+        added to the columns and indexes. Anything else (deletes, updates,
+        a different DB) reloads in full.
+        """
+        db_path = self.db_path
+        fp = db_fingerprint(db_path)
+        if self._fingerprint is not None and fp == self._fingerprint:
+            return False
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock.
+            if self._fingerprint is not None and fp == self._fingerprint:
+                return False
+            self._load(db_path, fp)
+        return True
+
+    def _load(self, db_path: Path, fp: Optional[Fingerprint]) -> None:
+        t0 = time.perf_counter()
+        old = self._corpus if self._fingerprint is not None else None
+        corpus = self._catch_up(old, db_path) if old is not None and old.db_path == db_path else None
+        if corpus is not None:
+            source = "incremental"
+            loaded = len(corpus) - len(old)  # type: ignore[arg-type]
+        else:
+            corpus = self._load_full(db_path, fp)
+            source = corpus.source
+            loaded = len(corpus)
+        prof = get_profile()
+        if prof is not None:
+            prof.rows_loaded += loaded
+            prof.load_time += time.perf_counter() - t0
+            prof.load_source = source
+        corpus.fingerprint = fp
+        self._corpus = corpus
+        self._fingerprint = fp
+        self.generation += 1
+
+    def _load_full(self, db_path: Path, fp: Optional[Fingerprint]) -> Corpus:
+        # A snapshot is mapped instead of querying SQLite (whole-table
+        # stores only; shards always query). One written before rows were
+        # appended to the DB is still used if its rows check out.
+        parts = load_snapshot(db_path, fp, stale_ok=True) if self.rowid_range is None else None
+        if parts is not None:
+            current, parts = parts
+            corpus = Corpus.from_parts(**parts._asdict(), db_path=db_path)
+            corpus.source = "snapshot"
+            if current:
+                return corpus
+            caught_up = self._catch_up(corpus, db_path)
+            if caught_up is not None:
+                caught_up.source = "snapshot + incremental"
+                return caught_up
+        return Corpus(iter_quotes(db_path, self.rowid_range), db_path)
+
+    def _catch_up(self, corpus: Corpus, db_path: Path) -> Optional[Corpus]:
+        """`corpus` plus the rows appended to the DB since, if its rows are unchanged."""
+        last = corpus.last_rowid()
+        if last is None or not self._unchanged(corpus, db_path):
+            return None
+        hi = self.rowid_range[1] if self.rowid_range else None
+        return corpus.extended(iter_quotes(db_path, (last + 1, hi)))
+
+    def _unchanged(self, corpus: Corpus, db_path: Path) -> bool:
+        """Whether the DB still holds `corpus`'s rows, as far as a bounded check tells.
+
+        The DB must hold as many rows up to the corpus' last rowid, which
+        catches deletes and back-filled rows, and the last _CHECK_TAIL rows
+        plus _CHECK_SAMPLE random ones must have the same `db.row_checksum`,
+        which catches updates near the end; an update elsewhere is only
+        caught if the sample hits it. Apart from SQLite counting the rows,
+        the cost does not grow with the corpus.
+        """
+        n = len(corpus)
+        lo = self.rowid_range[0] if self.rowid_range else None
+        if count_rows(db_path, lo, corpus.rowids[-1]) != n:
+            return False
+        checked = set(range(max(0, n - _CHECK_TAIL), n))
+        checked.update(random.sample(range(n), min(_CHECK_SAMPLE, n)))
+        positions = sorted(checked)
+        rowids = [corpus.rowids[p] for p in positions]
+        return row_checksums(db_path, rowids) == dict(zip(rowids, corpus.row_checksums(positions)))
+
+    def corpus(self) -> Corpus:
+        """The current corpus (refreshing first if needed).
+
+        Hold on to the returned object for the duration of a query: a reload
+        swaps in a new Corpus rather than mutating this one.
+        """
+        self.refresh()
+        return self._corpus
+
+    def clear(self) -> None:
+        self._corpus = Corpus()
+        self._fingerprint = None
+
+
+def _copy_column(col: Sequence[Any]) -> Any:
+    if isinstance(col, TextColumn):
+        return col.copy()
+    return list(col)
+
+
+def _append_themes(themes: ValueColumn, raw_tags: Iterable[str], parsed: Dict[str, Tuple[str, ...]]) -> None:
+    """Append one row per raw tags field to `themes`, parsing each distinct one once."""
+    for raw in raw_tags:
+        vals = parsed.get(raw)
+        if vals is None:
+            vids = themes.append(parse_tags_field(raw))
+            parsed[raw] = tuple(themes.values[v] for v in vids)
+        else:
+            themes.append(vals)
+
+
+def build_snapshot(db_path: Path) -> Tuple[Path, int]:
+    """Load `db_path` from SQLite, build every index and write its snapshot.
+
+    Returns the snapshot path and the number of rows in it.
+    """
+    fp = db_fingerprint(db_path)
+    corpus = Corpus(iter_quotes(db_path), db_path)
+    return write_snapshot(corpus, fp, snapshot_path(db_path)), len(corpus)
+
+
+_default_store: Optional[QuoteStore] = None
+
+
+def get_store() -> QuoteStore:
+    """Return the process-wide QuoteStore, creating it on first use."""
+    global _default_store
+    if _default_store is None:
+        _default_store = QuoteStore()
+    return _default_store
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence
+
+from ..common.models import FilterIR
+from ..common.store import Fingerprint
+
+
+def cache_key(filters: Sequence[FilterIR], fingerprint: Optional[Fingerprint]) -> str:
+    """Canonical key for a filter set over one version of the DB.
+
+    Filters are AND-ed, so their order (which the optimizer may change) is
+    not part of the key.
+    """
+    canonical = sorted([f.field, f.value, f.tag] for f in filters)
+    payload = json.dumps({"filters": canonical, "db": list(fingerprint or ())}, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """LRU cache of filter results (matching rowids, in rowid order).
+
+    Bounded both by entry count and by the total number of cached rowids.
+    With `disk_dir` set, entries are also written there as JSON files and
+    read back on an in-memory miss, so they survive process restarts; the
+    directory keeps at most `max_disk_entries` files (oldest evicted).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        max_rowids: int = 2_000_000,
+        disk_dir: Optional[Path] = None,
+        max_disk_entries: int = 4096,
+    ):
+        self.max_entries = max_entries
+        self.max_rowids = max_rowids
+        self.disk_dir = Path(disk_dir) if disk_dir is not None else None
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, array]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[array]:
+        with self._lock:
+            rowids = self._entries.get(key)
+            if rowids is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return rowids
+        rowids = self._disk_get(key)
+        if rowids is not None:
+            self._put_memory(key, rowids)
+            self.hits += 1
+            return rowids
+        self.misses += 1
+        return None
+
+    def put(self, key: str, rowids: Iterable[int]) -> None:
+        values = array("q", rowids)
+        self._put_memory(key, values)
+        self._disk_put(key, values)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _put_memory(self, key: str, rowids: array) -> None:
+        if len(rowids) > self.max_rowids:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = rowids
+            self._size += len(rowids)
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._size > self.max_rowids
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _disk_path(self, key: str) -> Optional[Path]:
+        return self.disk_dir / f"{key}.json" if self.disk_dir is not None else None
+
+    def _disk_get(self, key: str) -> Optional[array]:
+        path = self._disk_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                rowids = array("q", json.load(f))
+            os.utime(path)  # keep the disk tier in LRU order
+            return rowids
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def _disk_put(self, key: str, rowids: array) -> None:
+        path = self._disk_path(key)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(rowids.tolist(), f)
+            os.replace(tmp, path)
+            self._disk_prune()
+        except OSError:
+            # The disk tier is best effort; memory still has the entry.
+            pass
+
+    def _disk_prune(self) -> None:
+        files: List[Path] = list(self.disk_dir.glob("*.json"))
+        if len(files) <= self.max_disk_entries:
+            return
+        files.sort(key=lambda p: p.stat().st_mtime)
+        for p in files[: len(files) - self.max_disk_entries]:
+            try:
+                p.unlink()
+            except OSError:
+                pass
+
+
+_cache: Optional[ResultCache] = ResultCache()
+
+
+def configure_result_cache(enabled: bool = True, disk_dir: Optional[Path] = None) -> None:
+    """Turn the process-wide result cache on/off and set its disk tier."""
+    global _cache
+    _cache = ResultCache(disk_dir=disk_dir) if enabled else None
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    return _cache
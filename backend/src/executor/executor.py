@@ -1,97 +1,555 @@
 
-import json
+import heapq
+import itertools
 import random
-from typing import List, Dict, Any
+import sys
+import time
+from bisect import bisect_right
+from contextlib import closing
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Iterator, NamedTuple, Optional, Set, Tuple, TypeVar
 
-from ..common.models import IR
-from ..common.db import load_quotes
-from ..common.matching import match_exact, match_forgiving, match_loose, parse_tags_field
+from ..common import bitmap
+from ..common.models import IR, FilterIR, SelectionIR
+from ..common.db import QUOTE_FIELDS, iter_quotes, sample_quotes
+from ..common.store import Corpus, QuoteStore, get_store
+from ..common.fts import fts_query, has_fts, iter_match_rows, match_rowids
+from .cache import ResultCache, cache_key, get_result_cache
+from .output import RowWriter, row_record
+from .parallel import get_shard_pool, workers_configured
+from ..common.profiling import Profile, get_profile
+from ..common.cancel import check_cancelled, current_token
+from ..common.errors import QuoteScriptError
+from ..common.matching import (
+    PreparedQuery,
+    match_forgiving_norm,
+    match_loose_norm,
+    parse_tags_field,
+    prepare_query,
+)
 
 
-def _field_value(row: Dict[str, Any], field: str) -> str:
-    if field == "quote":
-        return row.get("content", "")
-    if field == "author":
-        return row.get("author", "")
-    if field == "theme":
-        # For THEME we operate on the tags field
-        return row.get("tags", "")
-    return ""
+def _prepared(f: FilterIR) -> PreparedQuery:
+    """The filter's prepared matcher (attached by the optimizer or `bind_params`)."""
+    return f.matcher if f.matcher is not None else prepare_query(f.value, f.tag)
 
 
-def _match_text(text: str, value: str, tag: str) -> bool:
-    if tag == "exact":
-        return match_exact(text, value)
-    if tag == "loose":
-        return match_loose(text, value)
-    # forgiving default
-    return match_forgiving(text, value)
+def _matches_at(corpus: Corpus, pos: int, f: FilterIR, query: PreparedQuery) -> bool:
+    """Row-level check of a QUOTE filter against the row's content."""
+    if f.tag == "exact":
+        return query.pattern.search(corpus.content[pos] or "") is not None
+    if not query.norm:
+        return False
+    text_norm = corpus.content_norm[pos]
+    match = match_loose_norm if f.tag == "loose" else match_forgiving_norm
+    return bool(text_norm) and match(text_norm, query.norm)
 
 
-def _matches_filter(row: Dict[str, Any], field: str, value: str, tag: str) -> bool:
-    text = _field_value(row, field)
-    if field == "theme":
-        # For THEME, treat tags as a list and match against each tag
-        tags = parse_tags_field(text)
-        return any(_match_text(t, value, tag) for t in tags)
-    return _match_text(text, value, tag)
+class _Residual(NamedTuple):
+    """A filter that still needs row-level checks after planning."""
+    filter: FilterIR
+    query: PreparedQuery
+    rows: Optional[Set[int]]  # positions to check; None = every candidate
 
 
-def execute(ir: IR) -> List[Dict[str, Any]]:
-    """Phase 6: Execute IR over the SQLite quotes DB.
+def _plan(
+    corpus: Corpus, ir: IR, scores: Optional[List[Dict[int, float]]] = None
+) -> Tuple[Optional[int], List[_Residual]]:
+    """Resolve as much of the ABOVE filters as possible without visiting rows.
+
+    - AUTHOR / THEME filters run once per distinct value of the
+      dictionary-encoded column and become row bitmaps.
+    - Fuzzy QUOTE filters are resolved on the content vocabulary; only
+      multi-word substring candidates remain to be checked per row.
+    - Exact QUOTE filters are checked per row; with an FTS index only on
+      the rows the index returns.
 
-    Returns the final list of matching quote rows.
+    Returns the AND of all filter bitmaps (None = no restriction) and the
+    residual per-row checks, in the optimizer's filter order. If `scores` is
+    given, a row position -> score map is appended to it for every fuzzy
+    filter (rows missing from a map score 1.0, see `execute_ranked`).
     """
-    rows = load_quotes()
+    candidates: Optional[int] = None
+    residual: List[_Residual] = []
+    prof = get_profile()
+
+    for f in ir.filters:
+        check_cancelled()
+        bm: Optional[int] = None
+        if prof is not None:
+            t0 = time.perf_counter()
+            rows_in = len(corpus) if candidates is None else bitmap.count(candidates)
+            fprof = prof.add_filter(f, filter_label(f), filter_method(corpus.has_fts(), f))
+        if f.field in ("author", "theme"):
+            col = corpus.column(f.field)
+            if scores is not None and f.tag != "exact":
+                value_scores = col.value_scores(f.value, f.tag)
+                scores.append(col.row_scores(value_scores))
+                bm = col.rows_bitmap(value_scores)
+            else:
+                bm = col.rows_bitmap(col.matching_values(f.value, f.tag))
+        elif f.tag == "exact":
+            expr = fts_query([f]) if corpus.has_fts() else None
+            if expr is None:
+                residual.append(_Residual(f, _prepared(f), None))
+            else:
+                # FTS candidates, re-checked for case and word boundaries
+                found = corpus.positions_of(match_rowids(corpus.db_path, expr))
+                bm = bitmap.from_positions(found, len(corpus))
+                residual.append(_Residual(f, _prepared(f), set(found)))
+        else:
+            m = corpus.word_index("quote").lookup(f.value, f.tag, scored=scores is not None)
+            if scores is not None and m is not None and m.scores is not None:
+                # Substring candidates that pass the row check contain the query: 1.0
+                scores.append(m.scores)
+            if m is None:
+                residual.append(_Residual(f, _prepared(f), None))
+            else:
+                bm = bitmap.from_positions(m.docs | m.maybe, len(corpus))
+                if m.maybe:
+                    residual.append(_Residual(f, _prepared(f), m.maybe))
+        if bm is not None:
+            candidates = bm if candidates is None else candidates & bm
+        if prof is not None and bm is not None:
+            fprof.index_in = rows_in
+            fprof.index_out = bitmap.count(candidates)
+            fprof.index_time = time.perf_counter() - t0
+        if candidates == 0:
+            return 0, []
+    return candidates, residual
+
+
+def filter_label(f: FilterIR) -> str:
+    value = f"${f.param}" if f.param is not None else f'"{f.value}"'
+    return f"{f.field.upper()}: {value} -{f.tag}"
+
 
-    # 1) Apply ABOVE filters (all combined with AND)
-    filtered = []
-    for row in rows:
+def filter_method(fts: bool, f: FilterIR) -> str:
+    """How `_plan` resolves a filter (for EXPLAIN / --profile output)."""
+    if f.field in ("author", "theme"):
+        return f"{f.field} column, once per distinct value"
+    if f.tag == "exact":
+        return "FTS5 candidates + exact re-check" if fts else "exact check per row"
+    return "content word index + row re-check of substring candidates"
+
+
+def iter_matches(ir: IR, corpus: Optional[Corpus] = None) -> Iterator[Dict[str, Any]]:
+    """Lazily yield the rows that pass every ABOVE filter, in rowid order."""
+    if corpus is None:
+        corpus = get_store().corpus()
+    rows = corpus.rows
+    for pos in iter_match_positions(ir, corpus):
+        yield rows[pos]
+
+
+def iter_match_positions(ir: IR, corpus: Corpus) -> Iterator[int]:
+    """Lazily yield the positions of the rows that pass every ABOVE filter.
+
+    Filters are first resolved into row bitmaps (see `_plan`); only the
+    remaining checks run per row, and only as far as the consumer pulls.
+    With an AFTER cursor, rows up to it are not visited at all.
+    """
+    candidates, residual = _plan(corpus, ir)
+    return _iter_planned(corpus, candidates, residual, _start_position(corpus, ir.selection))
+
+
+def _start_position(corpus: Corpus, sel: SelectionIR) -> int:
+    """Position of the first row past the AFTER cursor (0 without one)."""
+    return 0 if sel.after is None else bisect_right(corpus.rowids, sel.after)
+
+
+def _iter_planned(
+    corpus: Corpus, candidates: Optional[int], residual: List[_Residual], start: int = 0
+) -> Iterator[int]:
+    if candidates is None:
+        positions: Iterable[int] = range(start, len(corpus))
+    else:
+        positions = bitmap.iter_positions(candidates, start)
+
+    token = current_token()
+    if token is not None:
+        # Service requests: stop a long scan once cancelled or past the deadline
+        positions = token.iter_checked(positions)
+
+    prof = get_profile()
+    if prof is not None:
+        yield from _iter_checked_profiled(corpus, positions, residual, prof)
+        return
+
+    for pos in positions:
         ok = True
-        for f in ir.filters:
-            if not _matches_filter(row, f.field, f.value, f.tag):
-                ok = False
-                break
+        for r in residual:
+            if r.rows is None or pos in r.rows:
+                if not _matches_at(corpus, pos, r.filter, r.query):
+                    ok = False
+                    break
         if ok:
-            filtered.append(row)
+            yield pos
 
-    # 2) Apply BELOW selection (TOP / RANDOM)
-    sel = ir.selection
-    result = filtered
 
-    # TOP first (respect DB order)
+def _iter_checked_profiled(
+    corpus: Corpus, positions: Iterable[int], residual: List[_Residual], prof: Profile
+) -> Iterator[int]:
+    """The row loop of `iter_match_positions`, counting and timing every check."""
+    by_filter = {id(fp.source): fp for fp in prof.filters}
+    for pos in positions:
+        ok = True
+        for r in residual:
+            if r.rows is None or pos in r.rows:
+                fp = by_filter.get(id(r.filter))
+                t0 = time.perf_counter()
+                passed = _matches_at(corpus, pos, r.filter, r.query)
+                if fp is not None:
+                    fp.check_time += time.perf_counter() - t0
+                    fp.checked += 1
+                    fp.passed += passed
+                if not passed:
+                    ok = False
+                    break
+        if ok:
+            yield pos
+
+
+T = TypeVar("T")
+
+
+def _reservoir_sample(items: Iterable[T], k: int) -> List[T]:
+    """Uniform sample of k items in one pass, without materializing `items`."""
+    reservoir: List[T] = []
+    for seen, item in enumerate(items):
+        if seen < k:
+            reservoir.append(item)
+        else:
+            j = random.randrange(seen + 1)
+            if j < k:
+                reservoir[j] = item
+    # Slots fill in stream order; shuffle so output order is random like random.sample.
+    random.shuffle(reservoir)
+    return reservoir
+
+
+def iter_select(matches: Iterable[T], sel: SelectionIR) -> Iterator[T]:
+    """Apply BELOW (OFFSET / TOP / RANDOM), pulling no more matches than needed.
+
+    Works on rows or on row positions alike, already past any AFTER cursor.
+    Without RANDOM the selected matches are streamed as they are found.
+    """
+    # RANDOM 0 => zero results; nothing to scan
+    if sel.random == 0:
+        return iter(())
+
+    # OFFSET skips matches without keeping them
+    if sel.offset:
+        matches = itertools.islice(matches, sel.offset, None)
+
+    # TOP first (respect DB order); stops the scan after M matches
+    if sel.top is not None:
+        matches = itertools.islice(matches, sel.top)
+
+    if sel.random is None:
+        return iter(matches)
+
     if sel.top is not None:
-        if sel.top < len(result):
-            result = result[: sel.top]
+        # RANDOM N out of at most TOP M rows
+        pool = list(matches)
+        return iter(random.sample(pool, min(sel.random, len(pool))))
+
+    # RANDOM only: one pass, the filtered set is never held in memory
+    return iter(_reservoir_sample(matches, sel.random))
+
+
+def _row_matches_exact(row: Dict[str, Any], f: FilterIR) -> bool:
+    pattern = _prepared(f).pattern
+    if f.field == "theme":
+        return any(pattern.search(t) for t in parse_tags_field(row.get("tags", "")))
+    text = row.get("content", "") if f.field == "quote" else row.get("author", "")
+    return pattern.search(text or "") is not None
+
+
+def _pushdown_expr(store: QuoteStore, ir: IR) -> Optional[str]:
+    """The FTS expression answering `ir` on a cold store, or None."""
+    if not ir.filters or any(f.tag != "exact" for f in ir.filters):
+        return None
+    if not store.is_stale():
+        return None
+    expr = fts_query(ir.filters)
+    if expr is None or not has_fts(store.db_path):
+        return None
+    return expr
+
+
+def iter_pushdown_matches(store: QuoteStore, ir: IR) -> Optional[Iterator[Dict[str, Any]]]:
+    """Answer an all-exact query from the FTS index without loading the corpus.
+
+    Only used while the store is cold (not loaded, or the DB changed since),
+    so selective exact queries never pull the whole table. The FTS rows are
+    streamed in rowid order and re-checked with the exact matcher. Returns
+    None when the query cannot be pushed down.
+    """
+    expr = _pushdown_expr(store, ir)
+    if expr is None:
+        return None
+    return _iter_pushdown(store.db_path, expr, ir)
+
+
+def _iter_pushdown(db_path: Path, expr: str, ir: IR) -> Iterator[Dict[str, Any]]:
+    filters = ir.filters
+    with closing(iter_match_rows(db_path, expr, ir.selection.after)) as source:
+        rows: Iterator[Dict[str, Any]] = source
+        token = current_token()
+        if token is not None:
+            rows = token.iter_checked(rows)
+        for row in rows:
+            if all(_row_matches_exact(row, f) for f in filters):
+                yield row
 
-    # Then RANDOM if requested
+
+def _iter_closing(rows: Iterator[T], source: Iterator[Any]) -> Iterator[T]:
+    """Yield `rows`, then close `source`, the DB stream they are read from.
+
+    TOP stops reading `source` early; closing it as soon as `rows` ends
+    returns its pooled connection right away instead of whenever the
+    stream is garbage collected.
+    """
+    with closing(source):
+        yield from rows
+
+
+def _iter_cached_positions(corpus: Corpus, ir: IR) -> Iterator[int]:
+    """In-memory filter stage behind the result cache, as row positions.
+
+    The cache holds the complete matching rowid list for (filters, DB
+    fingerprint), taking the fingerprint `corpus` was loaded at, so a
+    reload in another thread cannot file these rows under a newer one.
+    TOP/RANDOM are applied afterwards, so random picks stay fresh. An
+    AFTER cursor is applied to the cached rowids (they are sorted). A miss
+    streams the matches like an uncached query, so TOP still stops early;
+    the set is cached only if the scan ran to the end.
+    """
+    cache = get_result_cache()
+    if cache is None or not ir.filters:
+        return iter_match_positions(ir, corpus)
+
+    key = cache_key(ir.filters, corpus.fingerprint)
+    rowids = cache.get(key)
+    prof = get_profile()
+    if prof is not None:
+        prof.strategy = "in-memory, result cache " + ("hit" if rowids is not None else "miss")
+    after = ir.selection.after
+    if rowids is not None:
+        start = 0 if after is None else bisect_right(rowids, after)
+        # Lazily, so TOP only maps the rowids it returns to positions.
+        return corpus.iter_positions_of(rowids[start:])
+
+    if after is not None:
+        # Rows before the cursor are skipped, so this scan never sees the full set.
+        return iter_match_positions(ir, corpus)
+    return _iter_filling(cache, key, corpus, iter_match_positions(ir, corpus))
+
+
+def _iter_filling(cache: ResultCache, key: str, corpus: Corpus, positions: Iterator[int]) -> Iterator[int]:
+    """Yield `positions`; cache their rowids if the consumer reads them all."""
+    seen: List[int] = []
+    for pos in positions:
+        seen.append(pos)
+        yield pos
+    all_rowids = corpus.rowids
+    cache.put(key, (all_rowids[pos] for pos in seen))
+
+
+def execute_ranked(corpus: Corpus, ir: IR) -> List[Dict[str, Any]]:
+    """RANK: the matching rows, best first, each with its `_score`.
+
+    A row's score is the mean of its per-filter scores: the similarity ratio
+    of its best matching word or value for fuzzy filters (taken from the
+    vocabulary matching `_plan` does anyway), 1.0 for exact matches and
+    substring hits. Ties keep rowid order. With TOP M only the best M are
+    kept, in a bounded heap, while the matches stream by; RANDOM N then
+    picks among those M. OFFSET K skips the best K first.
+    """
+    sel = ir.selection
+    if sel.top == 0 or sel.random == 0:
+        return []
+    skip = sel.offset or 0
+    scores: List[Dict[int, float]] = []
+    candidates, residual = _plan(corpus, ir, scores)
+    if candidates == 0:
+        return []
+    unscored = len(ir.filters) - len(scores)
+    n_filters = len(ir.filters) or 1
+
+    def scored(positions: Iterable[int]) -> Iterator[Tuple[float, int]]:
+        for pos in positions:
+            total = unscored
+            for s in scores:
+                total += s.get(pos, 1.0)
+            # -pos: on equal scores the earlier row ranks higher
+            yield total / n_filters, -pos
+
+    matches = scored(_iter_planned(corpus, candidates, residual))
+    if sel.top is None:
+        best = sorted(matches, reverse=True)[skip:]
+    else:
+        # OFFSET K: keep the best K + M, then drop the first K
+        keep = sel.top + skip
+        heap: List[Tuple[float, int]] = []
+        for item in matches:
+            if len(heap) < keep:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+        best = sorted(heap, reverse=True)[skip:]
     if sel.random is not None:
-        n = sel.random
-        if n == 0:
-            result = []
-        else:
-            # If RANDOM only (no TOP) and n > len(result), just cap at len(result)
-            n = min(n, len(result))
-            result = random.sample(result, n)
-
-    return result
-
-
-def print_output(ir: IR, rows: List[Dict[str, Any]]) -> None:
-    """print("=== IR ===")
-    ir_dict = {
-        "filters": [
-            {"field": f.field, "value": f.value, "tag": f.tag}
-            for f in ir.filters
-        ],
-        "selection": {"top": ir.selection.top, "random": ir.selection.random},
-    }
-    print(json.dumps(ir_dict, indent=2))"""
-
-    # print("\nResults")
-    if not rows:
-        print("No matches found.")
-        return
+        best = sorted(random.sample(best, min(sel.random, len(best))), reverse=True)
+    rows = corpus.rows
+    return [dict(rows[-neg_pos], _score=score) for score, neg_pos in best]
+
+
+def unfiltered_strategy(store: QuoteStore, sel: SelectionIR) -> str:
+    """How `iter_unfiltered` answers `sel` right now."""
+    if not store.is_stale():
+        return "no filters: positions in the loaded corpus"
+    if sel.random is None:
+        return "no filters: SQLite " + ("LIMIT" if sel.top is not None else "scan") + (" / OFFSET" if sel.offset else "")
+    return "no filters: SQLite rowid sampling"
+
+
+def iter_unfiltered(store: QuoteStore, sel: SelectionIR) -> Iterator[Dict[str, Any]]:
+    """Answer a program without ABOVE filters, reading only the rows it returns.
+
+    A loaded, current corpus picks row positions directly; otherwise the
+    rows come from SQLite (LIMIT / OFFSET and a rowid bound for TOP, random
+    rowids for RANDOM, see `db.sample_quotes`) and the corpus is not
+    loaded. The cost follows TOP / RANDOM, not the size of the table.
+    """
+    if sel.random == 0 or sel.top == 0:
+        return iter(())
+    if not store.is_stale():
+        corpus = store.corpus()
+        window = range(_start_position(corpus, sel), len(corpus))[sel.offset or 0:]
+        if sel.top is not None:
+            window = window[:sel.top]
+        positions: Iterable[int] = window
+        if sel.random is not None:
+            positions = random.sample(window, min(sel.random, len(window)))
+            if sel.rank:
+                positions = sorted(positions)
+        rows = corpus.rows
+        return (rows[pos] for pos in positions)
+    rowid_range = None if sel.after is None else (sel.after + 1, None)
+    if sel.random is None:
+        quotes = iter_quotes(store.db_path, rowid_range, sel.top, sel.offset)
+        return _iter_closing((dict(zip(QUOTE_FIELDS, rec)) for rec in quotes), quotes)
+    picked = sample_quotes(store.db_path, sel.random, sel.top, sel.after, sel.offset)
+    if sel.rank:
+        # Without filters every row scores the same: rank order is rowid order.
+        picked.sort(key=lambda r: r["_rowid"])
+    return iter(picked)
+
+
+def execute(ir: IR) -> List[Dict[str, Any]]:
+    """Phase 6: Execute IR over the quotes corpus.
+
+    Rows come from the shared in-process QuoteStore, which only goes back to
+    SQLite when the DB file changed; all-exact queries on a cold store are
+    pushed down to the FTS index instead, and programs without filters only
+    read the rows they return (see `iter_unfiltered`). With parallel execution enabled
+    (see `parallel.configure_workers`) filtering runs on rowid shards in
+    worker processes; otherwise filter results go through the result cache
+    (see `cache.configure_result_cache`). Matching is a lazy generator, so TOP stops scanning
+    after M matches and RANDOM samples in a single pass. RANK programs are
+    scored and ranked in-process (see `execute_ranked`).
+    Returns the final list of matching rows.
+    """
+    return list(iter_execute(ir))
+
+
+def iter_execute(ir: IR) -> Iterator[Dict[str, Any]]:
+    """`execute`, yielding the result rows as they are found.
+
+    Without RANDOM or RANK nothing is collected first: rows stream from the
+    scan (or from SQLite) to the consumer, e.g. an output writer.
+    """
+    unbound = ir.params()
+    if unbound:
+        raise QuoteScriptError("Missing value for parameter(s): " + ", ".join("$" + n for n in unbound))
+
+    prof = get_profile()
+    store = get_store()
+    strategy = choose_strategy(store, ir)
+    if strategy == "ranked":
+        if prof is not None:
+            prof.strategy = describe_strategy(strategy, store, ir)
+        corpus = store.corpus()
+        if prof is not None:
+            prof.corpus_rows = len(corpus)
+        return iter(execute_ranked(corpus, ir))
+
+    if strategy == "parallel":
+        pool = get_shard_pool()
+        if pool is not None:
+            if prof is not None:
+                prof.strategy = f"parallel: {len(pool)} rowid shards"
+            return iter_select(pool.iter_matches(ir), ir.selection)
+
+    if strategy == "unfiltered":
+        if prof is not None:
+            prof.strategy = describe_strategy(strategy, store, ir)
+        return iter_unfiltered(store, ir.selection)
+
+    if strategy == "pushdown":
+        matches = iter_pushdown_matches(store, ir)
+        if matches is not None:
+            if prof is not None:
+                prof.strategy = describe_strategy(strategy, store, ir)
+            return _iter_closing(iter_select(matches, ir.selection), matches)
+
+    if prof is not None:
+        prof.strategy = "in-memory"
+    corpus = store.corpus()
+    if prof is not None:
+        prof.corpus_rows = len(corpus)
+    # TOP / RANDOM pick positions; only the selected rows are materialized.
+    rows = corpus.rows
+    return (rows[pos] for pos in iter_select(_iter_cached_positions(corpus, ir), ir.selection))
+
+
+def choose_strategy(store: QuoteStore, ir: IR) -> str:
+    """Which path `iter_execute` takes for `ir` right now.
+
+    One of "ranked", "parallel", "unfiltered", "pushdown" or "in-memory",
+    checked in that order. EXPLAIN (`planned_strategy`) asks the same question.
+    """
+    if not ir.filters:
+        return "unfiltered"
+    if ir.selection.rank:
+        return "ranked"
+    if workers_configured():
+        return "parallel"
+    if _pushdown_expr(store, ir) is not None:
+        return "pushdown"
+    return "in-memory"
+
+
+def describe_strategy(strategy: str, store: QuoteStore, ir: IR) -> str:
+    """Human-readable form of a `choose_strategy` result, as profiles report it."""
+    if strategy == "ranked":
+        return "in-memory, ranked" + (" (heap top-k)" if ir.selection.top is not None else "")
+    if strategy == "parallel":
+        return f"parallel: {workers_configured()} rowid shards"
+    if strategy == "unfiltered":
+        return unfiltered_strategy(store, ir.selection)
+    if strategy == "pushdown":
+        return "FTS5 pushdown (corpus not loaded)"
+    return "in-memory" + (", result cache enabled" if get_result_cache() is not None else "")
+
+
+def planned_strategy(ir: IR) -> str:
+    """The strategy `execute` would pick for `ir` right now (for EXPLAIN)."""
+    store = get_store()
+    return describe_strategy(choose_strategy(store, ir), store, ir)
+
 
-    for row in rows:
-        print(f"- {row['content']} — {row['author']}  [tags={row['tags']}]")
+def print_output(ir: IR, rows: Iterable[Dict[str, Any]], fmt: str = "text") -> None:
+    """Write the result rows to stdout in `fmt` (see `output.FORMATS`)."""
+    RowWriter(sys.stdout, fmt).write_rows(rows)
@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+from typing import Any, Dict, IO, Iterable, List, Optional
+
+from ..common.errors import QuoteScriptError
+
+
+FORMATS = ("text", "jsonl", "csv", "tsv")
+
+# Columns of the csv / tsv formats (`score` is empty unless the program RANKs).
+COLUMNS = ("rowid", "id", "content", "author", "tags", "score")
+
+# Rows formatted before their text is handed to the output stream in one write.
+_CHUNK_ROWS = 1024
+
+# json.dumps(..., ensure_ascii=False) builds a new encoder per call.
+_json_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def row_record(row: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-friendly view of a result row (used by the server and batch modes)."""
+    record = {
+        "rowid": row.get("_rowid"),
+        "id": row.get("id"),
+        "content": row.get("content"),
+        "author": row.get("author"),
+        "tags": row.get("tags"),
+    }
+    if "_score" in row:
+        # RANK programs (see executor.execute_ranked)
+        record["score"] = row["_score"]
+    return record
+
+
+def text_line(row: Dict[str, Any]) -> str:
+    """One row in the human-readable `text` format."""
+    score = f"  (score {row['_score']:.3f})" if "_score" in row else ""
+    return f"- {row['content']} — {row['author']}  [tags={row['tags']}]{score}\n"
+
+
+class RowWriter:
+    """Writes result rows to a text stream in one of FORMATS.
+
+    Rows are formatted in chunks and each chunk reaches `out` as a single
+    write, so exporting many rows costs one stream call per chunk rather
+    than per row. `write_rows` consumes any iterable, e.g. the generator
+    from `executor.iter_execute`, and never holds more than a chunk.
+    With `program_column`, the csv / tsv / jsonl output gets a `program`
+    column (multi-program files); text output gets a header per program.
+    """
+
+    def __init__(self, out: IO[str], fmt: str = "text", program_column: bool = False):
+        if fmt not in FORMATS:
+            raise QuoteScriptError(f"Unknown output format {fmt!r} (expected one of {', '.join(FORMATS)})")
+        self.out = out
+        self.fmt = fmt
+        self.program_column = program_column
+        self._buf = io.StringIO()
+        self._csv = None
+        if fmt in ("csv", "tsv"):
+            self._csv = csv.writer(self._buf, dialect="excel-tab" if fmt == "tsv" else "excel")
+            self._csv.writerow((("program",) if program_column else ()) + COLUMNS)
+
+    def write_rows(self, rows: Iterable[Dict[str, Any]], program: Optional[int] = None) -> int:
+        """Write `rows` (one program's result); returns how many were written."""
+        if self.fmt == "text" and self.program_column:
+            self._buf.write(f"# program {program}\n")
+        n = 0
+        chunk: List[Dict[str, Any]] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == _CHUNK_ROWS:
+                n += self._write_chunk(chunk, program)
+                chunk = []
+        n += self._write_chunk(chunk, program)
+        if n == 0 and self.fmt == "text":
+            self._buf.write("No matches found.\n")
+        self.flush()
+        return n
+
+    def _write_chunk(self, rows: List[Dict[str, Any]], program: Optional[int]) -> int:
+        buf = self._buf
+        if self.fmt == "text":
+            buf.write("".join(map(text_line, rows)))
+        elif self.fmt == "jsonl":
+            head = {"program": program} if self.program_column else {}
+            buf.write("".join(
+                _json_encode({**head, **row_record(row)}) + "\n" for row in rows
+            ))
+        else:
+            head = (program,) if self.program_column else ()
+            self._csv.writerows(
+                head + (row.get("_rowid"), row.get("id"), row.get("content"), row.get("author"),
+                        row.get("tags"), row.get("_score"))
+                for row in rows
+            )
+        if buf.tell() >= 1 << 16:
+            self.flush()
+        return len(rows)
+
+    def flush(self) -> None:
+        """Hand the buffered text to the output stream."""
+        data = self._buf.getvalue()
+        if data:
+            self.out.write(data)
+            self._buf.seek(0)
+            self._buf.truncate()
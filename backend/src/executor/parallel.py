@@ -0,0 +1,273 @@
+import atexit
+import itertools
+import multiprocessing
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from ..common.cancel import CancelToken, cancellable, current_token
+from ..common.db import get_db_path, shard_boundaries
+from ..common.errors import QuoteScriptError
+from ..common.models import IR, SelectionIR
+from ..common.store import QuoteStore
+
+
+class _Inbox:
+    """Messages from the pool to one shard worker.
+
+    Requests that arrive while another one runs are queued; a
+    ("cancel", request_id) message marks a request the pool gave up on.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.requests: Deque[Any] = deque()
+        self.cancelled: Set[int] = set()
+
+    def _read(self) -> None:
+        try:
+            msg = self.conn.recv()
+        except EOFError:
+            msg = None
+        if msg is not None and msg[0] == "cancel":
+            self.cancelled.add(msg[1])
+        else:
+            self.requests.append(msg)
+
+    def next_request(self) -> Any:
+        while not self.requests:
+            self._read()
+        return self.requests.popleft()
+
+    def read_pending(self) -> None:
+        while not (self.requests and self.requests[-1] is None) and self.conn.poll():
+            self._read()
+
+
+class _ShardToken(CancelToken):
+    """Cancel token of a request in a shard worker.
+
+    Carries the client's deadline and reason, and also reads the pool's
+    messages at each check, so a request the pool gave up on stops too.
+    """
+
+    def __init__(self, inbox: _Inbox, request_id: int, token: Optional[CancelToken]):
+        super().__init__()
+        if token is not None:
+            self.deadline = token.deadline
+            self.reason = token.reason
+        self._inbox = inbox
+        self._request_id = request_id
+
+    def check(self) -> None:
+        self._inbox.read_pending()
+        if self._request_id in self._inbox.cancelled:
+            self.cancel()
+        super().check()
+
+
+def _worker_main(conn, db_path: str, rowid_range: Tuple[Optional[int], Optional[int]]) -> None:
+    """Shard worker: keep one rowid range loaded and answer filter requests.
+
+    Every request gets a reply, also one that was cancelled.
+    """
+    from .executor import iter_matches
+
+    store = QuoteStore(Path(db_path), rowid_range)
+    inbox = _Inbox(conn)
+    while True:
+        msg = inbox.next_request()
+        if msg is None:
+            return
+        request_id, filters, limit, after, token = msg
+        try:
+            with cancellable(_ShardToken(inbox, request_id, token)) as shard_token:
+                shard_token.check()
+                selection = SelectionIR(None, None, after=after)
+                matches = iter_matches(IR(filters=filters, selection=selection), store.corpus())
+                if limit is not None:
+                    matches = itertools.islice(matches, limit)
+                conn.send((request_id, "ok", list(matches)))
+        except QuoteScriptError as e:
+            conn.send((request_id, "error", e))
+        except Exception as e:
+            conn.send((request_id, "error", QuoteScriptError(f"Unexpected error in shard worker: {e}")))
+        # Requests are answered in id order: a cancel for this one or an
+        # earlier one can no longer stop anything.
+        inbox.cancelled = {rid for rid in inbox.cancelled if rid > request_id}
+
+
+# Seconds between two cancellation checks while waiting for a shard.
+_POLL_INTERVAL = 0.05
+
+
+class ShardPool:
+    """Process pool where each worker owns one rowid-ordered shard.
+
+    Workers load their shard once (and reload it when the DB changes), so a
+    query only ships its filters out and the matching rows back. Shards are
+    contiguous rowid ranges, so concatenating their results in shard order
+    gives exactly the single-process rowid order.
+
+    Several threads can query the pool at once. Requests carry an id, and
+    a thread that reads another request's reply off a pipe leaves it in
+    that worker's `_pending` for its owner. A request given up on
+    (cancelled or timed out) is cancelled in the workers too, and its
+    replies are dropped when they arrive.
+    """
+
+    def __init__(self, workers: int, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path) if db_path is not None else get_db_path()
+        if not self.db_path.exists():
+            raise QuoteScriptError(f"QuoteScript DB not found: {self.db_path}")
+        bounds = shard_boundaries(self.db_path, max(1, workers))
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._workers: List[Tuple[Any, Any]] = []
+        for lo, hi in zip(bounds, bounds[1:]):
+            parent, child = multiprocessing.Pipe()
+            proc = multiprocessing.Process(
+                target=_worker_main, args=(child, str(self.db_path), (lo, hi)), daemon=True
+            )
+            proc.start()
+            child.close()
+            self._workers.append((proc, parent))
+        # Per worker: lock for reading its pipe, replies read for other
+        # requests, and ids of requests whose reply is no longer wanted.
+        self._recv_locks = [threading.Lock() for _ in self._workers]
+        self._pending: List[Dict[int, Tuple[str, Any]]] = [{} for _ in self._workers]
+        self._abandoned: List[Set[int]] = [set() for _ in self._workers]
+
+    def __len__(self) -> int:
+        return len(self._workers)
+
+    def iter_matches(self, ir: IR) -> Iterator[Dict[str, Any]]:
+        """Matching rows from all shards, merged in rowid order.
+
+        With TOP M each shard stops after its own first M matches (M + K
+        with OFFSET K); that is enough for the global first M. RANDOM needs
+        every match, so shards return all of theirs. Shards skip the rows up
+        to an AFTER cursor themselves; OFFSET is applied to the merged rows.
+
+        The calling thread's cancel token is checked while the shards work;
+        a timeout or cancel also stops the shard scans.
+        """
+        sel = ir.selection
+        limit = None if sel.top is None else sel.top + (sel.offset or 0)
+        token = current_token()
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            for _, conn in self._workers:
+                conn.send((request_id, ir.filters, limit, sel.after, token))
+        replies: List[Tuple[str, Any]] = []
+        try:
+            for i in range(len(self._workers)):
+                replies.append(self._await_reply(i, request_id, token))
+        except BaseException:
+            self._abandon(request_id, len(replies))
+            raise
+        for status, payload in replies:
+            if status != "ok":
+                raise payload
+        return itertools.chain.from_iterable(payload for _, payload in replies)
+
+    def _await_reply(self, i: int, request_id: int, token: Optional[CancelToken]) -> Tuple[str, Any]:
+        """Worker i's reply to `request_id`, checking `token` while waiting.
+
+        No lock is held while polling, so other queries can collect their
+        replies meanwhile.
+        """
+        conn = self._workers[i][1]
+        pending = self._pending[i]
+        lock = self._recv_locks[i]
+        while True:
+            if token is not None:
+                token.check()
+            if not lock.acquire(timeout=_POLL_INTERVAL):
+                continue
+            try:
+                if request_id in pending:
+                    return pending.pop(request_id)
+                # One reply per turn, so waiters get the lock back soon.
+                if conn.poll():
+                    rid, status, payload = conn.recv()
+                    if rid == request_id:
+                        return status, payload
+                    if rid in self._abandoned[i]:
+                        self._abandoned[i].discard(rid)
+                    else:
+                        pending[rid] = (status, payload)
+                    continue
+            finally:
+                lock.release()
+            conn.poll(_POLL_INTERVAL)
+
+    def _abandon(self, request_id: int, answered: int) -> None:
+        """Give up on `request_id`: the workers after the first `answered`
+        are told to stop it, and their replies are dropped."""
+        with self._lock:
+            for _, conn in self._workers[answered:]:
+                conn.send(("cancel", request_id))
+        for i in range(answered, len(self._workers)):
+            with self._recv_locks[i]:
+                if self._pending[i].pop(request_id, None) is None:
+                    self._abandoned[i].add(request_id)
+
+    def close(self) -> None:
+        with self._lock:
+            for proc, conn in self._workers:
+                try:
+                    conn.send(None)
+                    conn.close()
+                except OSError:
+                    pass
+            for proc, _ in self._workers:
+                proc.join(timeout=1)
+                if proc.is_alive():
+                    proc.terminate()
+            self._workers = []
+
+
+_pool: Optional[ShardPool] = None
+_pool_workers = 0
+
+
+def configure_workers(workers: int) -> None:
+    """Enable (workers > 1) or disable parallel execution for this process."""
+    global _pool_workers
+    if _pool is not None:
+        shutdown_pool()
+    _pool_workers = workers if workers > 1 else 0
+
+
+def workers_configured() -> int:
+    """Number of shard workers queries will use (0 = in-process)."""
+    return _pool_workers
+
+
+def get_shard_pool() -> Optional[ShardPool]:
+    """The process-wide ShardPool, started on first use (None if disabled).
+
+    The pool is bound to the DB path it was started with; a different
+    resolved path restarts it.
+    """
+    global _pool
+    if not _pool_workers:
+        return None
+    if _pool is not None and _pool.db_path != get_db_path():
+        shutdown_pool()
+    if _pool is None:
+        _pool = ShardPool(_pool_workers)
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+
+atexit.register(shutdown_pool)
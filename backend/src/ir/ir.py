@@ -11,8 +11,11 @@ def to_ir(program: ProgramNode) -> IR:
                 field=key,
                 value=flt.value,
                 tag=flt.tag or "forgiving",
+                param=flt.param,
             )
         )
     sel = program.selection
-    selection_ir = SelectionIR(top=sel.top, random=sel.random)
+    selection_ir = SelectionIR(
+        top=sel.top, random=sel.random, rank=sel.rank, offset=sel.offset, after=sel.after
+    )
     return IR(filters=filters_ir, selection=selection_ir)
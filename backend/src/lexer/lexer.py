@@ -1,68 +1,93 @@
-from typing import List
+import re
+from typing import IO, Iterator, List, NamedTuple
+
 from ..common.errors import QuoteScriptError
 
 
-def lex(source: str) -> List[str]:
-    """Phase 1: Lexical analysis.
+class Token(NamedTuple):
+    """One token and where it starts in the source (1-based line and column)."""
+    value: str
+    line: int
+    col: int
 
-    Converts the raw QuoteScript source into a flat list of tokens:
-    - keywords: QUOTE:, AUTHOR:, THEME:, TOP:, RANDOM, RANDOM:
-    - string literals: "..." (including spaces inside)
-    - identifiers / tags: forgiving, exact, loose, f, -f, etc.
-    - integers: 0, 1, 2, ...
-    - newline markers: '\n'
+
+# Token kinds, tried in order at each position; finditer skips what none
+# of them match, i.e. whitespace other than newlines.
+_TOKEN_RE = re.compile(
+    r'"[^"]*"'        # string literal, may span lines
+    r"|\n"
+    r'|[^\s"]+'       # keyword, tag, integer, $param, ...
+    r'|"'             # a quote that is never closed
+)
+
+
+# Characters read from a file per block (rounded up to whole lines).
+_READ_HINT = 1 << 16
+
+
+def iter_tokens(source: str, line: int = 1) -> Iterator[Token]:
+    """Phase 1, lazily: yield the tokens of `source` one at a time.
+
+    One compiled-regex scan, linear in the size of the source; only the
+    current token is held, so multi-program files can be parsed while they
+    are being tokenized. `line` is the number of the source's first line.
     """
-    tokens: List[str] = []
-    word = ""
-    in_string = False
-    i = 0
-    n = len(source)
-
-    while i < n:
-        ch = source[i]
-
-        if in_string:
-            word += ch
-            if ch == '"':
-                # end of string literal
-                tokens.append(word)
-                word = ""
-                in_string = False
-            i += 1
-            continue
+    line_start = 0
+    for m in _TOKEN_RE.finditer(source):
+        text = m.group()
+        start = m.start()
+        if text == "\n":
+            yield Token(text, line, start - line_start + 1)
+            line += 1
+            line_start = start + 1
+        elif text[0] == '"':
+            if len(text) == 1:
+                raise QuoteScriptError(
+                    f"Unterminated string literal at line {line}, column {start - line_start + 1}"
+                )
+            yield Token(text, line, start - line_start + 1)
+            breaks = text.count("\n")
+            if breaks:
+                line += breaks
+                line_start = start + text.rfind("\n") + 1
+        else:
+            yield Token(text, line, start - line_start + 1)
 
-        # Not inside a string
-        if ch == '"':
-            if word:
-                tokens.append(word)
-                word = ""
-            in_string = True
-            word = '"'
-            i += 1
-            continue
 
-        if ch == '\n':
-            if word.strip():
-                tokens.append(word.strip())
-                word = ""
-            tokens.append('\n')
-            i += 1
-            continue
+def iter_file_tokens(f: IO[str]) -> Iterator[Token]:
+    """`iter_tokens` over a text file, read in blocks of whole lines.
 
-        if ch.isspace():  # space, tab, etc. (not newline)
-            if word:
-                tokens.append(word)
-                word = ""
-            i += 1
+    A block is tokenized once it closes every string literal it opens (an
+    even number of quotes), so only about one block is held at a time.
+    """
+    line = 1
+    pending = ""
+    while True:
+        lines = f.readlines(_READ_HINT)
+        if not lines:
+            break
+        block = pending + "".join(lines)
+        if block.count('"') % 2:
+            pending = block
             continue
+        yield from iter_tokens(block, line)
+        line += block.count("\n")
+        pending = ""
+    if pending:
+        # Ends inside a string literal: iter_tokens reports where it starts.
+        yield from iter_tokens(pending, line)
 
-        word += ch
-        i += 1
-
-    if in_string:
-        raise QuoteScriptError("Unterminated string literal")
 
-    if word.strip():
-        tokens.append(word.strip())
+def lex(source: str) -> List[Token]:
+    """Phase 1: Lexical analysis.
 
-    return tokens
+    Converts the raw QuoteScript source into a flat list of tokens:
+    - keywords: QUOTE:, AUTHOR:, THEME:, TOP:, RANDOM, RANDOM:, RANK
+    - string literals: "..." (including spaces inside)
+    - identifiers / tags: forgiving, exact, loose, f, -f, etc.
+    - placeholders: $name
+    - integers: 0, 1, 2, ...
+    - newline markers: '\n'
+    - program separators: --- (see `parser.split_programs`)
+    """
+    return list(iter_tokens(source))
@@ -1,15 +1,71 @@
 
+from typing import List, Optional
+
 from ..common.models import IR, FilterIR
+from ..common.stats import CorpusStats
+from ..common.matching import _normalize_case_and_spaces, prepare_query
+
+
+# Relative per-word cost of checking one row with each matching mode.
+_TAG_COST = {"exact": 1.0, "forgiving": 4.0, "loose": 6.0}
+
+# Fuzzy modes also accept near-miss words, so they match more than the
+# plain word frequency suggests.
+_TAG_SPREAD = {"exact": 1.0, "forgiving": 2.0, "loose": 4.0}
+
+
+def estimate_selectivity(f: FilterIR, stats: CorpusStats) -> float:
+    """Estimated fraction of rows that pass the filter (0..1).
+
+    Every word of the value must occur in a matching row (exactly for
+    'exact', approximately otherwise), so the rarest word bounds it.
+    """
+    if stats.rows == 0 or f.param is not None:
+        return 1.0
+    words = _normalize_case_and_spaces(f.value).split()
+    if not words:
+        return 1.0
+    rarest = min(stats.doc_freq(f.field, w) for w in words)
+    # Unknown words can still match via substrings / typos.
+    fraction = max(rarest, 0.5) / stats.rows
+    return min(1.0, fraction * _TAG_SPREAD.get(f.tag, 1.0))
+
 
+def estimate_cost(f: FilterIR, stats: CorpusStats) -> float:
+    """Estimated cost of checking the filter on one row."""
+    return _TAG_COST.get(f.tag, 1.0) * max(1.0, stats.avg_words(f.field))
 
-def optimize(ir: IR) -> IR:
+
+def order_filters(filters: List[FilterIR], stats: CorpusStats) -> List[FilterIR]:
+    """Order AND-ed filters so cheap, selective checks run first.
+
+    Uses the classic rank cost / (1 - selectivity): a filter is worth running
+    early when it is cheap or when it rejects most rows. Ties keep the
+    original (QUOTE < AUTHOR < THEME) order.
+    """
+    def rank(f: FilterIR) -> float:
+        rejected = 1.0 - estimate_selectivity(f, stats)
+        return estimate_cost(f, stats) / max(rejected, 1e-9)
+
+    return sorted(filters, key=rank)
+
+
+def optimize(ir: IR, stats: Optional[CorpusStats] = None) -> IR:
     """Phase 5: Basic optimisation.
 
     - Trim whitespace from filter values.
     - Drop filters whose values become empty.
+    - Attach each filter's prepared matcher (compiled regex, normalized value).
+    - With corpus statistics, reorder filters by estimated cost/selectivity.
+
+    `$name` placeholders are kept as they are; `bind_params` fills them in.
     """
     new_filters = []
     for f in ir.filters:
+        tag = f.tag.lower()
+        if f.param is not None:
+            new_filters.append(FilterIR(field=f.field, value="", tag=tag, param=f.param))
+            continue
         value = f.value.strip()
         if not value:
             continue
@@ -17,8 +73,11 @@ def optimize(ir: IR) -> IR:
             FilterIR(
                 field=f.field,
                 value=value,
-                tag=f.tag.lower(),
+                tag=tag,
+                matcher=prepare_query(value, tag),
             )
         )
+    if stats is not None and len(new_filters) > 1:
+        new_filters = order_filters(new_filters, stats)
     ir.filters = new_filters
     return ir
@@ -1,6 +1,11 @@
-from typing import List, Dict, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from ..common.errors import QuoteScriptError
 from ..common.models import FilterNode, SelectionNode, ProgramNode
+from ..lexer.lexer import Token
+
+
+# A line holding only this token separates programs in a multi-program file.
+PROGRAM_SEPARATOR = "---"
 
 
 TAG_ALIASES = {
@@ -23,6 +28,10 @@ def _is_string(tok: Optional[str]) -> bool:
     return bool(tok) and len(tok) >= 2 and tok[0] == '"' and tok[-1] == '"'
 
 
+def _is_param(tok: Optional[str]) -> bool:
+    return bool(tok) and tok[0] == "$" and tok[1:].isidentifier()
+
+
 def _is_int(tok: Optional[str]) -> bool:
     return bool(tok) and tok.isdigit()
 
@@ -35,27 +44,38 @@ def _canonical_tag(tok: str) -> str:
     return TAG_ALIASES[tok.lower()]
 
 
-def parse(tokens: List[str]) -> ProgramNode:
+def _at(tok: Token) -> str:
+    return f"line {tok.line}, column {tok.col}"
+
+
+def parse(tokens: List[Token]) -> ProgramNode:
     """Phase 2: Syntax analysis.
 
     Enforces:
     - ABOVE must appear before BELOW.
     - QUOTE, AUTHOR, THEME may each appear at most once.
     - Global order: QUOTE < AUTHOR < THEME.
-    - BELOW may contain TOP, RANDOM, or both (TOP then RANDOM).
+    - BELOW may contain TOP, RANDOM, or both (TOP then RANDOM), plus RANK,
+      OFFSET and AFTER.
+    - A filter value is a string literal or a `$name` placeholder.
 
     BELOW keywords accepted:
     - TOP:
     - RANDOM:   (preferred)
     - RANDOM    (still accepted for backwards compatibility)
+    - RANK      (no count: order results by relevance)
+    - OFFSET:   (skip the first K matches)
+    - AFTER:    (only rows with a rowid above R: a paging cursor)
     """
     i = 0
     n = len(tokens)
+    values = [t.value for t in tokens]
 
     filters: Dict[str, FilterNode] = {}
     selection = SelectionNode(top=None, random=None)
     seen_top = False
     seen_random = False
+    seen_rank = False
     seen_below = False
 
     # order indices: QUOTE < AUTHOR < THEME
@@ -64,19 +84,24 @@ def parse(tokens: List[str]) -> ProgramNode:
 
     def peek(offset: int = 0) -> Optional[str]:
         idx = i + offset
-        return tokens[idx] if 0 <= idx < n else None
+        return values[idx] if 0 <= idx < n else None
 
     def consume() -> str:
         nonlocal i
         if i >= n:
             raise QuoteScriptError("Unexpected end of input")
-        tok = tokens[i]
+        tok = values[i]
         i += 1
         return tok
 
+    def where(offset: int = 0) -> str:
+        # Location of the token `offset` away from the cursor (or of the end)
+        idx = min(i + offset, n - 1)
+        return _at(tokens[idx]) if idx >= 0 else "line 1, column 1"
+
     def skip_newlines():
         nonlocal i
-        while i < n and tokens[i] == '\n':
+        while i < n and values[i] == '\n':
             i += 1
 
     skip_newlines()
@@ -115,11 +140,18 @@ def parse(tokens: List[str]) -> ProgramNode:
             consume()  # keyword
             skip_newlines()
             val_tok = consume()
-            if not _is_string(val_tok):
+            val_at = where(-1)
+            param = None
+            if _is_param(val_tok):
+                # Placeholder: the value is bound when the program runs
+                param = val_tok[1:]
+                value = ""
+            elif _is_string(val_tok):
+                value = val_tok[1:-1]  # strip quotes
+            else:
                 raise QuoteScriptError(
-                    f"Expected string literal after {kind.upper()}:, got {val_tok!r}"
+                    f"Expected string literal or $parameter after {kind.upper()}:, got {val_tok!r} at {val_at}"
                 )
-            value = val_tok[1:-1]  # strip quotes
 
             skip_newlines()
             next_tok = peek()
@@ -131,7 +163,7 @@ def parse(tokens: List[str]) -> ProgramNode:
             if peek() == '\n':
                 consume()
 
-            filters[kind] = FilterNode(kind=kind, value=value, tag=tag)
+            filters[kind] = FilterNode(kind=kind, value=value, tag=tag, param=param)
             skip_newlines()
             continue
 
@@ -144,7 +176,7 @@ def parse(tokens: List[str]) -> ProgramNode:
             skip_newlines()
             count_tok = consume()
             if not _is_int(count_tok):
-                raise QuoteScriptError(f"Expected integer after TOP:, got {count_tok!r}")
+                raise QuoteScriptError(f"Expected integer after TOP:, got {count_tok!r} at {where(-1)}")
             selection.top = int(count_tok)
             seen_top = True
             if peek() == '\n':
@@ -171,11 +203,8 @@ def parse(tokens: List[str]) -> ProgramNode:
             skip_newlines()
             count_tok = consume()
             if not _is_int(count_tok):
-                # tailor error message depending on style used
                 raise QuoteScriptError(
-                    f"Expected integer after RANDOM:, got {count_tok!r}"
-                    if tok != "RANDOM"
-                    else f"Expected integer after RANDOM, got {count_tok!r}"
+                    f"Expected integer after {tok}, got {count_tok!r} at {where(-1)}"
                 )
 
             selection.random = int(count_tok)
@@ -186,9 +215,88 @@ def parse(tokens: List[str]) -> ProgramNode:
             skip_newlines()
             continue
 
-        raise QuoteScriptError(f"Unexpected token {tok!r} at position {i}")
+        # BELOW: OFFSET: K / AFTER: R (pagination)
+        if tok in ("OFFSET:", "AFTER:"):
+            seen_below = True
+            attr = "offset" if tok == "OFFSET:" else "after"
+            if getattr(selection, attr) is not None:
+                raise QuoteScriptError(f"{tok[:-1]} specified more than once")
+            consume()  # 'OFFSET:' or 'AFTER:'
+            skip_newlines()
+            count_tok = consume()
+            if not _is_int(count_tok):
+                raise QuoteScriptError(f"Expected integer after {tok}, got {count_tok!r} at {where(-1)}")
+            setattr(selection, attr, int(count_tok))
+            if peek() == '\n':
+                consume()
+            skip_newlines()
+            continue
+
+        # BELOW: RANK
+        if tok == "RANK":
+            seen_below = True
+            if seen_rank:
+                raise QuoteScriptError("RANK specified more than once")
+            consume()  # 'RANK'
+            selection.rank = True
+            seen_rank = True
+            if peek() == '\n':
+                consume()
+            skip_newlines()
+            continue
 
-    if not filters and selection.top is None and selection.random is None:
+        raise QuoteScriptError(f"Unexpected token {tok!r} at {where()}")
+
+    if not filters and all(
+        v is None for v in (selection.top, selection.random, selection.offset, selection.after)
+    ):
         raise QuoteScriptError("Empty QuoteScript program")
 
     return ProgramNode(filters=filters, selection=selection)
+
+
+def _iter_marked(tokens: Iterable[Token]) -> Iterator[Tuple[Token, bool]]:
+    """Each token, and whether it separates programs.
+
+    Only a PROGRAM_SEPARATOR alone on its line does: a `---` inside a
+    string literal is part of that literal's token, and one sharing its
+    line with other tokens is an ordinary (invalid) token.
+    """
+    at_line_start = True
+    pending: Optional[Token] = None
+    for tok in tokens:
+        if pending is not None:
+            yield pending, tok.value == "\n"
+            pending = None
+        if at_line_start and tok.value == PROGRAM_SEPARATOR:
+            pending = tok
+        else:
+            yield tok, False
+        at_line_start = tok.value == "\n"
+    if pending is not None:
+        yield pending, True
+
+
+def has_program_separator(tokens: Iterable[Token]) -> bool:
+    """Whether the token stream holds several programs (stops at the first separator)."""
+    return any(sep for _, sep in _iter_marked(tokens))
+
+
+def split_programs(tokens: Iterable[Token]) -> Iterator[List[Token]]:
+    """Group a token stream into one token list per program.
+
+    Programs are separated by lines holding only PROGRAM_SEPARATOR; groups
+    holding only newlines (e.g. a trailing separator) are skipped. Only the
+    current program's tokens are held at a time.
+    """
+    group: List[Token] = []
+    for tok, sep in _iter_marked(tokens):
+        if sep:
+            if any(t.value != "\n" for t in group):
+                yield group
+            group = []
+        else:
+            group.append(tok)
+    if any(t.value != "\n" for t in group):
+        yield group
+
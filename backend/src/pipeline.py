@@ -1,30 +1,256 @@
+import sys
+from typing import List, Dict, Any, IO, Iterator, Mapping, Optional, Tuple
 
-from .lexer.lexer import lex
-from .parser.parser import parse
+from .lexer.lexer import Token, iter_tokens, lex
+from .parser.parser import PROGRAM_SEPARATOR, has_program_separator, parse, split_programs
 from .semantic.semantic import semantic_analysis
 from .ir.ir import to_ir
 from .optimizer.optimizer import optimize
-from .executor.executor import execute, print_output
+from .executor.executor import (
+    execute,
+    filter_label,
+    iter_execute,
+    filter_method,
+    planned_strategy,
+    row_record,
+)
+from .executor.output import RowWriter
+from .optimizer.optimizer import estimate_cost, estimate_selectivity
+from .common.cancel import QueryCancelled, check_cancelled
 from .common.errors import QuoteScriptError
+from .common.fts import has_fts
+from .common.models import IR
+from .common.profiling import Profile, profiling, timed_phase
+from .common.stats import CorpusStats
+from .common.store import get_store
+from .prepared import bind_params, get_program_cache, program_key
 
 
-def compile_and_run(source: str) -> None:
-    """Run all phases on the given QuoteScript source and print results."""
+def compile_source(source: str) -> IR:
+    """Run the compile phases (1-5) and return the optimised IR.
+
+    Compiled programs are cached by source hash (see `prepared.ProgramCache`),
+    so a program seen before costs one lookup. The returned IR is shared:
+    bind placeholders with `bind_params`, which copies it. A source holding
+    several programs is rejected (see `iter_compiled` for those).
+    """
+    store = get_store()
+    generation = None if store.is_stale() else store.generation
+    cache = get_program_cache()
+    key = program_key(source, generation)
+    ir = timed_phase("compile cache", cache.get, key)
+    if ir is not None:
+        return ir
+
     # Phase 1: Lexical analysis
-    tokens = lex(source)
+    tokens = timed_phase("lex", lex, source)
+    if has_program_separator(tokens):
+        raise QuoteScriptError(
+            f"Expected one program, found several separated by '{PROGRAM_SEPARATOR}' lines"
+        )
+
+    # Filter ordering uses the corpus statistics only when the corpus is
+    # already loaded; compiling never forces a load.
+    ir = compile_tokens(tokens, None if generation is None else store.corpus().stats())
+    cache.put(key, ir)
+    return ir
 
+
+def compile_tokens(tokens: List[Token], stats: Optional[CorpusStats] = None) -> IR:
+    """Run phases 2-5 on the tokens of one program."""
     # Phase 2: Syntax analysis
-    program = parse(tokens)
+    program = timed_phase("parse", parse, tokens)
 
     # Phase 3: Semantic analysis
-    program = semantic_analysis(program)
+    program = timed_phase("semantic", semantic_analysis, program)
 
     # Phase 4: IR generation
-    ir = to_ir(program)
+    ir = timed_phase("ir", to_ir, program)
 
     # Phase 5: Optimisation
-    ir = optimize(ir)
+    return timed_phase("optimize", optimize, ir, stats)
+
+
+def current_stats() -> Optional[CorpusStats]:
+    """The loaded corpus' statistics, or None when it is not loaded (or stale)."""
+    store = get_store()
+    return None if store.is_stale() else store.corpus().stats()
+
+
+def is_multi_program(source: str) -> bool:
+    """Whether `source` holds several programs (a `---` line outside string literals).
+
+    Tokenizes only up to the first separator. A lexical error before it
+    counts as a single program, whose compilation then reports the error.
+    """
+    if PROGRAM_SEPARATOR not in source:
+        return False
+    try:
+        return has_program_separator(iter_tokens(source))
+    except QuoteScriptError:
+        return False
+
+
+def iter_program_tokens(source: str) -> Iterator[List[Token]]:
+    """The token list of each program in `source`, lazily.
+
+    Programs in one file are separated by `---` lines
+    (`parser.PROGRAM_SEPARATOR`); tokenizing advances one program at a time.
+    """
+    return split_programs(iter_tokens(source))
+
+
+def iter_compiled(source: str) -> Iterator[IR]:
+    """Compile the programs of a (possibly multi-program) source one by one.
+
+    A source holding a single program goes through `compile_source` and
+    its cache. Raises on the first program that does not compile.
+    """
+    if not is_multi_program(source):
+        yield compile_source(source)
+        return
+    stats = current_stats()
+    for tokens in iter_program_tokens(source):
+        yield compile_tokens(tokens, stats)
+
+
+def run_source(
+    source: str, params: Optional[Mapping[str, Any]] = None
+) -> Tuple[IR, List[Dict[str, Any]]]:
+    """Compile and execute the given source, returning the IR and result rows.
+
+    `params` binds the program's `$name` placeholders.
+    """
+    ir = bind_params(compile_source(source), params)
 
     # Phase 6: Execution / codegen
-    rows = execute(ir)
-    print_output(ir, rows)
+    rows = timed_phase("execute", execute, ir)
+    return ir, rows
+
+
+def profile_source(
+    source: str, params: Optional[Mapping[str, Any]] = None
+) -> Tuple[IR, List[Dict[str, Any]], Profile]:
+    """Like `run_source`, but also returns a Profile of the run.
+
+    Takes a single program, like `run_source`; profile the programs of a
+    multi-program file one at a time.
+    """
+    with profiling() as prof:
+        ir, rows = run_source(source, params)
+    prof.result_rows = len(rows)
+    return ir, rows, prof
+
+
+def explain_source(source: str) -> Dict[str, Any]:
+    """Compile `source` and describe how it would run, without executing it.
+
+    Estimates come from the corpus statistics and are only available when
+    the corpus is already loaded (as in server or batch mode). Takes a
+    single program (see `compile_source`).
+    """
+    ir = compile_source(source)
+    store = get_store()
+    stats = None if store.is_stale() else store.corpus().stats()
+    fts = has_fts(store.db_path)
+    filters = []
+    for f in ir.filters:
+        entry: Dict[str, Any] = {"filter": filter_label(f), "method": filter_method(fts, f)}
+        if stats is not None:
+            entry["est_selectivity"] = estimate_selectivity(f, stats)
+            entry["est_cost_per_row"] = estimate_cost(f, stats)
+        filters.append(entry)
+    return {
+        "strategy": planned_strategy(ir),
+        "corpus_loaded": stats is not None,
+        "fts_index": fts,
+        "filters": filters,
+        "top": ir.selection.top,
+        "random": ir.selection.random,
+        "rank": ir.selection.rank,
+        "offset": ir.selection.offset,
+        "after": ir.selection.after,
+    }
+
+
+def format_explain(plan: Dict[str, Any]) -> str:
+    lines = ["=== EXPLAIN ==="]
+    lines.append(f"strategy : {plan['strategy']}")
+    lines.append(f"FTS index: {'yes' if plan['fts_index'] else 'no'}")
+    if not plan["corpus_loaded"]:
+        lines.append("corpus not loaded: no estimates, filters run in written order")
+    for i, f in enumerate(plan["filters"], 1):
+        est = ""
+        if "est_selectivity" in f:
+            est = f"  (est. selectivity {f['est_selectivity']:.4f}, cost/row {f['est_cost_per_row']:.1f})"
+        lines.append(f"  {i}. {f['filter']}  [{f['method']}]{est}")
+    below = []
+    if plan.get("after") is not None:
+        below.append(f"AFTER rowid {plan['after']}")
+    if plan.get("offset"):
+        below.append(f"OFFSET {plan['offset']}")
+    if plan.get("rank"):
+        below.append("RANK" + (f" (best {plan['top']} kept in a heap)" if plan["top"] is not None else ""))
+    elif plan["top"] is not None:
+        stop = plan["top"] + (plan.get("offset") or 0)
+        below.append(f"TOP {plan['top']} (scan stops after {stop} matches)")
+    if plan["random"] is not None:
+        below.append(f"RANDOM {plan['random']}")
+    lines.append("select   : " + (", then ".join(below) if below else "all matches"))
+    return "\n".join(lines)
+
+
+def compile_and_run(
+    source: str, params: Optional[Mapping[str, Any]] = None, fmt: str = "text", out: Optional[IO[str]] = None
+) -> None:
+    """Run all phases on the given QuoteScript source and write the results.
+
+    Rows stream from the executor to a buffered `RowWriter` in `fmt` (see
+    `output.FORMATS`) on `out` (default stdout). A multi-program source runs
+    its programs in order, each result under a `# program N` header (a
+    `program` column in the other formats); each program takes the
+    `params` it uses.
+    """
+    multi = is_multi_program(source)
+    writer = RowWriter(sys.stdout if out is None else out, fmt, program_column=multi)
+    if not multi:
+        writer.write_rows(iter_execute(bind_params(compile_source(source), params)))
+        return
+    params = params or {}
+    for n, ir in enumerate(iter_compiled(source), 1):
+        ir = bind_params(ir, {name: params[name] for name in ir.params() if name in params})
+        writer.write_rows(iter_execute(ir), program=n)
+
+
+def error_record(kind: str, message: str) -> Dict[str, Any]:
+    return {"ok": False, "rows": [], "error": {"type": kind, "message": message}}
+
+
+def execute_to_record(ir: IR) -> Dict[str, Any]:
+    """Execute an already-compiled IR into a structured, JSON-ready result."""
+    try:
+        check_cancelled()
+        rows = execute(ir)
+    except QueryCancelled as e:
+        # QueryCancelled or QueryTimeout
+        return error_record(type(e).__name__, str(e))
+    except QuoteScriptError as e:
+        return error_record("QuoteScriptError", str(e))
+    except Exception as e:
+        return error_record("UnexpectedError", str(e))
+    return {"ok": True, "rows": [row_record(r) for r in rows], "error": None}
+
+
+def run_to_record(source: str, params: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+    """Compile and execute `source` into a structured result; never raises.
+
+    `params` binds the program's `$name` placeholders.
+    Shape: {"ok": bool, "rows": [...], "error": None | {"type", "message"}}.
+    """
+    try:
+        ir = bind_params(compile_source(source), params)
+    except QuoteScriptError as e:
+        return error_record("QuoteScriptError", str(e))
+    except Exception as e:
+        return error_record("UnexpectedError", str(e))
+    return execute_to_record(ir)
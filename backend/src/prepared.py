@@ -0,0 +1,109 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Any, Mapping, Optional, Tuple
+
+from .common.errors import QuoteScriptError
+from .common.matching import prepare_query
+from .common.models import IR
+
+
+ProgramKey = Tuple[str, Optional[int]]
+
+
+def program_key(source: str, generation: Optional[int]) -> ProgramKey:
+    """Cache key of a compiled program.
+
+    `generation` is the store generation whose statistics the optimizer
+    used (None when it compiled without them), so programs are recompiled
+    once the DB changes and filter ordering can follow the new data.
+    """
+    return hashlib.sha256(source.encode("utf-8")).hexdigest(), generation
+
+
+class ProgramCache:
+    """LRU cache of compiled programs: source hash -> optimised IR.
+
+    Cached IRs are shared between requests and must not be modified;
+    `bind_params` returns a new IR instead.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[ProgramKey, IR]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: ProgramKey) -> Optional[IR]:
+        with self._lock:
+            ir = self._entries.get(key)
+            if ir is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return ir
+
+    def put(self, key: ProgramKey, ir: IR) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = ir
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_program_cache = ProgramCache()
+
+
+def get_program_cache() -> ProgramCache:
+    """The process-wide compiled-program cache."""
+    return _program_cache
+
+
+def bind_params(ir: IR, params: Optional[Mapping[str, Any]] = None) -> IR:
+    """Fill the `$name` placeholders of a compiled program with values.
+
+    Values are strings (numbers are converted) and get the same treatment
+    as literals: an empty value is an error, surrounding whitespace is
+    trimmed, a filter whose value is only whitespace is dropped, and the
+    matcher comes from the shared `prepare_query` cache. The IR is returned unchanged
+    when it has no placeholders and no values are given.
+    """
+    params = params or {}
+    names = ir.params()
+    if not names and not params:
+        return ir
+
+    unknown = sorted(set(params) - set(names))
+    if unknown:
+        raise QuoteScriptError("Unknown parameter(s): " + ", ".join("$" + n for n in unknown))
+    missing = [n for n in names if n not in params]
+    if missing:
+        raise QuoteScriptError("Missing value for parameter(s): " + ", ".join("$" + n for n in missing))
+
+    filters = []
+    for f in ir.filters:
+        if f.param is None:
+            filters.append(f)
+            continue
+        raw = params[f.param]
+        if not isinstance(raw, (str, int, float)) or isinstance(raw, bool):
+            raise QuoteScriptError(f"Value for ${f.param} must be a string")
+        if raw == "":
+            raise QuoteScriptError(f"Empty value for ${f.param}")
+        value = str(raw).strip()
+        if not value:
+            continue  # whitespace only: dropped, like such a literal (see optimizer.optimize)
+        filters.append(replace(f, value=value, param=None, matcher=prepare_query(value, f.tag)))
+    return IR(filters=filters, selection=ir.selection)
@@ -10,10 +10,12 @@ def semantic_analysis(program: ProgramNode) -> ProgramNode:
     - Validate TAG values.
     - Allow INT = 0.
     - If both TOP and RANDOM present, enforce 0 <= RANDOM <= TOP.
+    - RANK with RANDOM needs TOP (RANDOM N out of the best M).
+    - AFTER (rowid cursor) does not combine with RANK.
     """
     # Fill tag defaults & validate
     for name, flt in program.filters.items():
-        if not flt.value:
+        if not flt.value and flt.param is None:
             raise QuoteScriptError(f"Empty value for {name} filter")
         if flt.tag is None:
             flt.tag = "forgiving"
@@ -29,6 +31,13 @@ def semantic_analysis(program: ProgramNode) -> ProgramNode:
         if sel.random > sel.top:
             raise QuoteScriptError("RANDOM count cannot exceed TOP count (N <= M required)")
 
+    if sel.rank and sel.random is not None and sel.top is None:
+        raise QuoteScriptError("RANK with RANDOM requires TOP (RANDOM N out of the best M)")
+
+    # AFTER is a rowid cursor: it pages through rowid order, not rank order.
+    if sel.rank and sel.after is not None:
+        raise QuoteScriptError("AFTER cannot be combined with RANK; page ranked results with OFFSET")
+
     # If only one present, INT can be any >= 0 (0 allowed => zero results)
     if sel.top is not None and sel.top < 0:
         raise QuoteScriptError("TOP count cannot be negative")
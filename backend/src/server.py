@@ -0,0 +1,220 @@
+import asyncio
+import json
+import os
+import stat
+import sys
+from typing import Any, Awaitable, Callable, Dict, IO, Optional, Set
+
+from .pipeline import error_record, run_to_record
+from .common.cancel import CancelToken
+from .common.errors import QuoteScriptError
+from .service import QueryService, warm_up
+
+
+# Longest request line accepted on the socket (asyncio's default is 64 KiB).
+_MAX_LINE = 1 << 24
+
+
+def handle_request(request: Any) -> Dict[str, Any]:
+    """Run one server request and build its structured response.
+
+    A request is a JSON object: {"id": <any>, "source": "<QuoteScript>"},
+    plus "params": {"name": "value", ...} for programs with `$name`
+    placeholders. The response echoes the id and carries either the result
+    rows or an error object; it never raises.
+    """
+    invalid = _invalid_request(request)
+    if invalid is not None:
+        return invalid
+    return {"id": request.get("id"), **run_to_record(request["source"], request.get("params"))}
+
+
+async def handle_request_async(
+    service: QueryService, request: Any, running: Optional[Dict[str, CancelToken]] = None
+) -> Dict[str, Any]:
+    """`handle_request`, run by `service` (concurrently, with its limits).
+
+    `running` maps the ids of one client's requests in flight to their
+    cancellation tokens; {"id": <any>, "cancel": <id>} cancels one of them,
+    which then answers with a QueryCancelled error.
+    """
+    running = {} if running is None else running
+    if isinstance(request, dict) and "cancel" in request:
+        token = running.get(_id_key(request["cancel"]))
+        if token is None:
+            return _error_response(request.get("id"), "NotFound", "No running request has that id")
+        token.cancel()
+        return {"id": request.get("id"), "ok": True, "rows": [], "error": None}
+
+    invalid = _invalid_request(request)
+    if invalid is not None:
+        return invalid
+    req_id = request.get("id")
+    key = _id_key(req_id)
+    token = service.new_token()
+    running[key] = token
+    try:
+        return {"id": req_id, **await service.run(request["source"], request.get("params"), token)}
+    finally:
+        if running.get(key) is token:
+            del running[key]
+
+
+def _id_key(req_id: Any) -> str:
+    # ids are any JSON value, not necessarily hashable
+    return json.dumps(req_id, sort_keys=True)
+
+
+def _invalid_request(request: Any) -> Optional[Dict[str, Any]]:
+    """The error response for a malformed request, or None."""
+    req_id = request.get("id") if isinstance(request, dict) else None
+    source = request.get("source") if isinstance(request, dict) else None
+    if not isinstance(source, str):
+        return _error_response(req_id, "BadRequest", "Request must be an object with a string 'source'")
+    params = request.get("params")
+    if params is not None and not isinstance(params, dict):
+        return _error_response(req_id, "BadRequest", "'params' must be an object")
+    return None
+
+
+def _error_response(req_id: Any, kind: str, message: str) -> Dict[str, Any]:
+    return {"id": req_id, **error_record(kind, message)}
+
+
+async def _handle_line(service: QueryService, line: str, running: Dict[str, CancelToken]) -> Optional[str]:
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        response = _error_response(None, "BadRequest", f"Invalid JSON: {e}")
+    else:
+        response = await handle_request_async(service, request, running)
+    return json.dumps(response, ensure_ascii=False)
+
+
+async def _serve_lines(
+    service: QueryService,
+    read_line: Callable[[], Awaitable[str]],
+    write_line: Callable[[str], Awaitable[None]],
+) -> None:
+    """Answer one client's request lines until it stops sending.
+
+    Requests run concurrently and each response is written as soon as it is
+    ready, so responses can come back out of order (match them by id). One
+    client has at most `service.max_pending` requests in flight; the next
+    line is read only when one of them finishes (backpressure), so a client
+    streaming a large file is throttled rather than rejected. If writing to
+    the client fails, its other requests are cancelled.
+    """
+    window = asyncio.Semaphore(service.max_pending)
+    tasks: Set["asyncio.Task[None]"] = set()
+    running: Dict[str, CancelToken] = {}
+
+    async def answer(line: str) -> None:
+        try:
+            out = await _handle_line(service, line, running)
+            if out is not None:
+                await write_line(out)
+        finally:
+            window.release()
+
+    try:
+        while True:
+            await window.acquire()
+            try:
+                line = await read_line()
+            except ValueError:
+                # asyncio's line limit; the stream cannot be resynchronized
+                await write_line(json.dumps(_error_response(None, "BadRequest", "Request line too long")))
+                break
+            if not line:
+                break
+            task = asyncio.create_task(answer(line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def serve_stdio(
+    stdin: IO[str] = sys.stdin, stdout: IO[str] = sys.stdout, service: Optional[QueryService] = None
+) -> None:
+    """Serve JSON-lines requests on stdin, one JSON response line per request."""
+    warm_up()
+    asyncio.run(_serve_stdio(stdin, stdout, service or QueryService()))
+
+
+async def _serve_stdio(stdin: IO[str], stdout: IO[str], service: QueryService) -> None:
+    loop = asyncio.get_running_loop()
+
+    async def read_line() -> str:
+        # A thread, so stdin may be a pipe, a terminal or a regular file
+        return await loop.run_in_executor(None, stdin.readline)
+
+    async def write_line(out: str) -> None:
+        stdout.write(out + "\n")
+        stdout.flush()
+
+    service.start()
+    try:
+        await _serve_lines(service, read_line, write_line)
+    finally:
+        service.close()
+
+
+def serve_unix(socket_path: str, service: Optional[QueryService] = None) -> None:
+    """Serve JSON-lines requests on a local Unix socket (clients are served concurrently)."""
+    if not hasattr(asyncio, "start_unix_server"):
+        raise QuoteScriptError("Unix sockets are not supported on this platform; use stdio mode")
+
+    # A leftover socket (e.g. from a killed server) is replaced; anything
+    # else at that path is not ours to delete.
+    if os.path.lexists(socket_path):
+        if not _is_socket(socket_path):
+            raise QuoteScriptError(f"{socket_path!r} exists and is not a socket; refusing to replace it")
+        os.unlink(socket_path)
+
+    warm_up()
+    try:
+        asyncio.run(_serve_unix(socket_path, service or QueryService()))
+    finally:
+        if _is_socket(socket_path):
+            os.unlink(socket_path)
+
+
+def _is_socket(path: str) -> bool:
+    """Whether `path` itself (not a symlink's target) is a Unix socket."""
+    try:
+        return stat.S_ISSOCK(os.lstat(path).st_mode)
+    except OSError:
+        return False
+
+
+async def _serve_unix(socket_path: str, service: QueryService) -> None:
+    async def on_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        async def read_line() -> str:
+            return (await reader.readline()).decode("utf-8", errors="replace")
+
+        async def write_line(out: str) -> None:
+            writer.write(out.encode("utf-8") + b"\n")
+            await writer.drain()
+
+        try:
+            await _serve_lines(service, read_line, write_line)
+        except ConnectionError:
+            pass  # client went away; its queries were cancelled
+        finally:
+            writer.close()
+
+    service.start()
+    try:
+        server = await asyncio.start_unix_server(on_client, path=socket_path, limit=_MAX_LINE)
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
@@ -0,0 +1,183 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Mapping, Optional
+
+from .common.cancel import CancelToken, QueryCancelled, cancellable
+from .common.errors import QuoteScriptError
+from .common.store import get_store
+from .pipeline import error_record, run_to_record
+
+
+POOLS = ("thread", "process")
+
+# GIL switch interval while a thread pool serves (the default is 5 ms): a short
+# request needs several hand-offs between the loop and a worker, each of which
+# can wait a full interval behind a CPU-bound scan on another thread.
+_SWITCH_INTERVAL = 0.001
+
+
+def _run(source: str, params: Optional[Mapping[str, Any]], token: CancelToken) -> Dict[str, Any]:
+    """Run one request on a pool worker, under its cancellation token."""
+    with cancellable(token):
+        return run_to_record(source, params)
+
+
+def warm_up(report: bool = True) -> None:
+    """Load the corpus and the statistics compiling uses before the first request.
+
+    Without this the first request pays for the load and the word indexes.
+    Failures are reported (on stderr if `report`) per request instead of
+    refusing to start.
+    """
+    try:
+        store = get_store()
+        store.refresh()
+        store.corpus().stats()
+    except QuoteScriptError as e:
+        if report:
+            print("QuoteScript warm-up failed:", e, file=sys.stderr)
+
+
+def _init_process_worker() -> None:
+    """Process-pool initializer: warm up, and exit when the server is gone.
+
+    Pool workers are not told when the server process is killed, so each
+    watches its parent instead of lingering (and holding its pipes open).
+    """
+    warm_up(report=False)
+    parent = os.getppid()
+
+    def watch() -> None:
+        while os.getppid() == parent:
+            time.sleep(1.0)
+        os._exit(0)
+
+    threading.Thread(target=watch, name="quotescript-parent-watch", daemon=True).start()
+
+
+class QueryService:
+    """Runs QuoteScript requests concurrently from an asyncio event loop.
+
+    - At most `concurrency` requests execute at once, each on a pool worker
+      (threads, or processes with pool="process"); the loop only moves JSON
+      around, so it keeps accepting and answering while queries run.
+    - Admission control: at most `max_pending` requests are admitted, running
+      or waiting for a slot. Beyond that a request is answered at once with
+      an "Overloaded" error instead of joining an unbounded queue.
+    - `timeout` seconds per request, counted from admission. A request still
+      waiting at its deadline is never started; a running one is answered
+      with "QueryTimeout" at the deadline and its scan stops at the next
+      cancellation check (see common.cancel). Its slot is freed only when
+      the worker has actually stopped.
+    - `token.cancel()` on the token passed to `run`, or cancelling the `run`
+      coroutine, cancels the query the same way. Process workers only see
+      the deadline, not cancellation.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        max_pending: int = 64,
+        timeout: Optional[float] = None,
+        pool: str = "thread",
+    ):
+        if concurrency < 1:
+            raise QuoteScriptError("Concurrency must be at least 1")
+        if max_pending < concurrency:
+            raise QuoteScriptError("The request queue must hold at least `concurrency` requests")
+        if timeout is not None and timeout <= 0:
+            raise QuoteScriptError("Timeout must be positive")
+        if pool not in POOLS:
+            raise QuoteScriptError(f"Unknown pool {pool!r} (expected one of {', '.join(POOLS)})")
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pool = pool
+        self.pending = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._executor: Optional[Executor] = None
+        self._switch_interval: Optional[float] = None
+
+    def start(self) -> None:
+        """Create the worker pool; call from the event loop, after warm-up."""
+        if self.pool == "process":
+            # Forked after warm-up, so workers start with the corpus loaded
+            self._executor = ProcessPoolExecutor(self.concurrency, initializer=_init_process_worker)
+        else:
+            self._executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix="quotescript")
+            self._switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(_SWITCH_INTERVAL)
+        self._slots = asyncio.Semaphore(self.concurrency)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._switch_interval is not None:
+            sys.setswitchinterval(self._switch_interval)
+            self._switch_interval = None
+
+    def new_token(self) -> CancelToken:
+        """A token with this service's timeout, for `run` (keep it to cancel the request)."""
+        return CancelToken(self.timeout)
+
+    async def run(
+        self,
+        source: str,
+        params: Optional[Mapping[str, Any]] = None,
+        token: Optional[CancelToken] = None,
+    ) -> Dict[str, Any]:
+        """Compile and execute one program; returns its `run_to_record` result."""
+        if self._executor is None:
+            raise QuoteScriptError("QueryService.start() was not called")
+        if self.pending >= self.max_pending:
+            return error_record(
+                "Overloaded", f"Server busy ({self.pending} requests pending); retry later"
+            )
+        self.pending += 1
+        token = token or self.new_token()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), token.remaining())
+        except asyncio.TimeoutError:
+            self.pending -= 1
+            return error_record("QueryTimeout", "Query timed out while queued")
+        except asyncio.CancelledError:
+            self.pending -= 1
+            raise
+        try:
+            token.check()  # cancelled while queued
+        except QueryCancelled as e:
+            self._release()
+            return error_record(type(e).__name__, str(e))
+
+        loop = asyncio.get_running_loop()
+        try:
+            fut = loop.run_in_executor(self._executor, _run, source, params, token)
+        except BaseException:
+            self._release()
+            raise
+        fut.add_done_callback(self._finished)
+        try:
+            # shield: giving up on the answer must not drop the worker's slot early
+            return await asyncio.wait_for(asyncio.shield(fut), token.remaining())
+        except asyncio.TimeoutError:
+            return error_record("QueryTimeout", "Query timed out")
+        except asyncio.CancelledError:
+            token.cancel()
+            raise
+        except Exception as e:
+            # e.g. a process worker died
+            return error_record("UnexpectedError", str(e))
+
+    def _release(self) -> None:
+        self.pending -= 1
+        self._slots.release()
+
+    def _finished(self, fut: "asyncio.Future[Dict[str, Any]]") -> None:
+        self._release()
+        if not fut.cancelled():
+            fut.exception()  # retrieved here when nobody awaits it any more (timeout)
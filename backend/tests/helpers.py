@@ -0,0 +1,113 @@
+import difflib
+import os
+import shutil
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Sequence, Tuple
+
+from src.common.db import close_connections, iter_quotes
+from src.common.matching import (
+    SIMILARITY_THRESHOLD,
+    _normalize_case_and_spaces,
+    _stem,
+    match_exact,
+    parse_tags_field,
+)
+from src.common.models import IR, FilterIR, SelectionIR
+from src.common.store import Corpus, get_store
+from src.executor.executor import iter_match_positions
+
+
+# The quotes DB shipped with the repo (a couple of thousand rows).
+DB_PATH = Path(__file__).resolve().parent.parent / "data" / "db" / "quotes.db"
+
+Filter = Tuple[str, str, str]  # (field, value, tag)
+
+
+def load_corpus() -> Corpus:
+    return Corpus(iter_quotes(DB_PATH), DB_PATH)
+
+
+def copy_db(dest_dir: Path) -> Path:
+    """A writable copy of the bundled DB in `dest_dir`, for tests that change it."""
+    path = Path(dest_dir) / "quotes.db"
+    shutil.copyfile(DB_PATH, path)
+    return path
+
+
+def execute_sql(db_path: Path, sql: str, args: Sequence = ()) -> None:
+    conn = sqlite3.connect(str(db_path))
+    try:
+        conn.execute(sql, args)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def append_quote(db_path: Path, qid: str, content: str, author: str, tags: str) -> None:
+    execute_sql(db_path, "INSERT INTO quotes (id, content, author, tags) VALUES (?, ?, ?, ?)", (qid, content, author, tags))
+
+
+@contextmanager
+def using_db(db_path: Path) -> Iterator[None]:
+    """Point the process-wide store at `db_path` (QUOTESCRIPT_DB_PATH) inside the block."""
+    previous = os.environ.get("QUOTESCRIPT_DB_PATH")
+    os.environ["QUOTESCRIPT_DB_PATH"] = str(db_path)
+    try:
+        yield
+    finally:
+        if previous is None:
+            del os.environ["QUOTESCRIPT_DB_PATH"]
+        else:
+            os.environ["QUOTESCRIPT_DB_PATH"] = previous
+        get_store().clear()
+        close_connections()
+
+
+def similar(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+def naive_match(text: str, value: str, tag: str) -> bool:
+    """The original row-level matcher: every word of the text against the query."""
+    if tag == "exact":
+        return match_exact(text, value)
+    if not text or not value:
+        return False
+    field_norm = _normalize_case_and_spaces(text)
+    query_norm = _normalize_case_and_spaces(value)
+    if query_norm in field_norm:
+        return True
+    if tag == "loose":
+        stems = {_stem(w) for w in query_norm.split() if w}
+        return any(
+            st and (fw.startswith(st) or similar(fw, st) >= SIMILARITY_THRESHOLD)
+            for fw in field_norm.split()
+            for st in stems
+        )
+    return any(similar(w, query_norm) >= SIMILARITY_THRESHOLD for w in field_norm.split())
+
+
+def naive_positions(corpus: Corpus, filters: Sequence[Filter]) -> List[int]:
+    """Positions of the rows passing every filter, checked row by row."""
+    out = []
+    rows = corpus.rows
+    for pos in range(len(corpus)):
+        row = rows[pos]
+        for field, value, tag in filters:
+            if field == "theme":
+                ok = any(naive_match(t, value, tag) for t in parse_tags_field(row["tags"]))
+            else:
+                ok = naive_match(row["content" if field == "quote" else "author"], value, tag)
+            if not ok:
+                break
+        else:
+            out.append(pos)
+    return out
+
+
+def planned_positions(corpus: Corpus, filters: Sequence[Filter]) -> List[int]:
+    """The same, through the executor (indexes, value columns, bitmaps)."""
+    ir = IR(filters=[FilterIR(*f) for f in filters], selection=SelectionIR(top=None, random=None))
+    return list(iter_match_positions(ir, corpus))
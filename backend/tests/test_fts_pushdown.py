@@ -0,0 +1,87 @@
+import tempfile
+import unittest
+
+from src.common.db import iter_quotes
+from src.common.fts import build_fts
+from src.common.models import IR, FilterIR, SelectionIR
+from src.common.store import Corpus, QuoteStore, get_store
+from src.executor.executor import choose_strategy, iter_match_positions, iter_pushdown_matches
+from src.pipeline import run_source
+
+from .helpers import copy_db, using_db
+
+
+class FtsPushdownTest(unittest.TestCase):
+    """All-exact queries answered from the FTS index return what the in-memory scan does."""
+
+    CASES = (
+        [("quote", "love", "exact")],
+        [("quote", "don't", "exact")],
+        [("author", "Einstein", "exact")],
+        [("author", "einstein", "exact")],
+        [("theme", "wisdom", "exact")],
+        [("quote", "the", "exact"), ("author", "Wilde", "exact")],
+        [("quote", "qqqq", "exact")],
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.db_path = copy_db(cls.tmp.name)
+        build_fts(cls.db_path)
+        cls.corpus = Corpus(iter_quotes(cls.db_path), cls.db_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def in_memory_rowids(self, ir):
+        return [self.corpus.rowids[pos] for pos in iter_match_positions(ir, self.corpus)]
+
+    def pushdown_rowids(self, ir):
+        store = QuoteStore(self.db_path)
+        rows = iter_pushdown_matches(store, ir)
+        self.assertIsNotNone(rows)
+        rowids = [row["_rowid"] for row in rows]
+        self.assertTrue(store.is_stale(), "pushdown loaded the corpus")
+        return rowids
+
+    def test_matches_in_memory_scan(self):
+        for filters in self.CASES:
+            with self.subTest(filters=filters):
+                ir = IR([FilterIR(*f) for f in filters], SelectionIR(top=None, random=None))
+                self.assertEqual(self.pushdown_rowids(ir), self.in_memory_rowids(ir))
+
+    def test_after_cursor(self):
+        ir = IR([FilterIR("quote", "love", "exact")], SelectionIR(top=None, random=None))
+        full = self.in_memory_rowids(ir)
+        for after in (full[0], full[len(full) // 2], full[-1]):
+            with self.subTest(after=after):
+                ir.selection.after = after
+                self.assertEqual(self.pushdown_rowids(ir), [r for r in full if r > after])
+
+    def test_rows_match_loaded_rows(self):
+        source = 'QUOTE: "the" -e\nAUTHOR: "Wilde" -e'
+        with using_db(self.db_path):
+            store = get_store()
+            ir, pushed = run_source(source)
+            self.assertTrue(store.is_stale(), "pushdown loaded the corpus")
+            store.corpus()
+            self.assertEqual(choose_strategy(store, ir), "in-memory")
+            _, loaded = run_source(source)
+        self.assertTrue(pushed)
+        self.assertEqual([dict(r) for r in pushed], [dict(r) for r in loaded])
+
+    def test_not_pushed_down(self):
+        store = QuoteStore(self.db_path)
+        for filters in ([("quote", "love", "forgiving")], [("quote", "love", "exact"), ("author", "wilde", "loose")]):
+            with self.subTest(filters=filters):
+                ir = IR([FilterIR(*f) for f in filters], SelectionIR(top=None, random=None))
+                self.assertIsNone(iter_pushdown_matches(store, ir))
+        store.corpus()
+        ir = IR([FilterIR("quote", "love", "exact")], SelectionIR(top=None, random=None))
+        self.assertIsNone(iter_pushdown_matches(store, ir))
+
+
+if __name__ == "__main__":
+    unittest.main()
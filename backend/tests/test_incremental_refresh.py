@@ -0,0 +1,96 @@
+import tempfile
+import unittest
+
+from src.common.db import iter_quotes
+from src.common.profiling import profiling
+from src.common.store import Corpus, QuoteStore
+
+from .helpers import append_quote, copy_db, execute_sql, planned_positions
+
+
+FILTERS = (
+    [("quote", "hapiness", "forgiving")],
+    [("quote", "zyzzyva", "forgiving")],
+    [("author", "Nobody Known", "exact")],
+    [("author", "einstien", "forgiving"), ("theme", "science", "loose")],
+    [("theme", "palindromes", "loose")],
+    [("quote", "mind", "forgiving"), ("author", "buddha", "loose")],
+)
+
+
+class IncrementalRefreshTest(unittest.TestCase):
+    """A loaded store only reads appended rows, and reloads in full after other changes."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = copy_db(self.tmp.name)
+        self.store = QuoteStore(self.db_path)
+
+    def refresh(self):
+        with profiling() as prof:
+            self.assertTrue(self.store.refresh())
+        return prof
+
+    def append(self):
+        append_quote(self.db_path, "test-1", "Happiness is a warm puppy.", "Charles Schulz", "['Happiness']")
+        append_quote(self.db_path, "test-2", "Zyzzyva, racecar.", "Nobody Known", "['Palindromes', 'Words']")
+
+    def assertMatchesFreshLoad(self, corpus):
+        fresh = Corpus(iter_quotes(self.db_path), self.db_path)
+        self.assertEqual(list(corpus.rowids), list(fresh.rowids))
+        self.assertEqual([dict(r) for r in corpus.rows], [dict(r) for r in fresh.rows])
+        for filters in FILTERS:
+            with self.subTest(filters=filters):
+                self.assertEqual(planned_positions(corpus, filters), planned_positions(fresh, filters))
+
+    def test_append_with_indexes_built(self):
+        old = self.store.corpus()
+        for filters in FILTERS:
+            planned_positions(old, filters)  # builds the columns and word indexes
+        n = len(old)
+        self.append()
+        prof = self.refresh()
+        self.assertEqual((prof.load_source, prof.rows_loaded), ("incremental", 2))
+        corpus = self.store.corpus()
+        self.assertIsNot(corpus, old)
+        self.assertEqual(len(old), n)
+        self.assertEqual(planned_positions(corpus, [("author", "Nobody Known", "exact")]), [n + 1])
+        self.assertEqual(planned_positions(old, [("author", "Nobody Known", "exact")]), [])
+        self.assertMatchesFreshLoad(corpus)
+
+    def test_append_before_indexes_built(self):
+        self.store.corpus()
+        self.append()
+        self.assertEqual(self.refresh().load_source, "incremental")
+        self.assertMatchesFreshLoad(self.store.corpus())
+
+    def test_unchanged_db_is_not_reloaded(self):
+        self.store.corpus()
+        self.assertFalse(self.store.refresh())
+
+    def test_full_reload(self):
+        changes = (
+            ("delete", "DELETE FROM quotes WHERE rowid = (SELECT min(rowid) + 10 FROM quotes)"),
+            ("tail update", "UPDATE quotes SET content = 'Changed.' WHERE rowid = (SELECT max(rowid) FROM quotes)"),
+            ("delete last", "DELETE FROM quotes WHERE rowid = (SELECT max(rowid) FROM quotes)"),
+        )
+        for name, sql in changes:
+            with self.subTest(change=name):
+                self.store.corpus()
+                execute_sql(self.db_path, sql)
+                prof = self.refresh()
+                self.assertEqual(prof.load_source, "sqlite")
+                self.assertEqual(prof.rows_loaded, len(self.store.corpus()))
+                self.assertMatchesFreshLoad(self.store.corpus())
+
+    def test_delete_then_append_reloads(self):
+        self.store.corpus()
+        execute_sql(self.db_path, "DELETE FROM quotes WHERE rowid = (SELECT min(rowid) FROM quotes)")
+        self.append()
+        self.assertEqual(self.refresh().load_source, "sqlite")
+        self.assertMatchesFreshLoad(self.store.corpus())
+
+
+if __name__ == "__main__":
+    unittest.main()
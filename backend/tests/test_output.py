@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+import unittest
+
+from src.common.errors import QuoteScriptError
+from src.executor.output import COLUMNS, RowWriter, row_record, text_line
+from src.pipeline import run_source
+
+
+# Quotes, separators and newlines that csv / tsv must escape.
+AWKWARD = {
+    "_rowid": 7, "id": "x-1", "content": 'He said, "no"\tthen\nleft — café', "author": "A. N. Other",
+    "tags": "['Odd', 'Tab\\tbed']",
+}
+
+
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, s):
+        self.writes += 1
+        return super().write(s)
+
+
+def write(rows, fmt, programs=None):
+    out = io.StringIO()
+    writer = RowWriter(out, fmt, program_column=programs is not None)
+    counts = [writer.write_rows(r, p) for p, r in (programs or [(None, rows)])]
+    return out.getvalue(), counts
+
+
+def cells(row):
+    return ["" if row.get(k) is None else str(row.get(k)) for k in ("_rowid", "id", "content", "author", "tags", "_score")]
+
+
+class RowWriterTest(unittest.TestCase):
+    """Each output format writes the rows it is given and can be read back."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.rows = run_source('AUTHOR: "Einstein"\nTOP: 5')[1] + [AWKWARD]
+        cls.ranked = run_source('QUOTE: "hapiness"\nTOP: 3\nRANK')[1]
+
+    def test_jsonl(self):
+        for rows in (self.rows, self.ranked):
+            text, counts = write(rows, "jsonl")
+            self.assertEqual(counts, [len(rows)])
+            self.assertEqual([json.loads(line) for line in text.splitlines()], [row_record(r) for r in rows])
+        self.assertIn("café", write([AWKWARD], "jsonl")[0])
+        self.assertEqual(set(row_record(self.ranked[0])), set(COLUMNS))
+        self.assertNotIn("score", row_record(self.rows[0]))
+
+    def test_csv_and_tsv(self):
+        for fmt, dialect in (("csv", "excel"), ("tsv", "excel-tab")):
+            for rows in (self.rows, self.ranked):
+                with self.subTest(fmt=fmt, ranked=rows is self.ranked):
+                    text, _ = write(rows, fmt)
+                    parsed = list(csv.reader(io.StringIO(text, newline=""), dialect=dialect))
+                    self.assertEqual(parsed[0], list(COLUMNS))
+                    self.assertEqual(parsed[1:], [cells(r) for r in rows])
+
+    def test_text(self):
+        text, _ = write(self.ranked, "text")
+        self.assertEqual(text, "".join(text_line(r) for r in self.ranked))
+        self.assertIn("(score ", text)
+        self.assertEqual(write([], "text")[0], "No matches found.\n")
+        for fmt in ("jsonl", "tsv"):
+            self.assertEqual(write([], fmt)[0], "" if fmt == "jsonl" else "\t".join(COLUMNS) + "\r\n")
+
+    def test_program_column(self):
+        programs = [(1, self.rows[:2]), (2, []), (3, self.ranked[:1])]
+        text, counts = write(None, "jsonl", programs)
+        self.assertEqual(counts, [2, 0, 1])
+        self.assertEqual([json.loads(line)["program"] for line in text.splitlines()], [1, 1, 3])
+        text, _ = write(None, "csv", programs)
+        parsed = list(csv.reader(io.StringIO(text, newline="")))
+        self.assertEqual(parsed[0], ["program"] + list(COLUMNS))
+        self.assertEqual([p[0] for p in parsed[1:]], ["1", "1", "3"])
+        text, _ = write(None, "text", programs)
+        self.assertEqual(text.splitlines()[3:5], ["# program 2", "No matches found."])
+
+    def test_writes_in_chunks(self):
+        rows = [dict(AWKWARD, _rowid=i) for i in range(5000)]
+        for fmt in ("text", "jsonl", "csv"):
+            with self.subTest(fmt=fmt):
+                out = CountingStream()
+                self.assertEqual(RowWriter(out, fmt).write_rows(iter(rows)), len(rows))
+                self.assertLess(out.writes, 20)
+
+    def test_unknown_format(self):
+        with self.assertRaises(QuoteScriptError):
+            RowWriter(io.StringIO(), "xml")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import tempfile
+import unittest
+from contextlib import ExitStack
+
+from src.common.db import load_quotes
+from src.common.fts import build_fts
+from src.common.store import get_store
+from src.executor.executor import choose_strategy
+from src.pipeline import compile_source, run_source
+
+from .helpers import copy_db, using_db
+
+
+# (name, filter lines, store loaded first, strategy taken)
+PATHS = (
+    ("in-memory", 'QUOTE: "love"\n', True, "in-memory"),
+    ("exact in-memory", 'QUOTE: "love" -e\n', True, "in-memory"),
+    ("FTS pushdown", 'QUOTE: "love" -e\n', False, "pushdown"),
+    ("unfiltered, loaded", "", True, "unfiltered"),
+    ("unfiltered, SQLite", "", False, "unfiltered"),
+)
+
+
+class PagingTest(unittest.TestCase):
+    """OFFSET / AFTER pages concatenate to the full result on every execution path."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(cls.tmp.cleanup)
+        cls.db_path = copy_db(cls.tmp.name)
+        build_fts(cls.db_path)
+        stack = ExitStack()
+        stack.enter_context(using_db(cls.db_path))
+        cls.addClassCleanup(stack.close)
+
+    def rowids(self, filters, selection, loaded, strategy):
+        source = filters + selection
+        store = get_store()
+        if loaded:
+            store.corpus()
+        else:
+            store.clear()
+        self.assertEqual(choose_strategy(store, compile_source(source)), strategy)
+        return [r["_rowid"] for r in run_source(source)[1]]
+
+    def full(self, filters):
+        if not filters:
+            return [r["_rowid"] for r in load_quotes(self.db_path)]
+        get_store().corpus()
+        return [r["_rowid"] for r in run_source(filters.rstrip("\n"))[1]]
+
+    def test_after_pages(self):
+        for name, filters, loaded, strategy in PATHS:
+            with self.subTest(path=name):
+                full = self.full(filters)
+                pages, after, size = [], None, max(len(full) // 5, 1)
+                while True:
+                    cursor = "" if after is None else f"\nAFTER: {after}"
+                    page = self.rowids(filters, f"TOP: {size}{cursor}", loaded, strategy)
+                    if not page:
+                        break
+                    self.assertLessEqual(len(page), size)
+                    pages += page
+                    after = page[-1]
+                self.assertEqual(pages, full)
+
+    def test_offset_pages(self):
+        for name, filters, loaded, strategy in PATHS:
+            with self.subTest(path=name):
+                full = self.full(filters)
+                size = max(len(full) // 4, 1)
+                pages = []
+                for k in range(0, len(full) + size, size):
+                    pages += self.rowids(filters, f"OFFSET: {k}\nTOP: {size}", loaded, strategy)
+                self.assertEqual(pages, full)
+
+    def test_after_then_offset(self):
+        for name, filters, loaded, strategy in PATHS:
+            with self.subTest(path=name):
+                full = self.full(filters)
+                cursor = full[len(full) // 3]
+                rest = [r for r in full if r > cursor]
+                self.assertEqual(self.rowids(filters, f"AFTER: {cursor}\nOFFSET: 3\nTOP: 5", loaded, strategy), rest[3:8])
+                self.assertEqual(self.rowids(filters, f"AFTER: {cursor}\nOFFSET: 2\nTOP: 1000000", loaded, strategy), rest[2:])
+                self.assertEqual(self.rowids(filters, f"AFTER: {full[-1]}\nTOP: 5", loaded, strategy), [])
+                picked = self.rowids(filters, f"AFTER: {cursor}\nRANDOM 5", loaded, strategy)
+                self.assertEqual(len(picked), 5)
+                self.assertTrue(set(picked) <= set(rest))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+from src.common.errors import QuoteScriptError
+from src.common.matching import _normalize_case_and_spaces
+from src.pipeline import run_source
+
+from .helpers import similar
+
+
+FUZZY = 'QUOTE: "hapiness"'
+
+
+def ranked(source):
+    return [(r["_score"], r["_rowid"]) for r in run_source(source + "\nRANK")[1]]
+
+
+class RankTest(unittest.TestCase):
+    """RANK orders by score, best first, keeping rowid order among equal scores."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.full = ranked(FUZZY)
+
+    def test_order_and_ties(self):
+        scores = [s for s, _ in self.full]
+        self.assertGreater(len(set(scores)), 1)
+        self.assertLess(len(set(scores)), len(scores))
+        self.assertEqual(self.full, sorted(self.full, key=lambda sr: (-sr[0], sr[1])))
+
+    def test_same_rows_as_unranked(self):
+        unranked = [r["_rowid"] for r in run_source(FUZZY)[1]]
+        self.assertEqual(sorted(rowid for _, rowid in self.full), unranked)
+
+    def test_scores(self):
+        rows = run_source(FUZZY + "\nRANK")[1]
+        for row in rows:
+            text = _normalize_case_and_spaces(row["content"])
+            expected = 1.0 if "hapiness" in text else max(similar(w, "hapiness") for w in text.split())
+            self.assertAlmostEqual(row["_score"], expected)
+        # The mean over filters: a substring hit scores 1.0.
+        for score, _ in ranked('QUOTE: "love"\nAUTHOR: "einstien"'):
+            self.assertAlmostEqual(score, (1.0 + similar("einstein", "einstien")) / 2)
+        self.assertEqual({s for s, _ in ranked('AUTHOR: "Albert Einstein" -e')}, {1.0})
+
+    def test_top_keeps_the_best(self):
+        for m in (1, 10, 50, len(self.full), len(self.full) + 5):
+            with self.subTest(top=m):
+                self.assertEqual(ranked(f"{FUZZY}\nTOP: {m}"), self.full[:m])
+
+    def test_offset_pages(self):
+        pages = []
+        for k in range(0, len(self.full), 7):
+            pages += ranked(f"{FUZZY}\nOFFSET: {k}\nTOP: 7")
+        self.assertEqual(pages, self.full)
+        self.assertEqual(ranked(f"{FUZZY}\nOFFSET: 40"), self.full[40:])
+
+    def test_random_picks_among_the_best(self):
+        best = self.full[:20]
+        for _ in range(5):
+            picked = ranked(f"{FUZZY}\nTOP: 20\nRANDOM 5")
+            self.assertEqual(len(picked), 5)
+            self.assertTrue(set(picked) <= set(best))
+            self.assertEqual(picked, sorted(picked, key=lambda sr: (-sr[0], sr[1])))
+
+    def test_after_is_rejected(self):
+        with self.assertRaises(QuoteScriptError):
+            run_source(FUZZY + "\nRANK\nAFTER: 5")
+
+
+if __name__ == "__main__":
+    unittest.main()
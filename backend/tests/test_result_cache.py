@@ -0,0 +1,108 @@
+import tempfile
+import unittest
+from contextlib import ExitStack
+from pathlib import Path
+
+from src.common.models import FilterIR
+from src.executor.cache import cache_key, configure_result_cache, get_result_cache
+from src.pipeline import run_source
+
+from .helpers import append_quote, copy_db, using_db
+
+
+SOURCE = 'QUOTE: "mind"\nTHEME: "wisdom"'
+
+
+def rowids(rows):
+    return [r["_rowid"] for r in rows]
+
+
+class ResultCacheTest(unittest.TestCase):
+    """Filter results are served from the cache and invalidated when the DB changes."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = copy_db(self.tmp.name)
+        stack = ExitStack()
+        stack.enter_context(using_db(self.db_path))
+        self.addCleanup(stack.close)
+        configure_result_cache()
+        self.cache = get_result_cache()
+
+    def tearDown(self):
+        configure_result_cache()
+
+    def run_uncached(self, source):
+        configure_result_cache(enabled=False)
+        try:
+            return run_source(source)[1]
+        finally:
+            configure_result_cache()
+            self.cache = get_result_cache()
+
+    def test_hit_after_miss(self):
+        first = run_source(SOURCE)[1]
+        self.assertEqual((self.cache.hits, self.cache.misses, len(self.cache)), (0, 1, 1))
+        second = run_source(SOURCE)[1]
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertTrue(first)
+        self.assertEqual([dict(r) for r in second], [dict(r) for r in first])
+
+    def test_selections_share_an_entry(self):
+        full = rowids(run_source(SOURCE)[1])
+        self.assertEqual(rowids(run_source(SOURCE + "\nTOP: 2")[1]), full[:2])
+        self.assertEqual(rowids(run_source(SOURCE + "\nOFFSET: 1\nTOP: 2")[1]), full[1:3])
+        self.assertEqual(rowids(run_source(SOURCE + f"\nAFTER: {full[0]}")[1]), full[1:])
+        self.assertTrue(set(rowids(run_source(SOURCE + "\nRANDOM 2")[1])) <= set(full))
+        self.assertEqual((self.cache.hits, self.cache.misses, len(self.cache)), (4, 1, 1))
+
+    def test_top_miss_does_not_fill(self):
+        self.assertEqual(len(run_source(SOURCE + "\nTOP: 1")[1]), 1)
+        self.assertEqual(len(self.cache), 0)
+        run_source(SOURCE)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_after_miss_does_not_fill(self):
+        full = rowids(run_source(SOURCE)[1])
+        self.cache.clear()
+        self.assertEqual(rowids(run_source(SOURCE + f"\nAFTER: {full[0]}")[1]), full[1:])
+        self.assertEqual(len(self.cache), 0)
+
+    def test_matches_uncached(self):
+        for source in (SOURCE, 'QUOTE: "love" -l\nAUTHOR: "a" -l', 'QUOTE: "qqqq"'):
+            with self.subTest(source=source):
+                run_source(source)
+                cached = run_source(source)[1]
+                self.assertEqual([dict(r) for r in cached], [dict(r) for r in self.run_uncached(source)])
+
+    def test_db_change_invalidates(self):
+        before = rowids(run_source(SOURCE)[1])
+        append_quote(self.db_path, "test-1", "The mind is everything.", "The Buddha", "['Wisdom']")
+        after = run_source(SOURCE)[1]
+        self.assertEqual(self.cache.misses, 2)
+        self.assertEqual(rowids(after)[:-1], before)
+        self.assertEqual(after[-1]["id"], "test-1")
+        self.assertEqual(rowids(run_source(SOURCE)[1]), rowids(after))
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_disk_tier_survives_a_new_cache(self):
+        disk_dir = Path(self.tmp.name) / "cache"
+        configure_result_cache(disk_dir=disk_dir)
+        first = rowids(run_source(SOURCE)[1])
+        self.assertEqual(len(list(disk_dir.glob("*.json"))), 1)
+        configure_result_cache(disk_dir=disk_dir)
+        cache = get_result_cache()
+        self.assertEqual(rowids(run_source(SOURCE)[1]), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+    def test_key(self):
+        a, b = FilterIR("quote", "love", "forgiving"), FilterIR("author", "wilde", "loose")
+        fp = ("quotes.db", 1, 2)
+        self.assertEqual(cache_key([a, b], fp), cache_key([b, a], fp))
+        self.assertNotEqual(cache_key([a, b], fp), cache_key([a, b], ("quotes.db", 1, 3)))
+        self.assertNotEqual(cache_key([a], fp), cache_key([FilterIR("quote", "love", "loose")], fp))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import pickle
+import unittest
+
+from src.common.columns import TextColumn
+from src.common.db import QUOTE_FIELDS, load_quotes
+from src.common.store import Corpus
+
+from .helpers import DB_PATH, load_corpus
+
+
+def stored(record):
+    # A Corpus keeps NULL fields as ''.
+    return {k: "" if v is None else v for k, v in record.items()}
+
+
+class RowViewTest(unittest.TestCase):
+    """Row views over the corpus columns behave like the dict rows read from SQLite."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.corpus = load_corpus()
+        cls.records = load_quotes(DB_PATH)
+
+    def test_rows_equal_sqlite_rows(self):
+        rows = self.corpus.rows
+        self.assertEqual(len(rows), len(self.records))
+        for row, record in zip(rows, self.records):
+            self.assertEqual(row, stored(record))
+
+    def test_mapping_interface(self):
+        row = self.corpus.rows[5]
+        record = stored(self.records[5])
+        self.assertEqual(list(row), list(QUOTE_FIELDS))
+        self.assertEqual(len(row), len(QUOTE_FIELDS))
+        self.assertEqual(dict(row), record)
+        self.assertEqual(list(row.items()), list(record.items()))
+        self.assertEqual(row.get("author"), record["author"])
+        self.assertIn("content", row)
+        self.assertNotIn("_score", row)
+        self.assertIsNone(row.get("_score"))
+        self.assertEqual(row.get("_score", 0.5), 0.5)
+        with self.assertRaises(KeyError):
+            row["_score"]
+        self.assertEqual(dict(row, _score=1.0), dict(record, _score=1.0))
+
+    def test_pickles_as_dict(self):
+        row = self.corpus.rows[7]
+        copy = pickle.loads(pickle.dumps(row))
+        self.assertIs(type(copy), dict)
+        self.assertEqual(copy, stored(self.records[7]))
+
+    def test_sequence_interface(self):
+        rows = self.corpus.rows
+        n = len(self.records)
+        self.assertEqual(rows[-1], stored(self.records[-1]))
+        self.assertEqual(rows[-n], stored(self.records[0]))
+        for bad in (n, -n - 1):
+            with self.subTest(pos=bad):
+                with self.assertRaises(IndexError):
+                    rows[bad]
+        self.assertEqual(rows[10:20:3], [stored(r) for r in self.records[10:20:3]])
+        self.assertEqual(rows[n - 2:n + 5], [stored(r) for r in self.records[-2:]])
+
+    def test_extended_corpus_leaves_rows_of_the_old_one(self):
+        half = len(self.records) // 2
+        records = [tuple(r.values()) for r in self.records]
+        first = Corpus(records[:half], DB_PATH)
+        self.assertTrue(len(first.authors))  # built, so forked by `extended`
+        grown = first.extended(records[half:])
+        self.assertEqual(len(first.rows), half)
+        self.assertEqual(list(grown.rows), [stored(r) for r in self.records])
+        self.assertEqual(list(first.rows), [stored(r) for r in self.records[:half]])
+
+
+class TextColumnTest(unittest.TestCase):
+    """Packed UTF-8 text columns return the strings they were given."""
+
+    VALUES = ["", "plain", "café", "日本語のテキスト", "emoji 🙂", "x" * 1000]
+
+    def test_round_trip(self):
+        col = TextColumn()
+        col.append(self.VALUES[0])
+        col.extend(self.VALUES[1:4])
+        col.extend([])
+        for v in self.VALUES[4:]:
+            col.append(v)
+        self.assertEqual(len(col), len(self.VALUES))
+        self.assertEqual(list(col), self.VALUES)
+        self.assertEqual(col[1:4], self.VALUES[1:4])
+        self.assertEqual(col[-1], self.VALUES[-1])
+        self.assertEqual(col[-len(col)], self.VALUES[0])
+        for bad in (len(col), -len(col) - 1):
+            with self.subTest(i=bad):
+                with self.assertRaises(IndexError):
+                    col[bad]
+
+    def test_copy_is_independent(self):
+        col = TextColumn()
+        col.extend(self.VALUES)
+        copy = col.copy()
+        copy.append("more")
+        self.assertEqual(list(col), self.VALUES)
+        self.assertEqual(list(copy), self.VALUES + ["more"])
+
+
+if __name__ == "__main__":
+    unittest.main()
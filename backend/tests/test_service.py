@@ -0,0 +1,170 @@
+import asyncio
+import tempfile
+import time
+import unittest
+from contextlib import ExitStack
+
+from src.common.cancel import CancelToken, cancellable
+from src.common.errors import QuoteScriptError
+from src.executor.cache import configure_result_cache
+from src.pipeline import run_to_record
+from src.service import QueryService
+
+from .helpers import copy_db, execute_sql, using_db
+
+
+# A loose multi-word QUOTE filter checks most rows one by one.
+HEAVY = 'QUOTE: "the wisdom of" -l'
+LIGHT = 'AUTHOR: "Albert Einstein" -e\nTOP: 3'
+
+
+class CountingToken(CancelToken):
+    """Counts cancellation checks; `delay` per check stretches a scan to seconds."""
+
+    def __init__(self, timeout=None, delay=0.0):
+        super().__init__(timeout)
+        self.delay = delay
+        self.checks = 0
+
+    def check(self):
+        self.checks += 1
+        time.sleep(self.delay)
+        super().check()
+
+
+def error_type(record):
+    return None if record["ok"] else record["error"]["type"]
+
+
+async def settled(service, limit=10.0):
+    """Wait until every admitted request has released its slot."""
+    t0 = time.monotonic()
+    while service.pending and time.monotonic() - t0 < limit:
+        await asyncio.sleep(0.01)
+
+
+class QueryServiceTest(unittest.TestCase):
+    """Requests past their deadline, cancelled or over the queue bound are answered and stop."""
+
+    @classmethod
+    def setUpClass(cls):
+        tmp = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(tmp.cleanup)
+        db_path = copy_db(tmp.name)
+        for i in range(5):
+            execute_sql(db_path, "INSERT INTO quotes (id, content, author, tags) "
+                                 "SELECT id || ?, content, author, tags FROM quotes", (f"-{i}",))
+        stack = ExitStack()
+        stack.enter_context(using_db(db_path))
+        cls.addClassCleanup(stack.close)
+        # Every run of HEAVY must scan.
+        configure_result_cache(enabled=False)
+        cls.addClassCleanup(configure_result_cache)
+        token = CountingToken()
+        with cancellable(token):
+            record = run_to_record(HEAVY)
+        assert record["ok"] and record["rows"]
+        cls.full_checks = token.checks
+
+    def heavy_token(self, timeout=None):
+        # About a second and a half for the whole scan.
+        return CountingToken(timeout, delay=1.5 / self.full_checks)
+
+    def serve(self, scenario, **options):
+        async def main():
+            service = QueryService(**options)
+            service.start()
+            try:
+                return await scenario(service)
+            finally:
+                service.close()
+        return asyncio.run(main())
+
+    def assertStoppedEarly(self, token):
+        self.assertLess(token.checks, self.full_checks / 2, "the scan was not stopped")
+
+    def test_answers(self):
+        async def scenario(service):
+            return await service.run(LIGHT)
+        self.assertEqual(self.serve(scenario), run_to_record(LIGHT))
+
+    def test_timeout(self):
+        token = self.heavy_token(timeout=0.2)
+
+        async def scenario(service):
+            t0 = time.monotonic()
+            record = await service.run(HEAVY, token=token)
+            answered = time.monotonic() - t0
+            await settled(service)
+            return record, answered
+
+        record, answered = self.serve(scenario, timeout=0.2)
+        self.assertEqual(error_type(record), "QueryTimeout")
+        self.assertLess(answered, 1.0)
+        self.assertStoppedEarly(token)
+
+    def test_cancel_token(self):
+        token = self.heavy_token()
+
+        async def scenario(service):
+            task = asyncio.create_task(service.run(HEAVY, token=token))
+            await asyncio.sleep(0.2)
+            token.cancel()
+            record = await task
+            await settled(service)
+            return record
+
+        self.assertEqual(error_type(self.serve(scenario)), "QueryCancelled")
+        self.assertStoppedEarly(token)
+
+    def test_cancel_request(self):
+        token = self.heavy_token()
+
+        async def scenario(service):
+            task = asyncio.create_task(service.run(HEAVY, token=token))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            await settled(service)
+
+        self.serve(scenario)
+        self.assertIsNotNone(token.reason)
+        self.assertStoppedEarly(token)
+
+    def test_overloaded(self):
+        token = self.heavy_token()
+
+        async def scenario(service):
+            first = asyncio.create_task(service.run(HEAVY, token=token))
+            await asyncio.sleep(0)
+            second = await service.run(LIGHT)
+            token.cancel()
+            return await first, second
+
+        first, second = self.serve(scenario, concurrency=1, max_pending=1)
+        self.assertEqual(error_type(second), "Overloaded")
+        self.assertEqual(error_type(first), "QueryCancelled")
+
+    def test_timeout_while_queued(self):
+        token = self.heavy_token(timeout=0.2)
+
+        async def scenario(service):
+            heavy = asyncio.create_task(service.run(HEAVY, token=token))
+            await asyncio.sleep(0)
+            light = await service.run(LIGHT)
+            return await heavy, light
+
+        heavy, light = self.serve(scenario, concurrency=1, max_pending=2, timeout=0.2)
+        self.assertEqual(error_type(heavy), "QueryTimeout")
+        self.assertEqual(light["error"], {"type": "QueryTimeout", "message": "Query timed out while queued"})
+
+    def test_invalid_options(self):
+        for options in ({"concurrency": 0}, {"concurrency": 4, "max_pending": 2}, {"timeout": 0}, {"pool": "fibers"}):
+            with self.subTest(options=options):
+                with self.assertRaises(QuoteScriptError):
+                    QueryService(**options)
+
+
+if __name__ == "__main__":
+    unittest.main()
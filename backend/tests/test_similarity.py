@@ -0,0 +1,58 @@
+import random
+import unittest
+
+from src.common.matching import SIMILARITY_THRESHOLD, _similar_at_least, _similarity_at_least
+
+from .helpers import load_corpus, similar
+
+
+def _edits(word: str, rng: random.Random) -> list:
+    """A few misspellings of `word`: a deletion, a substitution, an insertion, a swap."""
+    i = rng.randrange(len(word))
+    c = rng.choice("aeiourstn")
+    out = [word[:i] + word[i + 1:], word[:i] + c + word[i + 1:], word[:i] + c + word[i:]]
+    if len(word) > 1:
+        j = min(i, len(word) - 2)
+        out.append(word[:j] + word[j + 1] + word[j] + word[j + 2:])
+    return out
+
+
+class SimilarityKernelTest(unittest.TestCase):
+    """The early-exit kernel decides like difflib's ratio() >= threshold."""
+
+    @classmethod
+    def setUpClass(cls):
+        vocab = sorted(load_corpus().word_index("quote").postings)
+        rng = random.Random(5)
+        words = rng.sample(vocab, 300)
+        pairs = []
+        for w in words:
+            # Neighbours in sorted order share prefixes: many pairs near the threshold.
+            i = vocab.index(w)
+            pairs.extend((w, v) for v in vocab[max(0, i - 3): i + 4])
+            pairs.extend((w, e) for e in _edits(w, rng))
+            pairs.append((w, rng.choice(vocab)))
+        cls.pairs = pairs
+
+    def test_same_decision_and_ratio_as_difflib(self):
+        accepted = 0
+        for threshold in (SIMILARITY_THRESHOLD, 0.5, 0.95):
+            for a, b in self.pairs:
+                ratio = similar(a, b)
+                got = _similarity_at_least(a, b, threshold)
+                self.assertEqual(got is not None, ratio >= threshold, (a, b, threshold))
+                self.assertEqual(_similar_at_least(a, b, threshold), ratio >= threshold)
+                if got is not None:
+                    self.assertEqual(got, ratio)
+                    accepted += 1
+        # Both outcomes are exercised.
+        self.assertTrue(0 < accepted < 3 * len(self.pairs))
+
+    def test_empty_strings(self):
+        self.assertEqual(_similarity_at_least("", ""), 1.0)
+        self.assertIsNone(_similarity_at_least("", "a"))
+        self.assertIsNone(_similarity_at_least("a", ""))
+
+
+if __name__ == "__main__":
+    unittest.main()
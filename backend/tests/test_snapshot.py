@@ -0,0 +1,92 @@
+import tempfile
+import unittest
+
+from src.common.db import iter_quotes
+from src.common.models import IR, FilterIR, SelectionIR
+from src.common.snapshot import snapshot_path
+from src.common.store import Corpus, QuoteStore, build_snapshot
+from src.executor.executor import iter_match_positions
+
+from .helpers import append_quote, copy_db, execute_sql
+
+
+FILTERS = (
+    [("quote", "hapiness", "forgiving")],
+    [("quote", "the truth", "loose")],
+    [("author", "einstien", "forgiving"), ("theme", "science", "loose")],
+    [("theme", "Wisdom", "exact")],
+    [("quote", "mind", "forgiving"), ("author", "buddha", "loose")],
+)
+
+
+def matches(corpus, filters):
+    ir = IR([FilterIR(*f) for f in filters], SelectionIR(top=None, random=None))
+    return [corpus.rowids[pos] for pos in iter_match_positions(ir, corpus)]
+
+
+class SnapshotTest(unittest.TestCase):
+    """A store mapped from a snapshot holds what a SQLite load does, and stale snapshots are checked."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = copy_db(self.tmp.name)
+        self.assertEqual(build_snapshot(self.db_path)[0], snapshot_path(self.db_path))
+
+    def fresh(self):
+        return Corpus(iter_quotes(self.db_path), self.db_path)
+
+    def assertSameCorpus(self, corpus, expected):
+        self.assertEqual(len(corpus), len(expected))
+        self.assertEqual(list(corpus.rowids), list(expected.rowids))
+        self.assertEqual([dict(r) for r in corpus.rows], [dict(r) for r in expected.rows])
+        self.assertEqual(list(corpus.content_norm), list(expected.content_norm))
+        for field in ("author", "theme"):
+            col, want = corpus.column(field), expected.column(field)
+            self.assertEqual(col.values, want.values)
+            self.assertEqual([list(r) for r in col.rows], [list(r) for r in want.rows])
+        for filters in FILTERS:
+            with self.subTest(filters=filters):
+                self.assertEqual(matches(corpus, filters), matches(expected, filters))
+
+    def test_round_trip(self):
+        corpus = QuoteStore(self.db_path).corpus()
+        self.assertEqual(corpus.source, "snapshot")
+        self.assertSameCorpus(corpus, self.fresh())
+
+    def test_stale_snapshot_after_append(self):
+        append_quote(self.db_path, "test-1", "Happiness is a warm puppy.", "Charles Schulz", "['Happiness']")
+        append_quote(self.db_path, "test-2", "Zyzzyva is the last word.", "Nobody Known", "['Words']")
+        corpus = QuoteStore(self.db_path).corpus()
+        self.assertEqual(corpus.source, "snapshot + incremental")
+        self.assertSameCorpus(corpus, self.fresh())
+        self.assertEqual(matches(corpus, [("quote", "zyzzyva", "forgiving")]), [corpus.rowids[-1]])
+        self.assertEqual(matches(corpus, [("author", "Nobody Known", "exact")]), [corpus.rowids[-1]])
+
+    def test_ignored_after_delete(self):
+        execute_sql(self.db_path, "DELETE FROM quotes WHERE rowid = (SELECT min(rowid) + 10 FROM quotes)")
+        corpus = QuoteStore(self.db_path).corpus()
+        self.assertEqual(corpus.source, "sqlite")
+        self.assertSameCorpus(corpus, self.fresh())
+
+    def test_ignored_after_update(self):
+        execute_sql(self.db_path, "UPDATE quotes SET author = 'Somebody Else' WHERE rowid = (SELECT max(rowid) FROM quotes)")
+        corpus = QuoteStore(self.db_path).corpus()
+        self.assertEqual(corpus.source, "sqlite")
+        self.assertEqual(corpus.rows[-1]["author"], "Somebody Else")
+
+    def test_ignored_when_unreadable(self):
+        with open(snapshot_path(self.db_path), "r+b") as f:
+            f.write(b"garbage!")
+        corpus = QuoteStore(self.db_path).corpus()
+        self.assertEqual(corpus.source, "sqlite")
+
+    def test_not_used_by_shards(self):
+        lo = self.fresh().rowids[100]
+        corpus = QuoteStore(self.db_path, rowid_range=(lo, None)).corpus()
+        self.assertEqual(corpus.source, "sqlite")
+        self.assertEqual(corpus.rowids[0], lo)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from src.common import bitmap
+
+from .helpers import load_corpus, naive_match, naive_positions, planned_positions
+
+
+class ValueColumnTest(unittest.TestCase):
+    """AUTHOR / THEME filters evaluated per distinct value match a row scan."""
+
+    CASES = (
+        ("author", "Albert Einstein", "exact"),
+        ("author", "einstien", "forgiving"),
+        ("author", "marcus", "loose"),
+        ("author", "oscar wild", "forgiving"),
+        ("theme", "Wisdom", "exact"),
+        ("theme", "inspiration", "forgiving"),
+        ("theme", "philosoph", "loose"),
+        ("theme", "famous quotes", "loose"),
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        cls.corpus = load_corpus()
+
+    def test_single_filters_match_row_scan(self):
+        for case in self.CASES:
+            with self.subTest(case=case):
+                expected = naive_positions(self.corpus, [case])
+                self.assertTrue(expected)
+                self.assertEqual(planned_positions(self.corpus, [case]), expected)
+
+    def test_combined_filters_match_row_scan(self):
+        for filters in (
+            [("author", "einstein", "forgiving"), ("theme", "science", "loose")],
+            [("author", "The Buddha", "exact"), ("theme", "wisdom", "forgiving")],
+            [("quote", "mind", "forgiving"), ("author", "buddha", "loose"), ("theme", "wisdom", "forgiving")],
+        ):
+            with self.subTest(filters=filters):
+                expected = naive_positions(self.corpus, filters)
+                self.assertTrue(expected)
+                self.assertEqual(planned_positions(self.corpus, filters), expected)
+
+    def test_value_bitmaps(self):
+        col = self.corpus.column("author")
+        for value, tag in (("Albert Einstein", "exact"), ("einstien", "forgiving")):
+            with self.subTest(value=value, tag=tag):
+                vids = col.matching_values(value, tag)
+                self.assertEqual(vids, [v for v, name in enumerate(col.values) if naive_match(name, value, tag)])
+                rows = self.corpus.rows
+                expected = [pos for pos in range(len(self.corpus)) if naive_match(rows[pos]["author"], value, tag)]
+                self.assertEqual(list(bitmap.iter_positions(col.rows_bitmap(vids))), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
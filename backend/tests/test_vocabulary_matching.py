@@ -0,0 +1,56 @@
+import unittest
+
+from src.common.index import WordIndex
+
+from .helpers import load_corpus, naive_match
+
+
+class VocabularyMatchingTest(unittest.TestCase):
+    """Fuzzy queries resolved once per distinct word, and their LRU cache."""
+
+    ROWS = 500
+
+    @classmethod
+    def setUpClass(cls):
+        corpus = load_corpus()
+        cls.texts = [corpus.content[pos] for pos in range(cls.ROWS)]
+        cls.norms = [corpus.content_norm[pos] for pos in range(cls.ROWS)]
+
+    def build_index(self) -> WordIndex:
+        index = WordIndex()
+        for pos, norm in enumerate(self.norms):
+            index.add_words(pos, norm.split())
+        return index
+
+    def resolve(self, index: WordIndex, query: str, tag: str):
+        m = index.lookup(query, tag)
+        return m.docs | {pos for pos in m.maybe if naive_match(self.texts[pos], query, tag)}
+
+    def test_lookup_matches_row_scan_and_cached_lookup(self):
+        index = self.build_index()
+        for tag in ("forgiving", "loose"):
+            for query in ("hapiness", "lov", "be yourself", "Courageous"):
+                with self.subTest(tag=tag, query=query):
+                    expected = {pos for pos, text in enumerate(self.texts) if naive_match(text, query, tag)}
+                    self.assertEqual(self.resolve(index, query, tag), expected)
+                    cached = len(index._word_cache)
+                    self.assertEqual(self.resolve(index, query, tag), expected)
+                    self.assertEqual(len(index._word_cache), cached)
+
+    def test_cache_is_bounded(self):
+        index = self.build_index()
+        index.CACHE_SIZE = 3
+        for query in ("one", "two", "three", "four", "five"):
+            index.lookup(query, "forgiving")
+        self.assertEqual(len(index._word_cache), 3)
+        self.assertEqual([q for q, _ in index._word_cache], ["three", "four", "five"])
+
+    def test_new_words_invalidate_cached_sets(self):
+        index = self.build_index()
+        before = index.lookup("zebrafish", "forgiving").docs
+        index.add_words(self.ROWS, ["zebrafishes"])
+        self.assertEqual(index.lookup("zebrafish", "forgiving").docs, before | {self.ROWS})
+
+
+if __name__ == "__main__":
+    unittest.main()
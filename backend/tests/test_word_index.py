@@ -0,0 +1,41 @@
+import unittest
+
+from src.common.matching import SIMILARITY_THRESHOLD
+
+from .helpers import load_corpus, naive_positions, planned_positions, similar
+
+
+class WordIndexTest(unittest.TestCase):
+    """QUOTE filters resolved on the word index return what a full scan does."""
+
+    QUERIES = ("hapiness", "imagine", "the truth", "qqqq")
+
+    @classmethod
+    def setUpClass(cls):
+        cls.corpus = load_corpus()
+
+    def test_fuzzy_quote_filters_match_full_scan(self):
+        for tag in ("forgiving", "loose"):
+            for query in self.QUERIES:
+                with self.subTest(tag=tag, query=query):
+                    filters = [("quote", query, tag)]
+                    self.assertEqual(
+                        planned_positions(self.corpus, filters), naive_positions(self.corpus, filters)
+                    )
+
+    def test_trigram_candidates_cover_every_similar_word(self):
+        index = self.corpus.word_index("quote")
+        for query in ("hapiness", "wisdon", "freedum", "lif", "a"):
+            with self.subTest(query=query):
+                expected = {w for w in index.postings if similar(w, query) >= SIMILARITY_THRESHOLD}
+                self.assertEqual(set(index.similar_words(query)), expected)
+
+    def test_words_containing_matches_vocabulary_scan(self):
+        index = self.corpus.word_index("quote")
+        for s in ("ness", "ov", "ing", "zzz"):
+            with self.subTest(s=s):
+                self.assertEqual(index.words_containing(s), {w for w in index.postings if s in w})
+
+
+if __name__ == "__main__":
+    unittest.main()